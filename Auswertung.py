@@ -4,31 +4,28 @@ Created on Mon Apr 29 11:21:04 2024
 
 @author: Besitzer
 """
-import copy
-import sys
 import os
+import getpass
 import shutil
 import re
-import pickle
 import numpy as np
-from scipy.optimize import curve_fit
 import pandas as pd
 from datetime import datetime, timezone
 import itertools
-import pynmea2
-from pyproj import Transformer
-
-from matplotlib.dates import DateFormatter
-import matplotlib.pyplot as plt
+# matplotlib, pyproj, pynmea2, scipy and airfoilwinggeometry are imported by the functions using them, so that importing
+# the processing functions stays fast (see pipeline.py)
 #plt.rcParams['text.usetex'] = True
 
-from scipy.signal import  savgol_filter
-from scipy import interpolate, integrate, optimize, stats
-if os.getlogin() == 'joeac':
-    sys.path.append("C:/git/airfoilwinggeometry")
-else:
-    sys.path.append("D:/Python_Codes/Uebung1/modules/airfoilwinggeometry")
-from airfoilwinggeometry.AirfoilPackage import AirfoilTools as at
+from airfoil_geometry import build_airfoil_geometry, geometry_key, get_geometry_cache, import_airfoil_tools
+from wall_correction import calc_wall_correction_coefficients
+from calibration import apply_drift_offsets, apply_offsets, drift_offsets_from_intervals, offsets_from_file, \
+    offsets_from_manual_file, resolve_offsets
+from sensor_health import check_sensor_health
+from result_cache import FileContent, ResultCache, hash_inputs
+from profiling import profiled, profiler
+from segment_figures import export_cp_files, segment_statistics
+from gps_track import add_track_columns, gps_track
+from wind_estimation import estimate_wind, segment_wind
 
 def _calc_rake_sensor_pos(h_stat=100.0, h_tot=93.0, defective_sensor_list=()):
     """
@@ -67,11 +64,11 @@ def gaussian_fit_average(row, defective_sensor_list, n_sig_cutoff=3.5):
     z_tot, _ = _calc_rake_sensor_pos(defective_sensor_list=defective_sensor_list)
 
     # wake rake total pressures
-    p_tot_rake = row[:-2]
+    p_tot_rake = row.iloc[:-2]
 
     # prandtl tube total and static pressures
-    p_tot_prandtl = row[-2]
-    p_stat_prandtl = row[-1]
+    p_tot_prandtl = row.iloc[-2]
+    p_stat_prandtl = row.iloc[-1]
 
     plot = False
 
@@ -91,6 +88,7 @@ def gaussian_fit_average(row, defective_sensor_list, n_sig_cutoff=3.5):
         p_tot_ref = p_tot_prandtl
 
     if plot:
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
         # plot measured values
         ax.plot(p_tot_rake, z_tot, "r.-")
@@ -118,6 +116,7 @@ def trimmed_median(row, lower_frac, upper_frac):
     trimmed_values = sorted_row[lower_idx:upper_idx]
     return np.median(trimmed_values)
 
+@profiled()
 def read_AOA_file(filename, sigma_wall, t0, alpha_sens_offset=214.73876953125):
     """
     Converts raw AOA data to pandas DataFrame
@@ -159,6 +158,7 @@ def read_AOA_file(filename, sigma_wall, t0, alpha_sens_offset=214.73876953125):
 
     return df, delta_t_GPS_PC
 
+@profiled()
 def read_GPS(filename):
 
     with open(filename) as file:
@@ -179,6 +179,7 @@ def read_GPS(filename):
     return df_parsed
 
 def parse_gprmc_row(line):
+    import pynmea2
     if "$GPRMC" in line.values[0] or "$GNRMC" in line.values[0]:
         data = pynmea2.parse(line.values[0])
         if data.is_valid:
@@ -199,6 +200,7 @@ def parse_gprmc_row(line):
     else:
         return None, None, None, None
 
+@profiled()
 def read_drive(filename, t0, delta_t, sync_method="delta_t"):
     """
     --> Reads drive data of wake rake (position and speed) into pandas DataFrame
@@ -250,6 +252,7 @@ def read_drive(filename, t0, delta_t, sync_method="delta_t"):
 
     return df
 
+@profiled()
 def read_DLR_pressure_scanner_file(filename, n_sens, t0):
     """
     Converts raw sensor data to pandas DataFrame
@@ -328,6 +331,7 @@ def read_DLR_pressure_scanner_file(filename, n_sens, t0):
 
     return df
 
+@profiled()
 def synchronize_data(merge_dfs_list):
     """
     synchronizes and interpolates sensor data, given in pandas DataFrames with a timestamp
@@ -336,6 +340,9 @@ def synchronize_data(merge_dfs_list):
     :return: merged_df          merged dataframe with all sensor data, interpolated according time
     """
 
+    # same time resolution for all DataFrames (merge_asof requires identical dtypes of the merge keys)
+    merge_dfs_list = [df.assign(Time=df["Time"].dt.as_unit("ns")) for df in merge_dfs_list]
+
     # Merge the DataFrames using merge_asof
     merged_df = merge_dfs_list[0]
     start = merged_df.loc[0, 'Time']
@@ -362,12 +369,14 @@ def synchronize_data(merge_dfs_list):
 
     return merged_df
 
+@profiled()
 def filter_data(df_sync):
     """
     applies savitzky golay filter to pressure data
     :param df_sync:
     :return:
     """
+    from scipy.signal import savgol_filter
     # Build pattern and find matching columns
     patterns = [
         r'^pstat_rake_\d+$',
@@ -389,9 +398,13 @@ def filter_data(df_sync):
 
     return df_sync
 
-def read_airfoil_geometry(filename, c, foil_source, eta_TE_flap, eta_LE_flap, flap_pivots, pickle_file=""):
+@profiled()
+def read_airfoil_geometry(filename, c, foil_source, eta_TE_flap, eta_LE_flap, flap_pivots, pickle_file="",
+                          max_cache_entries=16):
     """
-    --> searchs for pickle file in WD, if not found it creates a new pickle file
+    --> looks up geometry in the geometry cache (in memory, and pickle file in WD if given). Entries are keyed by the
+        content of the airfoil coordinate file and the Excel, the chord length, the flap pivots and the flap angles,
+        so alternating flap settings do not trigger a rebuild
     --> generates pandas DataFrame with assignment of sensor unit + port to measuring point from Excel and renames
     --> adds 's' positions of the measuring points from Excel (line coordinate around the profile,
         starting at trailing edge)
@@ -405,62 +418,23 @@ def read_airfoil_geometry(filename, c, foil_source, eta_TE_flap, eta_LE_flap, fl
     :param foil_source:         string, path of airfoil coordinate file
     :param eta_TE_flap:            flap deflection angle
     :param pickle_file:         path to pickle file with airfoil information
+    :param max_cache_entries:   maximum number of cached geometries (least recently used are evicted)
     :return df_airfoil:         DataFrame with info described above
     """
 
+    cache = get_geometry_cache(pickle_file, max_entries=max_cache_entries)
+    key = geometry_key(foil_source, filename, c, flap_pivots, eta_LE_flap, eta_TE_flap)
 
+    entry = cache.get(key)
+    if entry is None:
+        entry = build_airfoil_geometry(filename, c, foil_source, eta_TE_flap, eta_LE_flap, flap_pivots)
+        cache.put(key, entry)
 
-    if os.path.exists(pickle_file):
-        with open(pickle_file, 'rb') as file:
-            df, foil, eta_LE_flap_read, eta_TE_flap_read = pickle.load(file)
-
-    if not os.path.exists(pickle_file) or eta_LE_flap_read != eta_LE_flap or eta_TE_flap_read != eta_TE_flap:
-        # initialize airfoilTools object
-        foil = at.Airfoil(foil_source)
-
-        if eta_TE_flap != 0.0:
-            foil.flap(xFlap=flap_pivots[1, 0], yFlap=flap_pivots[1, 1], etaFlap=eta_TE_flap)
-        if eta_LE_flap != 0.0:
-            foil.LEflap(xFlap=flap_pivots[0, 0], yFlap=flap_pivots[0, 1], etaFlap=eta_LE_flap)
-
-        # Read Excel file
-        df = pd.read_excel(filename, usecols="A:F", skiprows=1, skipfooter=1)# Read the Excel file
-        df = df.dropna(subset=['Sensor unit K', 'Sensor port'])
-        df = df.drop(df[df["Kommentar"] == "inop"].index).reset_index(drop=True)
-        df = df.astype({'Messpunkt': 'int32', 'Sensor unit K': 'int32', 'Sensor port': 'int32'})
-
-        # append virtual trailing edge pressure taps (pressure is mean between last sensor at to and bottom side)
-        df_virt_top = pd.DataFrame([[np.nan, "virtual_top", 0, -1, -1, np.nan]], columns=df.columns)
-        # virtual bottom trailing edge tap: s value must be calculated
-        df_virt_bot = pd.DataFrame([[np.nan, "virtual_bot", at.s_curve(foil.u[-1], foil.tck)*c*1000, -1, -1, np.nan]],
-                                   columns=df.columns)
-        df = pd.concat([df_virt_top, df, df_virt_bot]).reset_index(drop=True)
+    df, foil = entry
 
-        df["s"] = df["Position [mm]"]/(c*1000)
-        df["x"] = np.nan
-        df["y"] = np.nan
-
-        df["x_n"] = np.nan
-        df["y_n"] = np.nan
-
-        u_taps = np.zeros(len(df.index))
-
-        for i, s in enumerate(df["s"]):
-            res = optimize.root_scalar(at.s_curve, args=(foil.tck, s), x0=0, fprime=at.ds)
-            u_taps[i] = res.root
-            coords_tap = interpolate.splev(u_taps[i], foil.tck)
-            df.loc[i, "x"] = coords_tap[0]
-            df.loc[i, "y"] = coords_tap[1]
-            n_tap = np.dot(at.tangent(u_taps[i], foil.tck)[0], np.array([[0, -1], [1, 0]]))
-            df.loc[i, "x_n"] = n_tap[0]
-            df.loc[i, "y_n"] = n_tap[1]
-
-        if pickle_file != "":
-            with open(pickle_file, 'wb') as file:
-                pickle.dump([df, foil, eta_LE_flap, eta_TE_flap], file)
-
-    return df, foil
+    return df.copy(), foil
 
+@profiled()
 def calc_ptot_pstat(df, defective_sensor_list, prandtl_data, total_ref_pressure_method="trimmed median"):
     """
     calculates total reference pressure from wake rake data by using an asymmetric trimmed mean of pressure sensor values
@@ -505,6 +479,7 @@ def calc_ptot_pstat(df, defective_sensor_list, prandtl_data, total_ref_pressure_
 
     return df
 
+@profiled()
 def calc_airspeed_wind(df, l_ref):
     """
     --> calculates wind component in free stream direction
@@ -538,6 +513,7 @@ def calc_airspeed_wind(df, l_ref):
 
     return df
 
+@profiled()
 def calc_cp(df, pressure_data_ident_strings):
     """
     calculates pressure coefficient for each static port on airfoil
@@ -565,6 +541,7 @@ def calc_cp(df, pressure_data_ident_strings):
 
     return df
 
+@profiled()
 def calc_cl_cm_cdp(df, df_airfoil, flap_pivots=[], lambda_wall=0., sigma_wall=0., xi_wall=0.):
     """
 
@@ -576,6 +553,7 @@ def calc_cl_cm_cdp(df, df_airfoil, flap_pivots=[], lambda_wall=0., sigma_wall=0.
     :param xi_wall:
     :return:
     """
+    from scipy import integrate
 
     # calculate tap normal vector components on airfoil surface projected to aerodynamic coordinate system
     n_proj_z = np.dot(df_airfoil[['x_n', 'y_n']].to_numpy(), np.array([-np.sin(np.deg2rad(df['alpha'])),
@@ -644,6 +622,7 @@ def calc_cl_cm_cdp(df, df_airfoil, flap_pivots=[], lambda_wall=0., sigma_wall=0.
 
     return df, sens_ident_cols
 
+@profiled()
 def calc_cd(df, l_ref, lambda_wall, sigma_wall, xi_wall, defective_sensor_list, extrapol_flag=False, *, gauss_span=5.0,     # extrapolate to ±gauss_span·σ
             n_z=1001):
     """
@@ -673,6 +652,7 @@ def calc_cd(df, l_ref, lambda_wall, sigma_wall, xi_wall, defective_sensor_list,
         Original dataframe with added column(s)  "cd"  and, if requested,
         "cd_extrapol".
     """
+    from scipy import interpolate, integrate
 
     # ------------------------------------------------------------------
     # fixed probe heights (mm)
@@ -703,6 +683,7 @@ def calc_cd(df, l_ref, lambda_wall, sigma_wall, xi_wall, defective_sensor_list,
     # bugfixing
     plot = False
     if plot:
+        import matplotlib.pyplot as plt
         i_plot = 18
         fig, ax = plt.subplots()
         ax.plot(d_cd_jones[i_plot, :] * 93./ (l_ref * 1000.0), z_tot)
@@ -764,11 +745,13 @@ def _gaussian_cptot(z, A, mu, sigma):
 
 def _fit_gaussian_cp(z, cp_row):
     """Least-squares fit of the Gaussian model to one wake profile"""
+    from scipy.optimize import curve_fit
     # ---- robust initial guesses ---------------------------------------------
     A0     = 1.0 - np.min(cp_row)                    # deficit height
     mu0    = z[np.argmin(cp_row)]                    # deepest deficit position
     sigma0 = 0.25 * (z.max() - z.min())              # ≈ quarter span
 
+    profiler.count("curve_fit")
     popt, _ = curve_fit(
         _gaussian_cptot,
         z, cp_row,
@@ -777,6 +760,7 @@ def _fit_gaussian_cp(z, cp_row):
     )
     return popt  # A, mu, sigma
 
+@profiled()
 def calc_x_trans(df_polar, df_airfoil, flap_pivots):
     """
     calculates estimated transition location. A laminar separation bubble collapses, where the flow transitions from
@@ -828,25 +812,17 @@ def calc_x_trans(df_polar, df_airfoil, flap_pivots):
     return df_polar
 
 def apply_calibration_offset(filename, df):
+    """
+    applies calibration offsets from calibration pickle file
+    :param filename:    path of calibration pickle file
+    :param df:          pandas DataFrame with pressure data
+    :return:            calibrated DataFrame and reference length from calibration file
+    """
 
-    with open(filename, "rb") as file:
-        calibr_data = pickle.load(file)
-
-    l_ref = calibr_data[6]
-    T_air = calibr_data[5] + 273.15
-
-    # flatten calibration data list, order like df pressure sensors
-    pressure_calibr_data = calibr_data[2] + calibr_data[3] + calibr_data[4] + calibr_data[1] + calibr_data[0]
-    # append zero calibration offsets for alpha, Lat/Lon, U_GPS and Rake Position
-    pressure_calibr_data += [0]*(len(df.columns) - len(pressure_calibr_data))
-
-    df_calibr_pressures = pd.DataFrame(data=[pressure_calibr_data], columns=df.columns)
-    # repeat calibration data
-    df_calibr_pressures = df_calibr_pressures.loc[df_calibr_pressures.index.repeat(len(df.index))]
-    df_calibr_pressures.index = df.index
+    offsets, l_ref, T_air = offsets_from_file(filename)
 
     # Apply calibration offsets
-    df = df - df_calibr_pressures
+    df = apply_offsets(df, offsets)
 
     df["T_air"] = T_air
 
@@ -860,20 +836,10 @@ def apply_calibration_20sec(df, T_air):
     :return:
     """
 
-    # select only pressures
-    df_pres = df.iloc[:, :len(df.columns)-6]
-
-    # Select the first 20 seconds of data
-    first_20_seconds = df_pres[df_pres.index < df_pres.index[0] + pd.Timedelta(seconds=20)]
-
-    # Calculate the mean for each sensor over the first 20 seconds
-    mean_values = first_20_seconds.mean(axis=0)
-
-    # Use these means to calculate the offsets for calibration
-    offsets = mean_values - mean_values.mean()
+    offsets, _, _ = resolve_offsets("20sec", df)
 
     # Apply the calibration to the entire DataFrame
-    df.iloc[:, :len(df.columns)-6] = df.iloc[:, :len(df.columns)-6] - offsets
+    df = apply_offsets(df, offsets)
 
     # Apply air temperature
     if not "T_air" in df.columns:
@@ -883,16 +849,15 @@ def apply_calibration_20sec(df, T_air):
 
 def apply_manual_calibration(df, calibration_filename="manual_calibration_data.p", T_air=288.15):
     """
-    uses first 20 seconds to calculate pressure sensor calibration offsets
+    uses manually determined calibration offsets from pickle file
     :param df:
     :return:
     """
 
-    with open(calibration_filename, "rb") as file:
-        offsets = pickle.load(file)
+    offsets = offsets_from_manual_file(calibration_filename)
 
     # Apply the calibration to the entire DataFrame
-    df.loc[:, offsets.index] = df.loc[:, offsets.index] - offsets
+    df = apply_offsets(df, offsets)
 
     # Apply air temperature
     if not "T_air" in df.columns:
@@ -903,46 +868,32 @@ def apply_manual_calibration(df, calibration_filename="manual_calibration_data.p
 def apply_time_interval_calibration(df, start_time, end_time, prandtl_data, df_airfoil, defective_sensor_list,
                                     plot_speed=True, figdir=None, T_air=288.15):
     """
-    uses time interval specified by start_time and end_time to calculate pressure sensor calibration offsets
+    uses time interval specified by start_time and end_time to calculate pressure sensor calibration offsets.
+    If lists of several zero flow intervals are given, offsets are calculated for every interval and interpolated in
+    time to every sample (compensation of zero drift)
     :param df:
-    :param start_time:
-    :param end_time:
+    :param start_time:      start time or list of start times of zero flow intervals
+    :param end_time:        end time or list of end times of zero flow intervals
     :return:
     """
 
-    # identify all pressure sensor columns
-    cols_calibrate = [col for col in df.columns if "static_K" in col or "rake" in col]
-
-    # select data within time interval
-    df_calib_calc = df.loc[(df.index >= start_time) & (df.index <= end_time), cols_calibrate]
-
     # use only used and functional sensors for mean calculation
     cols_static_prandtl = [prandtl_data["unit name static"] + "_{0:d}".format(prandtl_data["i_sens_static"]),]
     cols_static_used = ["static_K{0:02d}_{1:d}".format(row["Sensor unit K"], row["Sensor port"]) for i, row in df_airfoil.iterrows() if row["Sensor unit K"] >= 0]
     cols_rake_used = [col for col in df.columns if "rake" in col and int(col.split("_")[-1])-1 not in defective_sensor_list]
 
-    df_mean_calc = df_calib_calc.loc[:, cols_static_prandtl+cols_static_used+cols_rake_used]
-
-    calibration_offsets = df_mean_calc.mean().mean() - df_calib_calc.mean(axis=0)
+    ref_cols = cols_static_prandtl + cols_static_used + cols_rake_used
 
-    df[cols_calibrate] = df[cols_calibrate] + calibration_offsets
+    if isinstance(start_time, (list, tuple)):
+        t_centers, offsets = drift_offsets_from_intervals(df, list(zip(start_time, end_time)), ref_cols=ref_cols)
+        df = apply_drift_offsets(df, t_centers, offsets)
+    else:
+        offsets, _, _ = resolve_offsets("time interval", df, start_time=start_time, end_time=end_time,
+                                        ref_cols=ref_cols)
+        df = apply_offsets(df, offsets)
 
     if plot_speed:
-        fig, ax = plt.subplots()
-        ax_p = ax.twinx()
-
-        col_total_prandtl = prandtl_data["unit name total"] + "_{0:d}".format(prandtl_data["i_sens_total"])
-
-        ax_p.plot(df.index, df[col_total_prandtl], "r-", label="$p_{tot}$")
-
-        ax.plot(df.index, df["U_GPS"], label="$U_{GPS}$")
-        ax.axvspan(start_time, end_time, color="gray", alpha=0.5)
-
-        fig.legend()
-
-        if figdir is not None:
-            figpath = os.path.join(figdir, "speed.pdf")
-            plt.savefig(figpath)
+        plot_calibration_intervals(df, start_time, end_time, prandtl_data, figdir)
 
     # defragment
     df = df.copy()
@@ -953,56 +904,298 @@ def apply_time_interval_calibration(df, start_time, end_time, prandtl_data, df_a
 
     return df
 
-def calc_wall_correction_coefficients(filepath, l_ref):
+def plot_calibration_intervals(df, start_time, end_time, prandtl_data, figdir=None):
     """
-    calculate wall correction coefficients according to
-    Abbott and van Doenhoff 1945: Theory of Wing Sections
-    and
-    Althaus 2003: Tunnel-Wall Corrections at the Laminar Wind Tunnel
-    :param df_cp:           pandas dataframe with cp values
-    :return:                wall correction coefficients
+    plots Prandtl total pressure and GPS speed of the calibrated data with the zero flow intervals
+    :param start_time:      start time or list of start times of zero flow intervals
+    :param end_time:        end time or list of end times of zero flow intervals
+    :param figdir:          if given, the figure is saved as speed.pdf in this directory
     """
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots()
+    ax_p = ax.twinx()
 
-    #read symmetrical airfoil data
-    column_names = ['x', 'y', 'cp']
-    df_wall_correction_cp = pd.read_csv(filepath, names=column_names, skiprows=3, delim_whitespace=True)
+    col_total_prandtl = prandtl_data["unit name total"] + "_{0:d}".format(prandtl_data["i_sens_total"])
 
-    # model - wall distances:
-    d1 = 0.7
-    d2 = 1.582
+    ax_p.plot(df.index, df[col_total_prandtl], "r-", label="$p_{tot}$")
 
-    # cut off bottom airfoil side
-    df_wall_correction_cp = df_wall_correction_cp.iloc[:np.argmin(df_wall_correction_cp["x"]) + 1, :]
-    # and flip it
-    df_wall_correction_cp = df_wall_correction_cp.iloc[::-1, :].reset_index(drop=True)
+    ax.plot(df.index, df["U_GPS"], label="$U_{GPS}$")
+    for t_start, t_end in zip(np.atleast_1d(start_time), np.atleast_1d(end_time)):
+        ax.axvspan(t_start, t_end, color="gray", alpha=0.5)
 
-    # calculate surface contour gradient dy_t/dx as finite difference scheme. first and last value are calculated
-    # with forward and backward difference scheme, respectively and all other values with central difference
-    # scheme
-    dyt_dx = np.gradient(df_wall_correction_cp["y"])/np.gradient(df_wall_correction_cp["x"])
+    fig.legend()
 
-    # calculate v/V_inf
-    v_V_inf = np.sqrt(1 - df_wall_correction_cp["cp"].values)
+    if figdir is not None:
+        figpath = os.path.join(figdir, "speed.pdf")
+        plt.savefig(figpath)
 
-    # calculate lambda (warning: Lambda of Althaus is erroneus, first y factor forgotten)
-    lambda_wall_corr = integrate.trapezoid(y=16 / np.pi * df_wall_correction_cp["y"].values * v_V_inf *
-                                                np.sqrt(1 + dyt_dx ** 2), x=df_wall_correction_cp["x"].values)
+def raw_data_paths(data_dir, filename, sync_drive=False):
+    """
+    paths of the raw data files of one measurement
+    :param data_dir:        directory of raw data files
+    :param filename:        common file name start, e.g. "20230926-1713"
+    :param sync_drive:      if True, drive file is included
+    :return:                dict {name: path}
+    """
+    paths = {"GPS": os.path.join(data_dir, f"{filename}_GPS.dat"),
+             "AOA": os.path.join(data_dir, f"{filename}_AOA.dat"),
+             "static_K02": os.path.join(data_dir, f"{filename}_static_K02.dat"),
+             "static_K03": os.path.join(data_dir, f"{filename}_static_K03.dat"),
+             "static_K04": os.path.join(data_dir, f"{filename}_static_K04.dat"),
+             "ptot_rake": os.path.join(data_dir, f"{filename}_ptot_rake.dat"),
+             "pstat_rake": os.path.join(data_dir, f"{filename}_pstat_rake.dat")}
+    if sync_drive:
+        paths["drive"] = os.path.join(data_dir, f"{filename}_drive.dat")
+    return paths
+
+@profiled()
+def read_and_synchronize(data_dir, filename, sigma_wall, alpha_sens_offset, sync_drive=False, track_crs=None):
+    """
+    reads all raw data files of one measurement and synchronizes them
+    :param data_dir:            directory of raw data files
+    :param filename:            common file name start, e.g. "20230926-1713"
+    :param sigma_wall:          wall correction coefficient sigma (applied to alpha)
+    :param alpha_sens_offset:   AOA sensor offset
+    :param sync_drive:          if True, drive data is synchronized as well
+    :param track_crs:           coordinate reference system of the track columns (see gps_track.py), e.g.
+                                "EPSG:31287"; None: local east/north plane
+    :return:                    synchronized pandas DataFrame
+    """
+    paths = raw_data_paths(data_dir, filename, sync_drive)
+
+    # read sensor data
+    GPS = read_GPS(paths["GPS"])
+    t0 = GPS["Time"].iloc[0]
+
+    alphas, delta_t_GPS_PC = read_AOA_file(paths["AOA"], sigma_wall, t0=t0, alpha_sens_offset=alpha_sens_offset)
+    pstat_K02 = read_DLR_pressure_scanner_file(paths["static_K02"], n_sens=32, t0=t0)
+    pstat_K03 = read_DLR_pressure_scanner_file(paths["static_K03"], n_sens=32, t0=t0)
+    pstat_K04 = read_DLR_pressure_scanner_file(paths["static_K04"], n_sens=32, t0=t0)
+    ptot_rake = read_DLR_pressure_scanner_file(paths["ptot_rake"], n_sens=32, t0=t0)
+    pstat_rake = read_DLR_pressure_scanner_file(paths["pstat_rake"], n_sens=5, t0=t0)
+
+    # synchronize sensor data
+    if sync_drive:
+        drive = read_drive(paths["drive"], t0=t0, delta_t=delta_t_GPS_PC)
+        sync_data = [pstat_K02, pstat_K03, pstat_K04, ptot_rake, pstat_rake, alphas, drive, GPS]
+    else:
+        sync_data = [pstat_K02, pstat_K03, pstat_K04, ptot_rake, pstat_rake, alphas, GPS]
 
-    # calculate sigma
-    sigma_wall_corr = np.pi ** 2 / 48 * l_ref**2 * 1 / 2 * (1 / (2 * d1) + 1 / (2 * d2)) ** 2
+    # projected coordinates, heading, curvature and passes of the track (GPS fixes are projected once)
+    return add_track_columns(synchronize_data(sync_data), gps_track(GPS, crs=track_crs))
 
-    # correction for model influence on static reference pressure
-    # TODO: Re-calculate this using a panel method or with potential flow theory
-    xi_wall_corr = -0.00335 * l_ref**2
+def parse_calibration_info(calibration_info):
+    """
+    parses entry of the calibration info column of the segment definition file
+    :param calibration_info:    str, e.g. "file", "20sec", "None", "time interval; start; end" (several zero flow
+                                intervals for zero drift compensation: "time interval; start_1; end_1; start_2; ...")
+                                or file name of manual calibration data
+    :return:                    tuple (calibration type, calibration filename or None, start time(s), end time(s))
+    """
+    calibration_info = calibration_info.split(";")
+    calibration_type = calibration_info[0]
+    calibration_filename = None
+    calibration_start_time = calibration_end_time = None
+
+    if calibration_type not in ["None", "file", "20sec", "time interval"]:
+        calibration_filename = calibration_type
+        calibration_type = "manual"
+
+    if calibration_type == "time interval":
+        # Parse into datetime objects
+        calibration_times = [datetime.strptime(t.strip(), "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+                             for t in calibration_info[1:] if t.strip() != ""]
+        if len(calibration_times) == 0 or len(calibration_times) % 2 != 0:
+            raise ValueError("calibration info \"time interval\" needs pairs of start and end times, got {0:d} "
+                             "times".format(len(calibration_times)))
+        calibration_start_time = calibration_times[0::2]
+        calibration_end_time = calibration_times[1::2]
+        if len(calibration_start_time) == 1:
+            calibration_start_time = calibration_start_time[0]
+            calibration_end_time = calibration_end_time[0]
+
+    return calibration_type, calibration_filename, calibration_start_time, calibration_end_time
+
+@profiled()
+def apply_calibration(df_sync, calibration_info, pickle_path_calibration, T_air, prandtl_data, df_airfoil,
+                      defective_sensor_list, plot=False, figdir=None,
+                      manual_calibration_path="manual_calibration_data.p"):
+    """
+    applies calibration specified in calibration info column of segment definition file
+    :return:    tuple (calibrated pandas DataFrame, l_ref from calibration file or None)
+    """
+    calibration_type, calibration_filename, calibration_start_time, calibration_end_time = \
+        parse_calibration_info(calibration_info)
+    l_ref = None
+
+    if calibration_type == "file":
+        # apply calibration offset from calibration file
+        df_sync, l_ref = apply_calibration_offset(pickle_path_calibration, df_sync)
+    elif calibration_type == "20sec":
+        # apply calibration offset from first 20 seconds
+        df_sync = apply_calibration_20sec(df_sync, T_air)
+    elif calibration_type == "manual":
+        df_sync = apply_manual_calibration(df_sync, calibration_filename=manual_calibration_path)
+    elif calibration_type == "time interval":
+        df_sync = apply_time_interval_calibration(df_sync, calibration_start_time, calibration_end_time,
+                                                  prandtl_data, df_airfoil, defective_sensor_list, plot, figdir,
+                                                  T_air)
+    elif calibration_type == "None":
+        # no calibration is performed
+        df_sync["T_air"] = 288.15
+    else:
+        raise ValueError("wrong parameter 'calibration_type' passed. Either 'file', '20sec', 'manual' or 'manual2'")
 
-    return lambda_wall_corr, sigma_wall_corr, xi_wall_corr
+    return df_sync, l_ref
 
-def plot_time_series(df, df_segments, U_cutoff=10, figdir="plot", plot_pstat=False, plot_drive=False, i_seg_plot=None):
+def read_segment_definition(segments_def_path):
+    """
+    reads segment definition Excel file
+    :param segments_def_path:   path of segment definition file (e.g. "T012_R027.xlsx")
+    :return:                    tuple (raw data file names, calibration infos, TE flap angles, LE flap angles,
+                                df_segments with 'start' and 'end' column)
+    """
+    # read raw data filenames
+    raw_data_filenames = pd.read_excel(segments_def_path, skiprows=0, usecols="J").dropna().values.astype(
+        "str").flatten()
+    calibration_infos = pd.read_excel(segments_def_path, skiprows=0, usecols="K").dropna().values.astype(
+        "str").flatten()
+    etas_TE_flap = pd.read_excel(segments_def_path, skiprows=0, usecols="L").dropna().values.astype(
+        "float").flatten()
+    etas_LE_flap = pd.read_excel(segments_def_path, skiprows=0, usecols="M").dropna().values.astype(
+        "float").flatten()
+
+    # read segment times
+    df_segments = pd.read_excel(segments_def_path, skiprows=1, usecols="A:H").ffill(axis=0)
+    df_segments[["hh", "mm", "ss", "hh.1", "mm.1", "ss.1"]] = df_segments[["hh", "mm", "ss", "hh.1", "mm.1", "ss.1"]].astype(int)
+
+    df_segments['start'] = pd.to_datetime(df_segments['dd'].astype(str) + ' ' +
+                                          df_segments['hh'].astype(str) + ':' +
+                                          df_segments['mm'].astype(str) + ':' +
+                                          df_segments['ss'].astype(str),
+                                          errors='coerce', utc=True)
+    df_segments['end'] = pd.to_datetime(df_segments['dd.1'].astype(str) + ' ' +
+                                        df_segments['hh.1'].astype(str) + ':' +
+                                        df_segments['mm.1'].astype(str) + ':' +
+                                        df_segments['ss.1'].astype(str),
+                                        errors='coerce', utc=True)
+
+    df_segments = df_segments[['start', 'end']]
+
+    return raw_data_filenames, calibration_infos, etas_TE_flap, etas_LE_flap, df_segments
+
+def flap_angles(etas_TE_flap, etas_LE_flap, i):
+    """
+    flap angles of i-th raw data file of segment definition file. If only one LE flap angle is given, it applies to
+    all files
+    :return:    tuple (eta_TE_flap, eta_LE_flap)
+    """
+    eta_TE_flap = etas_TE_flap[i]
+    if len(etas_LE_flap) == len(etas_TE_flap):
+        eta_LE_flap = etas_LE_flap[i]
+    elif etas_LE_flap.size > 0:
+        eta_LE_flap = etas_LE_flap[0]
+    else:
+        eta_LE_flap = 0
+    return eta_TE_flap, eta_LE_flap
+
+@profiled()
+def load_measurement(data_dir, filename, calibration_info, df_airfoil, sigma_wall, alpha_sens_offset, sync_drive,
+                     T_air, prandtl_data, defective_sensor_list, result_cache=None, sensor_check_dir=None, plot=False,
+                     figdir=None, track_crs=None):
+    """
+    reads, synchronizes and calibrates the raw data of one measurement. Both stages are cached in result_cache
+    :param data_dir:            directory of raw data and calibration files
+    :param filename:            common file name start, e.g. "20230926-1713"
+    :param calibration_info:    entry of calibration info column of segment definition file
+    :param result_cache:        ResultCache object. If None, nothing is cached
+    :param sensor_check_dir:    if given, sensor health check is run and report is written to this directory
+    :param track_crs:           coordinate reference system of the GPS track columns (see read_and_synchronize)
+    :return:                    tuple (calibrated pandas DataFrame, l_ref from calibration file or None, cache key of
+                                calibrated data)
+    """
+    if result_cache is None:
+        result_cache = ResultCache(enabled=False)
+
+    pickle_path_calibration = os.path.join(data_dir, f"{filename}_sensor_calibration_data.p")
+    manual_calibration_path = os.path.join(data_dir, "manual_calibration_data.p")
+
+    # read and synchronize sensor data (cached by raw file contents)
+    sync_key = hash_inputs([FileContent(p) for p in raw_data_paths(data_dir, filename, sync_drive).values()],
+                           sigma_wall, alpha_sens_offset, sync_drive, track_crs)
+    df_sync = result_cache.cached("sync", sync_key, read_and_synchronize, data_dir, filename, sigma_wall,
+                                  alpha_sens_offset, sync_drive, track_crs)
+
+    if sensor_check_dir is not None:
+        sensor_report, suggested_defective = check_sensor_health(df_sync, prandtl_data)
+        sensor_report.to_csv(os.path.join(sensor_check_dir, f"{filename}_sensor_health.csv"))
+        print("{0}: suggested defective_sensor_list = {1} (used: {2})".format(filename, suggested_defective,
+                                                                              defective_sensor_list))
+        print(sensor_report.loc[sensor_report["defective"]].to_string())
+
+    # apply calibration (cached, without plots: figures are drawn on every run, also for cache hits)
+    calibration_key = hash_inputs(sync_key, calibration_info, FileContent(pickle_path_calibration),
+                                  FileContent(manual_calibration_path), T_air, prandtl_data, df_airfoil,
+                                  defective_sensor_list)
+    df_sync, l_ref_calibration = result_cache.cached("calibration", calibration_key, apply_calibration, df_sync,
+                                                     calibration_info, pickle_path_calibration, T_air, prandtl_data,
+                                                     df_airfoil, defective_sensor_list, False, None,
+                                                     manual_calibration_path)
+    calibration_type, _, calibration_start_time, calibration_end_time = parse_calibration_info(calibration_info)
+    if plot and calibration_type == "time interval":
+        plot_calibration_intervals(df_sync, calibration_start_time, calibration_end_time, prandtl_data, figdir)
+
+    return df_sync, l_ref_calibration, calibration_key
+
+@profiled()
+def calc_time_series(df_sync, df_filt, df_airfoil, prandtl_data, l_ref, flap_pivots, lambda_wall, sigma_wall,
+                     xi_wall, defective_sensor_list, total_ref_pressure_method="trimmed average"):
+    """
+    calculates unaveraged coefficients of the whole run from raw and from filtered data
+    :param df_sync:     synchronized and calibrated data
+    :param df_filt:     filtered data (see filter_data)
+    :return:            tuple (df_raw, df_filt, sens_ident_cols)
+    """
+    df_raw = df_sync.copy()
+    df_filt = df_filt.copy()
+
+    # calculate total reference pressure
+    df_raw = calc_ptot_pstat(df_raw, defective_sensor_list, prandtl_data, total_ref_pressure_method=total_ref_pressure_method)
+    df_filt = calc_ptot_pstat(df_filt, defective_sensor_list, prandtl_data, total_ref_pressure_method=total_ref_pressure_method)
+
+    # calculate wind component
+    df_raw = calc_airspeed_wind(df_raw, l_ref)
+    df_filt = calc_airspeed_wind(df_filt, l_ref)
+
+    # calculate pressure coefficients
+    df_raw = calc_cp(df_raw, pressure_data_ident_strings=['stat', 'ptot'])
+    df_filt = calc_cp(df_filt, pressure_data_ident_strings=['stat', 'ptot'])
+
+    # calculate lift coefficients
+    df_raw, _ = calc_cl_cm_cdp(df_raw, df_airfoil, flap_pivots, lambda_wall, sigma_wall, xi_wall)
+    df_filt, sens_ident_cols = calc_cl_cm_cdp(df_filt, df_airfoil, flap_pivots, lambda_wall, sigma_wall,
+                                              xi_wall)
+
+    # calculate drag coefficients
+    df_filt = calc_cd(df_filt, l_ref, lambda_wall, sigma_wall, xi_wall, defective_sensor_list, extrapol_flag=False)
+
+    return df_raw, df_filt, sens_ident_cols
+
+@profiled()
+def plot_time_series(df, df_segments, U_cutoff=10, figdir="plot", plot_pstat=False, plot_drive=False, i_seg_plot=None,
+                     n_points="auto", decimation="minmax", zoom_segment=None):
     """
 
     :param df_sync:
+    :param n_points:        number of points per trace after decimation (see decimation.py); "auto": horizontal
+                            resolution of the figure in pixels, None: full resolution
+    :param decimation:      "minmax" (envelope, keeps peaks) or "lttb"
+    :param zoom_segment:    index of segment, which is plotted alone at full resolution
     :return:
     """
+    import matplotlib.pyplot as plt
+    from matplotlib.dates import DateFormatter
+    from decimation import decimate
 
     # plot U_CAS over time
     """fig, ax, = plt.subplots()
@@ -1041,18 +1234,32 @@ def plot_time_series(df, df_segments, U_cutoff=10, figdir="plot", plot_pstat=Fal
         axpos +=60
         ax_drive.spines['right'].set_position(('outward', axpos))
 
+    # time window and number of points per trace
+    if zoom_segment is not None:
+        t_start, t_end = df_segments.loc[zoom_segment, "start"], df_segments.loc[zoom_segment, "end"]
+        df = df.loc[(df.index >= t_start) & (df.index <= t_end)]
+        n_points = None
+    elif n_points == "auto":
+        n_points = int(fig.get_size_inches()[0] * fig.dpi)
+
+    # samples above cutoff speed
+    df_fast = df.loc[df["U_CAS"] > U_cutoff]
+
+    def trace(df_trace, col):
+        series = decimate(df_trace[col], n_points, decimation)
+        return series.index, series.values
+
     # Set plot lines
-    ax_alpha.plot(df.loc[df["U_CAS"] > U_cutoff].index, df.loc[df["U_CAS"] > U_cutoff, "alpha"], "k-", label=r"$\alpha$", zorder=5)
-    ax_Re.plot(df.loc[df["U_CAS"] > U_cutoff].index, df.loc[df["U_CAS"] > U_cutoff, "Re"], "y-", label=r"$Re$", zorder=4)
-    host.plot(df.loc[df["U_CAS"] > U_cutoff].index, df.loc[df["U_CAS"] > U_cutoff, "cl"], label="$c_l$", zorder=3)
-    ax_cd.plot(df.loc[df["U_CAS"] > U_cutoff].index,
-               df.loc[df["U_CAS"] > U_cutoff, "cd"], color="red", label="$c_d$", zorder=1)
+    ax_alpha.plot(*trace(df_fast, "alpha"), "k-", label=r"$\alpha$", zorder=5)
+    ax_Re.plot(*trace(df_fast, "Re"), "y-", label=r"$Re$", zorder=4)
+    host.plot(*trace(df_fast, "cl"), label="$c_l$", zorder=3)
+    ax_cd.plot(*trace(df_fast, "cd"), color="red", label="$c_d$", zorder=1)
 
     if plot_pstat:
-        ax_pstat.plot(df.index, df["p_stat"], color="green", label="$p_{stat}$")
+        ax_pstat.plot(*trace(df, "p_stat"), color="green", label="$p_{stat}$")
 
     if plot_drive:
-        ax_drive.plot(df.index, df["Rake Position"], color="purple")
+        ax_drive.plot(*trace(df, "Rake Position"), color="purple")
 
     for index, row in df_segments.iterrows():
         if index == i_seg_plot:
@@ -1072,6 +1279,8 @@ def plot_time_series(df, df_segments, U_cutoff=10, figdir="plot", plot_pstat=Fal
     ax_cd.set_ylabel("$c_d$")
     ax_cd.set_ylim([0., 0.035])
     host.set_ylim([0, 2])
+    if zoom_segment is not None:
+        host.set_xlim([t_start, t_end])
     if plot_pstat:
         ax_pstat.set_ylabel("$p_{stat}~\mathrm{[Pa]}$")
     # Enabling grid on host
@@ -1095,129 +1304,45 @@ def plot_time_series(df, df_segments, U_cutoff=10, figdir="plot", plot_pstat=Fal
 
     # save figure
     if figdir is not None:
-        plt.savefig(os.path.join(figdir, "time_series.pdf"))
+        if zoom_segment is not None:
+            plt.savefig(os.path.join(figdir, f"time_series_seg{zoom_segment}.pdf"))
+        else:
+            plt.savefig(os.path.join(figdir, "time_series.pdf"))
+
+    # path of car is only plotted for the whole run
+    if zoom_segment is not None:
+        return
 
-    # plot path of car
+    # plot path of car (projected coordinates of synchronized data, see gps_track.py)
     fig5, ax3 = plt.subplots()
-    transformer = Transformer.from_crs("wgs84", "EPSG:31287")
-    x, y = transformer.transform(df["Longitude"], df["Latitude"])
-    ax3.plot(x, y, "k-")
+    x_track, y_track = df["x_track"].to_numpy(), df["y_track"].to_numpy()
+    ax3.plot(x_track, y_track, "k-")
     ax3.axis("equal")
-    for index, row in df_segments.iterrows():
-        x, y = transformer.transform(df.loc[((df.index >= row['start']) & (df.index <= row['end'])), "Longitude"],
-                 df.loc[((df.index >= row['start']) & (df.index <= row['end'])), "Latitude"])
-        ax3.plot(x, y)
-        t_center = row['start'] + (row['end'] - row['start'])/2
-        i_center = abs(df.index - t_center).argmin()
-        x, y = transformer.transform(df.iloc[i_center].loc["Longitude"],
-                                                         df.iloc[i_center].loc["Latitude"])
-        ax3.annotate("$i_{seg}=" + str(index) + "$", xy=(x, y))
+    i_starts = df.index.searchsorted(df_segments["start"])
+    i_ends = df.index.searchsorted(df_segments["end"], side="right")
+    for index, i_start, i_end in zip(df_segments.index, i_starts, i_ends):
+        ax3.plot(x_track[i_start:i_end], y_track[i_start:i_end])
+        i_center = min((i_start + i_end) // 2, len(x_track) - 1)
+        ax3.annotate("$i_{seg}=" + str(index) + "$", xy=(x_track[i_center], y_track[i_center]))
     if figdir is not None:
         plt.savefig(os.path.join(figdir, "car_path.pdf"))
 
     return
 
-def plot_cp_x_and_wake(df, df_airfoil, at_airfoil, figdir, sens_ident_cols, df_segments, df_polar, defective_sensor_list):
+@profiled()
+def plot_cp_x_and_wake(segment_stats, df_airfoil, at_airfoil, figdir, n_workers=None):
     """
-    plots cp(x) and wake depression (x) at certain operating points (alpha, Re and beta)
-    :param df:      pandas dataframe with index time and data to be plotted
-    :param t:       index number of operating point (=time)
-    :return:
+    plots cp(x) and wake depression (x) at certain operating points (alpha, Re and beta); figures are rendered
+    headless (Agg) in a process pool and saved to figdir
+    :param segment_stats:   statistics of the segments (see segment_figures.segment_statistics)
+    :param figdir:          directory of figures
+    :param n_workers:       number of rendering processes (None: number of CPUs)
+    :return:                list of figure paths
     """
-    h_stat = 100
-    h_tot = 93
-
-    # positions of total pressure sensors of wake rake
-    z_tot = np.linspace(-h_tot / 2, h_tot / 2, 32, endpoint=True);
-    # it is assumed, that 0th sensor is defective (omit that value)
-    z_tot = np.delete(z_tot, defective_sensor_list)
-
-    # positions of static pressure sensors of wake rake
-    z_stat = np.linspace(-h_stat / 2, h_stat / 2, 5, endpoint=True);
-
-    for i_seg in df_polar.sort_values(by="alpha").index:
-
-        Re = df_polar.loc[i_seg, "Re"]
-        alpha = df_polar.loc[i_seg, "alpha"]
-        cl = df_polar.loc[i_seg, "cl"]
-        cd = df_polar.loc[i_seg, "cd"]
-
-        t_start = np.abs(df_sync.index-df_segments.loc[i_seg, "start"]).argmin()
-        t_end = np.abs(df_sync.index-df_segments.loc[i_seg, "end"]).argmin()
-
-        # plot cp(x)
-        fig, axes = plt.subplots(2, figsize=(6,12))
-        ax = axes[0]
-        ax_cp = ax.twinx()
-        ax.plot(at_airfoil.coords[:, 0], at_airfoil.coords[:, 1], "k-")
-        ax.plot(df_airfoil["x"], df_airfoil["y"], "k.")
-        ax_cp.plot(df_airfoil["x"], df[sens_ident_cols].iloc[t_start:t_end].mean(), "r.-")
-        # Calculate mean values and standard deviations over the specified time interval
-        mean_cp_values = df[sens_ident_cols].iloc[t_start:t_end].mean()
-        std_cp_values = df[sens_ident_cols].iloc[t_start:t_end].std()
-        # Plot the mean cp values with error bars
-        ax_cp.errorbar(df_airfoil["x"], mean_cp_values, yerr=std_cp_values, fmt='r.-', ecolor='gray', elinewidth=1,capsize=2)
-        ylim_u, ylim_l = ax_cp.get_ylim()
-        ax_cp.set_ylim([ylim_l, ylim_u])
-        ax.set_xlabel("$x$")
-        ax.set_ylabel("$y$")
-        ax_cp.set_ylabel("$c_p$")
-        fig.suptitle(r"$i_\mathrm{{seg}}={}:~Re={:.2E}~cl={:.2f}~cd={:.4f}~\alpha={:.2f}$".format(i_seg, Re, cl, cd, alpha))
-        ax_cp.grid()
-        ax.axis("equal")
-
-        # plot wake depression(x)
-        # extract total pressure of wake rake from dataframe
-        cols = df.filter(regex='^ptot_rake')
-        cols_mean = df_polar.filter(regex='^ptot_rake')
-
-        # drop erroneous pressure sensors
-        cols_tot = cols.drop(cols.columns[defective_sensor_list], axis=1)
-        cols_tot_mean = cols_mean.drop(cols_mean.columns[defective_sensor_list], axis=1)
-        # data of static pressure sensor
-        cols_stat = df.filter(regex='^pstat_rake')
-        cols_stat_mean = df_polar.filter(regex='^pstat_rake')
-        ax = axes[1]
-        ax_cp = ax.twiny()
-        # plot airfoil for visualization
-        ax.plot(at_airfoil.coords[:, 0]*100, at_airfoil.coords[:, 1]*100, "k-")
-        # Calculate mean and standard deviation over the specified time interval
-        mean_ptot_values = cols_tot_mean.iloc[i_seg]
-        std_ptot_values = cols_tot.iloc[t_start:t_end].std()
-        mean_pstat_values = cols_stat_mean.iloc[i_seg]
-        std_pstat_values = cols_stat.iloc[t_start:t_end].std()
-        # Plot the mean ptot values with error bars
-        ax_cp.plot(mean_ptot_values, z_tot, "r.-")
-        ax_cp.errorbar(mean_ptot_values, z_tot, xerr=std_ptot_values, fmt='r.-', ecolor='gray', elinewidth=1, capsize=2)
-        # Plot the mean pstat values with error bars
-        ax_cp.plot(mean_pstat_values, z_stat, "b.-")
-        ax_cp.errorbar(mean_pstat_values, z_stat, xerr=std_pstat_values, fmt='b.-', ecolor='gray', elinewidth=1, capsize=2)
-        # Plot reference total pressure sensor for reference
-        ax_cp.plot(df_polar.loc[i_seg, "static_K04_32"], z_stat[0], "g.")
-        ax_cp.plot(df_polar.loc[i_seg, "static_K04_32"], z_stat[-1], "g.")
-        ylim_l, ylim_u = ax_cp.get_ylim()
-        ax_cp.set_ylim([ylim_l, ylim_u])
-        ax.set_xlabel("$x$")
-        ax.set_ylabel("$z$")
-        ax_cp.set_xlabel("$c_p$")
-        ax_cp.grid()
-        ax.axis("equal")
-        fig.tight_layout()
-        plt.pause(0.01)
-
-        if figdir is not None:
-            plt.savefig(os.path.join(figdir, "cp_alpha{0:.2f}_cl{1:.2f}_iseg{2}.pdf".format(alpha, cl, i_seg)))
-
-            # write cp to file
-            filename = "C:/XFOIL6.99/{0}_{1}_cl{2:.2f}_alpha{3:.2f}.cp".format(at_airfoil.filename.split(".dat")[0], figdir.split("\\")[-1].rstrip("_plots"), cl, alpha)
-            cp_offset = 0.15
-            x_vals = df_airfoil["x"].to_numpy()
-            cp_vals = df[sens_ident_cols].iloc[t_start:t_end].mean()
-            x_cp = np.vstack((x_vals, cp_vals + cp_offset)).T
-
-            np.savetxt(filename, x_cp, header="     x          Cp  ", fmt="%.5f")
+    from segment_figures import airfoil_figure_geometry, render_segment_figures
 
-    return
+    return render_segment_figures(segment_stats, airfoil_figure_geometry(df_airfoil, at_airfoil), figdir,
+                                  n_workers=n_workers)
 
 def plot_3D(df):
     """
@@ -1225,6 +1350,7 @@ def plot_3D(df):
     :param df:
     :return:
     """
+    import matplotlib.pyplot as plt
 
 
     # Create a new figure for the 3D plot
@@ -1295,6 +1421,7 @@ def calc_mean(df, alpha, Re):
 
     return mean_alpha, mean_cl, mean_cd, mean_cm
 
+@profiled()
 def calculate_polar(df_raw, df_segments, prandtl_data, df_airfoil, l_ref, flap_pivots, lambda_wall, sigma_wall,
                     xi_wall, defective_sensor_list=(), total_ref_pressure_method="trimmed median"):
     """
@@ -1355,6 +1482,7 @@ def plot_polars(df):
     :param df_polars:
     :return:
     """
+    import matplotlib.pyplot as plt
     # plot cl(alpha)
     fig, ax = plt.subplots()
     ax.plot(df["alpha"], df["cl"], "k.", linestyle='-')
@@ -1393,14 +1521,58 @@ def plot_polars(df):
 
 if __name__ == '__main__':
 
+    from scipy import interpolate
+    at = import_airfoil_tools()
+    login = getpass.getuser()
+
     plot = True
     savefigs = True
+    # run sensor health check and print suggested defective_sensor_list
+    check_sensors = False
+    # cache results of pipeline stages on disk (sync, calibration, time series, polar)
+    use_result_cache = True
+    result_cache_max_bytes = 5 * 1024**3
+    # record time, memory and expensive calls of every pipeline stage (printed and written to figdir)
+    profile = False
+    if profile:
+        profiler.enable()
 
     T_air = 288
+    # measured position (x, z) of the static reference pressure probe relative to the airfoil leading edge in m for the
+    # wall correction coefficient xi (see wall_correction.py); None: former fixed xi = -0.00335 * l_ref**2
+    probe_position = None
     # Lower cutoff speed for plots
     U_cutoff = 10
     # specify test segment, which should be plotted
     i_seg_plot = 0
+    # decimation of time series plot ("minmax" or "lttb"); additional full resolution plot of segment i_seg_plot
+    time_series_decimation = "minmax"
+    plot_segment_full_resolution = False
+    # projection of GPS track (columns x_track, y_track of synchronized data)
+    track_crs = "EPSG:31287"
+    # wind estimation from U_TAS, U_GPS and heading of back-and-forth passes; drop segments with gusts or bad wind fit
+    calc_wind = True
+    reject_gusty_segments = False
+    # Monte Carlo confidence intervals of polar points (error sources see polar_uncertainty.py)
+    calc_uncertainty = True
+    n_uncertainty_samples = 2000
+    # Welch spectra of pressure channels per segment: table of RMS, dominant frequencies and band RMS (csv in figdir)
+    calc_spectra = True
+    # time resolved polar of sliding windows over the whole run (csv and XFOIL polar "<airfoil>_<run>_rolling.pol")
+    calc_rolling_polar = False
+    rolling_window_s = 10.
+    rolling_stride_s = 1.
+    rolling_max_alpha_std = 0.2
+    # drag from wake profiles stitched over the rake drive positions (sync_drive) instead of Gaussian extrapolation
+    use_traverse_drag = True
+    traverse_bin_width = 1.
+    # processes for rendering the cp(x) and wake figures of the segments (None: number of CPUs)
+    n_plot_workers = None
+    # export segment cp distributions as XFOIL cp files
+    export_cp_xfoil = True
+    cp_export_dir = "C:/XFOIL6.99"
+    # multi-resolution store of synchronized and derived channels for browsing (python pyramid_store.py view ...)
+    write_pyramid = False
 
     # ptot_method = "trimmed average"
     # ptot_method = "trimmed median"
@@ -1458,21 +1630,21 @@ if __name__ == '__main__':
             #XFOIL_polar_files = ["mue13_Re1e6_XFOILSUC.pol", "mue13_Re1e6_XFOILmod.pol", "mue13-33-le15_Re1e6_n7_XFOIL-mod.pol"]
             XFOIL_polar_files = ["mue13_Re1e6_XFOILSUC.pol", "mu13-33_Re1e6_n9_XFOILSUCmod.pol", "mue13_Re1e6_XFOILmod.pol"]
             XFOIL_polnames = ["XFOILSUC-mod $N_{crit}=11.5$", "XFOILSUC-mod $N_{crit}=9$", "XFOIL-mod $N_{crit}=9$"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-13/T002_T009"
 
         if run == "T008_T009":
             seg_def_files = ["T008_T009.xlsx"]
             digitized_LWK_polar_files_clcd = ["Re1e6_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re1e6_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-13/T002_T009"
 
         if run == "T010":
             seg_def_files = ["T010.xlsx"]
             digitized_LWK_polar_files_clcd = ["Re1e6_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re1e6_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-13/T002_T009"
 
         if run == "rake pos":
@@ -1483,7 +1655,7 @@ if __name__ == '__main__':
             PPAX['ALdel'] = 5.0000
             digitized_LWK_polar_files_clcd = ["Re1e6_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re1e6_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-13/T002_T009"
 
         if run == "T012":
@@ -1495,7 +1667,7 @@ if __name__ == '__main__':
             PPAX['ALdel'] = 5.0000
             digitized_LWK_polar_files_clcd = ["Re1.5e6_beta0_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re1.5e6_beta0_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-13/T002_T009"
 
         if run == "T014":
@@ -1510,7 +1682,7 @@ if __name__ == '__main__':
             digitized_LWK_polar_files_clcd = ["Re1.5e6_beta0_cl-cd.txt", "Re2.5e6_beta0_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re1.5e6_beta0_cl-alpha.txt", "Re2.5e6_beta0_cl-alpha.txt"]
             XFOIL_polar_files = ["mue13_Re2e6_XFOILSUC.pol", "mue13_Re2e6_XFOILmod.pol"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-13/T002_T009"
 
         if run == "T020":
@@ -1524,7 +1696,7 @@ if __name__ == '__main__':
             PPAX['ALdel'] = 5.0000
             digitized_LWK_polar_files_clcd = ["Re8e5_beta7.5_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re8e5_beta7.5_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-18"
 
         if run == "T021":
@@ -1538,7 +1710,7 @@ if __name__ == '__main__':
             PPAX['ALdel'] = 5.0000
             digitized_LWK_polar_files_clcd = ["Re1e6_beta7.5_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re1e6_beta7.5_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-18"
 
         if run == "T022":
@@ -1552,7 +1724,7 @@ if __name__ == '__main__':
             PPAX['ALdel'] = 5.0000
             digitized_LWK_polar_files_clcd = ["Re1.5e6_beta7.5_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re1.5e6_beta7.5_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-18"
 
         if run == "T024":
@@ -1566,7 +1738,7 @@ if __name__ == '__main__':
             PPAX['ALdel'] = 5.0000
             digitized_LWK_polar_files_clcd = ["Re1.5e6_beta15_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re1.5e6_beta15_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-18"
 
         if run == "T025":
@@ -1580,7 +1752,7 @@ if __name__ == '__main__':
             PPAX['ALdel'] = 5.0000
             digitized_LWK_polar_files_clcd = ["Re8e5_beta15_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re8e5_beta15_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-18"
 
         if run == "T026":
@@ -1595,12 +1767,12 @@ if __name__ == '__main__':
             PPAX['ALdel'] = 5.0000
             digitized_LWK_polar_files_clcd = ["Re1e6_beta15_cl-cd.txt"]
             digitized_LWK_polar_files_clalpha = ["Re1e6_beta15_cl-alpha.txt"]
-            if os.getlogin() == 'joeac':
+            if login == 'joeac':
                 WDIR = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/2024-06-18"
 
         # set calibration type in seg_def Excel file ("20sec", "manual", "file")
         # set flap deflection in seg_def Excel file
-        if os.getlogin() == 'joeac':
+        if login == 'joeac':
             segments_def_dir = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/testsegments_specification"
             digitized_LWK_polar_dir = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/Digitized data Döller LWK/"
             ref_dat_path = "C:/OneDrive/OneDrive - Achleitner Aerospace GmbH/ALF - General/Auto-Windkanal/07_Results/Mü13-33/01_Reference Data/"
@@ -1773,6 +1945,10 @@ if __name__ == '__main__':
     else:
         os.mkdir(figdir)
 
+    # on-disk cache of stage results; show statistics with "python result_cache.py stats <WDIR>/result_cache"
+    result_cache = ResultCache(os.path.join(WDIR, "result_cache"), max_bytes=result_cache_max_bytes,
+                               enabled=use_result_cache)
+
     list_of_df_polars = ([])
     list_of_polars = []
     list_of_eta_flaps = []
@@ -1788,165 +1964,125 @@ if __name__ == '__main__':
         segments_def_path = os.path.join(segments_def_dir, seg_def_file)
 
 
-        # read raw data filenames
-        raw_data_filenames = pd.read_excel(segments_def_path, skiprows=0, usecols="J").dropna().values.astype(
-            "str").flatten()
-        calibration_infos = pd.read_excel(segments_def_path, skiprows=0, usecols="K").dropna().values.astype(
-            "str").flatten()
-        etas_TE_flap = pd.read_excel(segments_def_path, skiprows=0, usecols="L").dropna().values.astype(
-            "float").flatten()
-        etas_LE_flap = pd.read_excel(segments_def_path, skiprows=0, usecols="M").dropna().values.astype(
-            "float").flatten()
-
-        # read segment times
-        df_segments = pd.read_excel(segments_def_path, skiprows=1, usecols="A:H").ffill(axis=0)
-        df_segments[["hh", "mm", "ss", "hh.1", "mm.1", "ss.1"]] = df_segments[["hh", "mm", "ss", "hh.1", "mm.1", "ss.1"]].astype(int)
-
-        df_segments['start'] = pd.to_datetime(df_segments['dd'].astype(str) + ' ' +
-                                              df_segments['hh'].astype(str) + ':' +
-                                              df_segments['mm'].astype(str) + ':' +
-                                              df_segments['ss'].astype(str),
-                                              errors='coerce', utc=True)
-        df_segments['end'] = pd.to_datetime(df_segments['dd.1'].astype(str) + ' ' +
-                                            df_segments['hh.1'].astype(str) + ':' +
-                                            df_segments['mm.1'].astype(str) + ':' +
-                                            df_segments['ss.1'].astype(str),
-                                            errors='coerce', utc=True)
-
-        df_segments = df_segments[['start', 'end']]
+        # read raw data filenames, calibration infos, flap angles and segment times
+        raw_data_filenames, calibration_infos, etas_TE_flap, etas_LE_flap, df_segments = \
+            read_segment_definition(segments_def_path)
 
         df_sync = pd.DataFrame()
         list_of_dfs = []
+        list_of_calibration_keys = []
 
         for i, filename in enumerate(raw_data_filenames):
-            eta_TE_flap = etas_TE_flap[i]
+            eta_TE_flap, eta_LE_flap = flap_angles(etas_TE_flap, etas_LE_flap, i)
             list_of_eta_flaps.append(eta_TE_flap)
-            if len(etas_LE_flap) == len(raw_data_filenames):
-                eta_LE_flap = etas_LE_flap[i]
-            elif etas_LE_flap.size > 0:
-                eta_LE_flap = etas_LE_flap[0]
-            else:
-                eta_LE_flap = 0
-
-            # read airfoil data (only in case of first file or if flap setting changes)
-            if i == 0 or not (etas_TE_flap == etas_TE_flap[0]).all() or len(np.unique(etas_LE_flap, return_counts=True)[0]) <= 1:
-                df_airfoil, at_airfoil = read_airfoil_geometry(file_path_msr_pts, c=l_ref, foil_source=foil_coord_path,
-                                                            eta_LE_flap=eta_LE_flap, eta_TE_flap=eta_TE_flap,
-                                                            flap_pivots=flap_pivots, pickle_file=pickle_path_msr_pts)
-
-            # calculate wall correction coefficients
-            lambda_wall, sigma_wall, xi_wall = calc_wall_correction_coefficients(cp_path_wall_correction, l_ref)
-
-            calibration_info = calibration_infos[i].split(";")
-            calibration_type = calibration_info[0]
-
-            if calibration_type not in ["None", "file", "20sec", "time interval"]:
-                calibration_filename = calibration_type
-                calibration_type = "manual"
-
-            file_path_drive = os.path.join(WDIR, f"{filename}_drive.dat")
-            file_path_AOA = os.path.join(WDIR, f"{filename}_AOA.dat")
-            file_path_pstat_K02 = os.path.join(WDIR, f"{filename}_static_K02.dat")
-            file_path_pstat_K03 = os.path.join(WDIR, f"{filename}_static_K03.dat")
-            file_path_pstat_K04 = os.path.join(WDIR, f"{filename}_static_K04.dat")
-            file_path_ptot_rake = os.path.join(WDIR, f"{filename}_ptot_rake.dat")
-            file_path_pstat_rake = os.path.join(WDIR, f"{filename}_pstat_rake.dat")
-            file_path_GPS = os.path.join(WDIR, f"{filename}_GPS.dat")
-            pickle_path_calibration = os.path.join(WDIR, f"{filename}_sensor_calibration_data.p")
-
-            # read sensor data
-            GPS = read_GPS(file_path_GPS)
-
-            alphas, delta_t_GPS_PC = read_AOA_file(file_path_AOA, sigma_wall, t0=GPS["Time"].iloc[0], alpha_sens_offset=alpha_sens_offset)
-            pstat_K02 = read_DLR_pressure_scanner_file(file_path_pstat_K02, n_sens=32, t0=GPS["Time"].iloc[0])
-            pstat_K03 = read_DLR_pressure_scanner_file(file_path_pstat_K03, n_sens=32, t0=GPS["Time"].iloc[0])
-            pstat_K04 = read_DLR_pressure_scanner_file(file_path_pstat_K04, n_sens=32, t0=GPS["Time"].iloc[0])
-            ptot_rake = read_DLR_pressure_scanner_file(file_path_ptot_rake, n_sens=32, t0=GPS["Time"].iloc[0])
-            pstat_rake = read_DLR_pressure_scanner_file(file_path_pstat_rake, n_sens=5, t0=GPS["Time"].iloc[0])
-
-            if sync_drive:
-                drive = read_drive(file_path_drive, t0=GPS["Time"].iloc[0], delta_t=delta_t_GPS_PC)
-
-            # synchronize sensor data
-            if sync_drive:
-                sync_data = [pstat_K02, pstat_K03, pstat_K04, ptot_rake, pstat_rake, alphas, drive, GPS]
-            else:
-                sync_data = [pstat_K02, pstat_K03, pstat_K04, ptot_rake, pstat_rake, alphas, GPS]
-            df_sync = synchronize_data(sync_data)
-
-            if calibration_type == "file":
-                # apply calibration offset from calibration file
-                df_sync, l_ref = apply_calibration_offset(pickle_path_calibration, df_sync)
-            elif calibration_type == "20sec":
-                # apply calibration offset from first 20 seconds
-                df_sync = apply_calibration_20sec(df_sync, T_air)
-            elif calibration_type == "manual":
-                df_sync = apply_manual_calibration(df_sync, calibration_filename="manual_calibration_data.p")
-            elif calibration_type == "time interval":
-                calibration_start_time = calibration_info[1].lstrip().rstrip()
-                calibration_end_time = calibration_info[2].lstrip().rstrip()
-                # Parse into datetime objects
-                calibration_start_time = datetime.strptime(calibration_start_time, "%Y-%m-%d %H:%M:%S").replace(
-                    tzinfo=timezone.utc)
-                calibration_end_time = datetime.strptime(calibration_end_time, "%Y-%m-%d %H:%M:%S").replace(
-                    tzinfo=timezone.utc)
-                df_sync = apply_time_interval_calibration(df_sync, calibration_start_time, calibration_end_time,
-                                                          prandtl_data, df_airfoil, defective_sensor_list, plot, figdir,
-                                                          T_air)
-            elif calibration_type == "None":
-                # no calibration is performed
-                df_sync["T_air"] = 288.15
-            else:
-                raise ValueError("wrong parameter 'calibration_type' passed. Either 'file', '20sec', 'manual' or 'manual2'")
+
+            # read airfoil data (served from geometry cache, if flap setting was already used)
+            df_airfoil, at_airfoil = read_airfoil_geometry(file_path_msr_pts, c=l_ref, foil_source=foil_coord_path,
+                                                           eta_LE_flap=eta_LE_flap, eta_TE_flap=eta_TE_flap,
+                                                           flap_pivots=flap_pivots, pickle_file=pickle_path_msr_pts)
+
+            # calculate wall correction coefficients (memoized, computed once per cp file and l_ref)
+            lambda_wall, sigma_wall, xi_wall = calc_wall_correction_coefficients(cp_path_wall_correction, l_ref,
+                                                                                 probe_position)
+
+            # read, synchronize and calibrate sensor data (cached)
+            df_sync, l_ref_calibration, calibration_key = load_measurement(
+                WDIR, filename, calibration_infos[i], df_airfoil, sigma_wall, alpha_sens_offset, sync_drive, T_air,
+                prandtl_data, defective_sensor_list, result_cache=result_cache,
+                sensor_check_dir=figdir if check_sensors else None, plot=plot, figdir=figdir, track_crs=track_crs)
+            if l_ref_calibration is not None:
+                l_ref = l_ref_calibration
 
             # append the processed data to the all_data DataFrame
             list_of_dfs.append(df_sync)
+            list_of_calibration_keys.append(calibration_key)
         if len(raw_data_filenames) > 1:
             df_sync = pd.concat(list_of_dfs)
 
-        df_raw = df_sync.copy()
+        # filter data (cached)
+        filter_key = hash_inputs(list_of_calibration_keys)
+        df_filt = result_cache.cached("filter", filter_key, lambda: filter_data(df_sync.copy()))
 
-        # filter data
-        df_filt = filter_data(df_raw.copy())
-
-        # calculate total reference pressure
+        # calculate unaveraged coefficients of raw and filtered data (cached)
         ptot_method_preprocessing = "trimmed average"
-        df_raw = calc_ptot_pstat(df_raw, defective_sensor_list, prandtl_data, total_ref_pressure_method=ptot_method_preprocessing)
-        df_filt = calc_ptot_pstat(df_filt, defective_sensor_list, prandtl_data, total_ref_pressure_method=ptot_method_preprocessing)
-
-        # calculate wind component
-        df_raw = calc_airspeed_wind(df_raw, l_ref)
-        df_filt = calc_airspeed_wind(df_filt, l_ref)
-
-        # calculate pressure coefficients
-        df_raw = calc_cp(df_raw, pressure_data_ident_strings=['stat', 'ptot'])
-        df_filt = calc_cp(df_filt, pressure_data_ident_strings=['stat', 'ptot'])
-
-        # calculate lift coefficients
-        df_raw, _ = calc_cl_cm_cdp(df_raw, df_airfoil, flap_pivots, lambda_wall, sigma_wall, xi_wall)
-        df_filt, sens_ident_cols = calc_cl_cm_cdp(df_filt, df_airfoil, flap_pivots, lambda_wall, sigma_wall,
-                                                      xi_wall)
-
-        # calculate drag coefficients
-        df_filt = calc_cd(df_filt, l_ref, lambda_wall, sigma_wall, xi_wall, defective_sensor_list, extrapol_flag=False)
+        wall_coefficients = [lambda_wall, sigma_wall, xi_wall]
+        time_series_key = hash_inputs(filter_key, df_airfoil, prandtl_data, l_ref, flap_pivots, wall_coefficients,
+                                      defective_sensor_list, ptot_method_preprocessing)
+        df_raw, df_filt, sens_ident_cols = result_cache.cached("time_series", time_series_key, calc_time_series,
+                                                               df_sync, df_filt, df_airfoil, prandtl_data, l_ref,
+                                                               flap_pivots, lambda_wall, sigma_wall, xi_wall,
+                                                               defective_sensor_list,
+                                                               total_ref_pressure_method=ptot_method_preprocessing)
+
+        # wind component and quality flag of time series
+        if calc_wind:
+            df_filt = estimate_wind(df_filt, df_raw["U_TAS"])
+
+        # multi-resolution store: pressures of synchronized data, coefficients of filtered data
+        if write_pyramid:
+            from pyramid_store import build_pyramid
+            derived_cols = [col for col in df_filt.columns if col not in df_sync.columns]
+            build_pyramid(pd.concat([df_sync, df_filt[derived_cols]], axis=1),
+                          os.path.join(figdir, "pyramid_" + os.path.splitext(seg_def_file)[0]))
+
+        # spectral analysis of pressure channels of segments, coherence with static pressure of Prandtl probe
+        if calc_spectra:
+            from spectral_analysis import spectral_table
+            df_spectra = spectral_table(df_sync, df_segments, reference=prandtl_data['unit name static'] + '_' +
+                                        str(prandtl_data['i_sens_static']))
+            df_spectra.to_csv(os.path.join(figdir, "spectra_" + os.path.splitext(seg_def_file)[0] + ".csv"))
 
         # visualisation of time series
         if plot:
             save_target = figdir if savefigs else None
-            plot_time_series(df_filt, df_segments, U_cutoff, save_target, plot_drive=sync_drive, i_seg_plot=i_seg_plot)
-
-        # generate the polar
-        df_polar = calculate_polar(df_sync, df_segments, prandtl_data, df_airfoil, l_ref, flap_pivots, lambda_wall,
-                                       sigma_wall, xi_wall, defective_sensor_list,
-                                       total_ref_pressure_method=ptot_method)
+            plot_time_series(df_filt, df_segments, U_cutoff, save_target, plot_drive=sync_drive, i_seg_plot=i_seg_plot,
+                             decimation=time_series_decimation)
+            if plot_segment_full_resolution:
+                plot_time_series(df_filt, df_segments, U_cutoff, save_target, plot_drive=sync_drive,
+                                 i_seg_plot=i_seg_plot, zoom_segment=i_seg_plot)
+
+        # generate the polar (cached)
+        polar_key = hash_inputs(list_of_calibration_keys, FileContent(segments_def_path), df_airfoil, prandtl_data,
+                                l_ref, flap_pivots, wall_coefficients, defective_sensor_list, ptot_method)
+        df_polar = result_cache.cached("polar", polar_key, calculate_polar, df_sync, df_segments, prandtl_data,
+                                       df_airfoil, l_ref, flap_pivots, lambda_wall, sigma_wall, xi_wall,
+                                       defective_sensor_list, total_ref_pressure_method=ptot_method)
+        traverse_result_cols = []
+        if sync_drive and use_traverse_drag:
+            from wake_traverse import apply_traverse_drag, traverse_drag
+            df_traverse = traverse_drag(df_raw, df_segments, l_ref, lambda_wall, sigma_wall, xi_wall,
+                                        defective_sensor_list, bin_width=traverse_bin_width)
+            df_polar = apply_traverse_drag(df_polar, df_traverse)
+            traverse_result_cols = ['cd_traverse_flag']
+        uncertainty_result_cols = []
+        if calc_uncertainty:
+            from polar_uncertainty import polar_uncertainty
+            df_polar = df_polar.join(polar_uncertainty(df_sync, df_segments, df_polar, prandtl_data, df_airfoil, l_ref,
+                                                       lambda_wall, sigma_wall, xi_wall, defective_sensor_list,
+                                                       total_ref_pressure_method=ptot_method,
+                                                       n_samples=n_uncertainty_samples))
+            uncertainty_result_cols = ['cl_lower', 'cl_upper', 'cd_lower', 'cd_upper']
+        wind_result_cols = []
+        if calc_wind:
+            df_polar = df_polar.join(segment_wind(df_filt, df_segments))
+            wind_result_cols = ['wind_component', 'gust_rms', 'wind_quality']
+            if reject_gusty_segments:
+                print(f"rejected segments (wind): {list(df_polar.index[~df_polar['wind_quality']])}")
+                df_polar = df_polar.loc[df_polar["wind_quality"]]
         df_polar_result_only = df_polar.loc[:, ['alpha', 'Re', 'cl', 'cd', 'cdp', "cd_extrapol_flag", 'U_CAS', 'U_TAS', 'cm',
-       'cmr_LE', 'cmr_TE',]]
+       'cmr_LE', 'cmr_TE',] + traverse_result_cols + uncertainty_result_cols + wind_result_cols]
         list_of_df_polars.append(df_polar)
 
+        # statistics of segments for cp(x) and wake figures and cp files
+        segment_stats = segment_statistics(df_raw, df_segments, df_polar, sens_ident_cols, defective_sensor_list)
+
         # plot cp(x) and cp wake
-        if plot:
-            save_target = figdir if savefigs else None
-            plot_cp_x_and_wake(df_raw, df_airfoil, at_airfoil, save_target, sens_ident_cols, df_segments, df_polar, defective_sensor_list)
+        if plot and savefigs:
+            plot_cp_x_and_wake(segment_stats, df_airfoil, at_airfoil, figdir, n_workers=n_plot_workers)
+
+        # write cp distributions of segments to XFOIL cp files
+        if export_cp_xfoil:
+            export_cp_files(segment_stats, df_airfoil, cp_export_dir, at_airfoil.filename.split(".dat")[0], run)
 
         # Generate PolarTool polar
         Re_mean = np.around(df_polar.loc[:, "Re"].mean() / 5e4)*5e4
@@ -1970,7 +2106,23 @@ if __name__ == '__main__':
         polar.parseMoProMa_Polar(df_polar)
         list_of_polars.append(polar)
 
-        polar.writeXFoilPol("C:/XFOIL6.99", "{0}_{1}.pol".format(at_airfoil.filename.split(".dat")[0], run))
+        with profiler.stage("xfoil_polar_export"):
+            polar.writeXFoilPol("C:/XFOIL6.99", "{0}_{1}.pol".format(at_airfoil.filename.split(".dat")[0], run))
+
+        # time resolved polar of sliding windows
+        if calc_rolling_polar:
+            from rolling_polar import rolling_polar
+            df_rolling = rolling_polar(df_filt, rolling_window_s, rolling_stride_s, min_speed=U_cutoff,
+                                       max_alpha_std=rolling_max_alpha_std)
+            df_rolling.to_csv(os.path.join(figdir, "rolling_polar_" + os.path.splitext(seg_def_file)[0] + ".csv"))
+            polar_rolling = at.PolarTool(name=polnames[i_file] + " rolling", Re=Re_mean, flapangle=eta_TE_flap,
+                                         WindtunnelName="MoProMa-Car")
+            polar_rolling.parseMoProMa_Polar(df_rolling)
+            with profiler.stage("xfoil_polar_export"):
+                polar_rolling.writeXFoilPol("C:/XFOIL6.99", "{0}_{1}_rolling.pol".format(
+                    at_airfoil.filename.split(".dat")[0], run))
+
+    result_cache.flush_stats()
 
     # read measured polar from LWK Stuttgart, digitized with getData graph digitizer
     polarsStu = list()
@@ -2091,7 +2243,12 @@ if __name__ == '__main__':
         os.chdir(cwd)
 
     # export polar
-    list_of_polars[0].writeXFoilPol("C:/XFOIL6.99", airfoil+".pol")
+    with profiler.stage("xfoil_polar_export"):
+        list_of_polars[0].writeXFoilPol("C:/XFOIL6.99", airfoil+".pol")
+
+    if profile:
+        profiler.print_table()
+        profiler.write_json(os.path.join(figdir, run + "_profile.json"))
 
     print("done")
 
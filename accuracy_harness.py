@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""
+differential accuracy harness: runs the reference implementations of Auswertung.py and the engines of
+fast_engines.py side by side on identical inputs and reports the maximum absolute and relative deviation of every
+output column against the tolerances below. Inputs are
+--> the example run in example_data (stages, for which raw data files are present)
+--> synthetic runs (synthetic_campaign.py), stage by stage and for the complete polar
+--> the live monitor (live_monitor.py) on a synthetic run, which is replayed into growing files and the monitor is
+    started late: segment means against the exact values, and refusal of the zero flow calibration, if the files start
+    in the flow
+--> the reference output example_data/20230926-171332_test_results.csv, compared with the time series of the
+    reference pipeline (only, if all raw data files of the example run are present). The settings of the example run
+    (B200 demonstrator) are in example_settings, the taps in example_data/Messpunkte Demonstrator.xlsx; without an
+    airfoil coordinate file (--foil) the contour of example_data/B200-0_reinitialized.cp is used
+
+A column passes, if |fast - reference| <= tol_abs + tol_rel * |reference| for all rows and NaNs are in the same rows.
+
+Usage:
+python accuracy_harness.py [--synthetic-seeds 0 1] [--duration 120] [--stages calc_cd calc_ptot_pstat] [--report FILE]
+                           [--foil B200-0_reinitialized.dat]
+"""
+import os
+import sys
+import argparse
+import fnmatch
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+import Auswertung
+import fast_engines
+from synthetic_campaign import generate_campaign
+from wall_correction import read_xfoil_cp
+
+example_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "example_data")
+example_filename = "20230926-1713"
+example_alpha_sens_offset = 214.73876953125
+reference_output_file = os.path.join(example_dir, "20230926-171332_test_results.csv")
+
+# evaluation settings of the example run (B200 demonstrator, 2023-09-26, see __main__ of Auswertung.py)
+example_settings = {"msr_pts_file": os.path.join(example_dir, "Messpunkte Demonstrator.xlsx"),
+                    "foil_cp_file": os.path.join(example_dir, "B200-0_reinitialized.cp"),
+                    "l_ref": 0.5,
+                    "flap_pivots": [[0.325, 0.0], [0.87, -0.004]],
+                    "defective_sensor_list": [0, 24],
+                    "prandtl_data": {"unit name static": "static_K04", "i_sens_static": 31,
+                                     "unit name total": "static_K04", "i_sens_total": 32},
+                    "T_air": 288.}
+
+# tolerances (tol_abs, tol_rel) per stage and output column (fnmatch patterns, first match is used)
+tolerances = {
+    "synchronize_data": {"*": (1e-6, 1e-9)},
+    "calc_ptot_pstat": {"ptot": (1e-6, 1e-12), "pstat": (0., 0.)},
+    "calc_cl_cm_cdp": {"cl": (1e-10, 1e-10), "cdp": (1e-10, 1e-10), "cm": (1e-10, 1e-10), "cmr_*": (1e-10, 1e-10),
+                       "static_*": (1e-12, 1e-12)},
+    "calc_cd": {"cd": (1e-10, 1e-8), "cd_extrapol": (1e-7, 1e-5), "cd_extrapol_flag": (0., 0.)},
+    "calculate_polar": {"alpha": (1e-6, 0.), "Re": (1e-3, 1e-9), "cl": (1e-6, 1e-6), "cd": (1e-6, 1e-5),
+                        "cdp": (1e-6, 1e-6), "cm": (1e-6, 1e-6), "cmr_*": (1e-6, 1e-6), "U_CAS": (1e-6, 1e-9),
+                        "U_TAS": (1e-6, 1e-9)},
+}
+
+# tolerances of the comparison with the reference output file (different software version, coarser)
+reference_output_tolerances = {"alpha": (0.05, 0.), "cl": (0.02, 0.02), "cd": (0.002, 0.05), "cm": (0.01, 0.02),
+                               "Re": (5000., 0.01), "U_TAS": (0.2, 0.01), "U_CAS": (0.2, 0.01)}
+
+# columns of the reference output file: columns of calc_time_series
+reference_output_columns = {"alpha": "alpha", "cl": "cl", "cd": "cd", "cdp": "cdp", "cm": "cm", "cmr_LEF": "cmr_LE",
+                            "cmr_TEF": "cmr_TE", "U_inf": "U_TAS", "U_IAS": "U_CAS", "Re": "Re",
+                            "drive_pos": "Rake Position", "drive_speed": "Rake Speed"}
+
+
+def _tolerance(column, column_tolerances):
+    for pattern, tol in column_tolerances.items():
+        if fnmatch.fnmatchcase(column, pattern):
+            return tol
+    return None
+
+
+def compare_frames(df_ref, df_fast, column_tolerances):
+    """
+    compares the columns of two results
+    :param df_ref:              result of reference implementation
+    :param df_fast:             result of engine (same index)
+    :param column_tolerances:   dict {column pattern: (tol_abs, tol_rel)}
+    :return:                    pandas DataFrame with max_abs, max_rel, tol_abs, tol_rel, passed per column
+    """
+    rows = []
+    if len(df_ref.index) != len(df_fast.index) or not (df_ref.index == df_fast.index).all():
+        rows.append({"column": "<index>", "max_abs": np.nan, "max_rel": np.nan, "tol_abs": 0., "tol_rel": 0.,
+                     "passed": False})
+        return pd.DataFrame(rows).set_index("column")
+
+    for column in df_ref.columns:
+        tol = _tolerance(column, column_tolerances)
+        if tol is None:
+            continue
+        tol_abs, tol_rel = tol
+        if column not in df_fast.columns:
+            rows.append({"column": column, "max_abs": np.nan, "max_rel": np.nan, "tol_abs": tol_abs,
+                         "tol_rel": tol_rel, "passed": False})
+            continue
+        ref = df_ref[column].to_numpy(dtype=float)
+        fast = df_fast[column].to_numpy(dtype=float)
+        nan_ref = np.isnan(ref)
+        valid = ~nan_ref & ~np.isnan(fast)
+        deviation = np.abs(fast[valid] - ref[valid])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative = deviation / np.abs(ref[valid])
+        passed = (nan_ref == np.isnan(fast)).all() and (deviation <= tol_abs + tol_rel * np.abs(ref[valid])).all()
+        rows.append({"column": column,
+                     "max_abs": deviation.max() if len(deviation) > 0 else 0.,
+                     "max_rel": np.nanmax(relative[np.isfinite(relative)]) if np.isfinite(relative).any() else 0.,
+                     "tol_abs": tol_abs, "tol_rel": tol_rel, "passed": bool(passed)})
+
+    return pd.DataFrame(rows, columns=["column", "max_abs", "max_rel", "tol_abs", "tol_rel", "passed"]) \
+        .set_index("column")
+
+
+@contextmanager
+def engines_enabled(stages=None):
+    """
+    replaces the reference implementations in Auswertung.py by the engines of fast_engines.py (e.g. to evaluate a
+    complete polar with the engines)
+    """
+    stages = list(fast_engines.engines.keys()) if stages is None else stages
+    originals = {name: getattr(Auswertung, name) for name in stages}
+    try:
+        for name in stages:
+            setattr(Auswertung, name, fast_engines.engines[name])
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(Auswertung, name, func)
+
+
+def _read_raw_data(data_dir, filename, alpha_sens_offset, sync_drive):
+    """
+    reads the raw data files present of one run
+    :return:    list of DataFrames to synchronize (same order as in read_and_synchronize)
+    """
+    paths = Auswertung.raw_data_paths(data_dir, filename, sync_drive)
+    GPS = Auswertung.read_GPS(paths["GPS"])
+    t0 = GPS["Time"].iloc[0]
+    alphas, delta_t_GPS_PC = Auswertung.read_AOA_file(paths["AOA"], 0., t0=t0, alpha_sens_offset=alpha_sens_offset)
+    sync_data = []
+    for name in ["static_K02", "static_K03", "static_K04", "ptot_rake", "pstat_rake"]:
+        if os.path.exists(paths[name]):
+            n_sens = 5 if name == "pstat_rake" else 32
+            sync_data.append(Auswertung.read_DLR_pressure_scanner_file(paths[name], n_sens=n_sens, t0=t0))
+    sync_data.append(alphas)
+    if sync_drive and os.path.exists(paths["drive"]):
+        sync_data.append(Auswertung.read_drive(paths["drive"], t0=t0, delta_t=delta_t_GPS_PC))
+    sync_data.append(GPS)
+    return sync_data
+
+
+def missing_raw_data(data_dir, filename):
+    return [path for path in Auswertung.raw_data_paths(data_dir, filename, sync_drive=True).values()
+            if not os.path.exists(path)]
+
+
+def check_stages(campaign, stages=None, ptot_methods=("trimmed average", "trimmed median", "gaussian_fit_average")):
+    """
+    runs reference and engine of every stage on the inputs of a synthetic run
+    :param campaign:        campaign dict (see generate_campaign)
+    :param stages:          list of stage names (default: all stages with engine and "calculate_polar")
+    :param ptot_methods:    total reference pressure methods checked in calc_ptot_pstat
+    :return:                dict {case name: comparison DataFrame}
+    """
+    stages = list(fast_engines.engines.keys()) + ["calculate_polar"] if stages is None else stages
+    results = dict()
+    prandtl_data = campaign["prandtl_data"]
+    defective_sensor_list = campaign["defective_sensor_list"]
+    df_airfoil = campaign["df_airfoil"]
+    l_ref = campaign["l_ref"]
+    flap_pivots = campaign["flap_pivots"]
+
+    sync_data = _read_raw_data(campaign["data_dir"], campaign["filename"], campaign["alpha_sens_offset"],
+                               campaign["sync_drive"])
+    df_sync = Auswertung.synchronize_data(sync_data)
+    if "synchronize_data" in stages:
+        results["synchronize_data"] = compare_frames(df_sync, fast_engines.synchronize_data(sync_data),
+                                                     tolerances["synchronize_data"])
+
+    _, calibration_infos, _, _, df_segments = Auswertung.read_segment_definition(campaign["seg_def_path"])
+    df_cal, _ = Auswertung.apply_calibration(df_sync, calibration_infos[0], None, campaign["T_air"], prandtl_data,
+                                             df_airfoil, defective_sensor_list)
+    # segment means as in calculate_polar (a curve fit per row is too slow for the full time series)
+    df_mean = pd.DataFrame([df_cal.loc[(df_cal.index >= start) & (df_cal.index <= end)].mean()
+                            for start, end in zip(df_segments["start"], df_segments["end"])])
+    df_filt = Auswertung.filter_data(df_cal.copy())
+
+    if "calc_ptot_pstat" in stages:
+        for method in ptot_methods:
+            df_in = df_mean if method == "gaussian_fit_average" else df_filt
+            results["calc_ptot_pstat ({0})".format(method)] = compare_frames(
+                Auswertung.calc_ptot_pstat(df_in, defective_sensor_list, prandtl_data, method),
+                fast_engines.calc_ptot_pstat(df_in, defective_sensor_list, prandtl_data, method),
+                tolerances["calc_ptot_pstat"])
+
+    df_ts = Auswertung.calc_ptot_pstat(df_filt, defective_sensor_list, prandtl_data, "trimmed average")
+    df_ts = Auswertung.calc_airspeed_wind(df_ts, l_ref)
+    df_ts = Auswertung.calc_cp(df_ts, pressure_data_ident_strings=['stat', 'ptot'])
+    if "calc_cl_cm_cdp" in stages:
+        df_ref, _ = Auswertung.calc_cl_cm_cdp(df_ts.copy(), df_airfoil, flap_pivots)
+        df_fast, _ = fast_engines.calc_cl_cm_cdp(df_ts.copy(), df_airfoil, flap_pivots)
+        results["calc_cl_cm_cdp"] = compare_frames(df_ref, df_fast, tolerances["calc_cl_cm_cdp"])
+
+    if "calc_cd" in stages:
+        results["calc_cd"] = compare_frames(
+            Auswertung.calc_cd(df_ts.copy(), l_ref, 0., 0., 0., defective_sensor_list),
+            fast_engines.calc_cd(df_ts.copy(), l_ref, 0., 0., 0., defective_sensor_list), tolerances["calc_cd"])
+        df_mean_cp = Auswertung.calc_ptot_pstat(df_mean, defective_sensor_list, prandtl_data, "trimmed average")
+        df_mean_cp = Auswertung.calc_cp(Auswertung.calc_airspeed_wind(df_mean_cp, l_ref), ['stat', 'ptot'])
+        results["calc_cd (extrapolated)"] = compare_frames(
+            Auswertung.calc_cd(df_mean_cp.copy(), l_ref, 0., 0., 0., defective_sensor_list, extrapol_flag=True),
+            fast_engines.calc_cd(df_mean_cp.copy(), l_ref, 0., 0., 0., defective_sensor_list, extrapol_flag=True),
+            tolerances["calc_cd"])
+
+    if "calculate_polar" in stages:
+        args = (df_segments, prandtl_data, df_airfoil, l_ref, flap_pivots, 0., 0., 0., defective_sensor_list)
+        df_polar_ref = Auswertung.calculate_polar(df_cal, *args, total_ref_pressure_method="gaussian_fit_average")
+        with engines_enabled():
+            df_sync_fast = Auswertung.synchronize_data(sync_data)
+            df_cal_fast, _ = Auswertung.apply_calibration(df_sync_fast, calibration_infos[0], None, campaign["T_air"],
+                                                          prandtl_data, df_airfoil, defective_sensor_list)
+            df_polar_fast = Auswertung.calculate_polar(df_cal_fast, *args,
+                                                       total_ref_pressure_method="gaussian_fit_average")
+        results["calculate_polar"] = compare_frames(df_polar_ref, df_polar_fast, tolerances["calculate_polar"])
+        results["calculate_polar (truth)"] = compare_truth(df_polar_ref, campaign["df_truth"])
+
+    return results
+
+
+def compare_truth(df_polar, df_truth, column_tolerances=None):
+    """
+    compares polar of the reference pipeline with the exact values of a synthetic run (checks the synthetic data
+    rather than the engines)
+    """
+    if column_tolerances is None:
+        column_tolerances = {"alpha": (0.02, 0.), "cl": (0.01, 0.01), "cd": (0.0005, 0.05)}
+    return compare_frames(df_truth.loc[:, list(column_tolerances)],
+                          df_polar.loc[:, list(column_tolerances)].reset_index(drop=True), column_tolerances)
+
+
+def _replay_live_monitor(campaign, out_dir, start_fraction=0., skip_fraction=0., n_chunks=100):
+    """
+    writes the raw data files of a synthetic run in chunks into out_dir and evaluates them with the live monitor
+    :param start_fraction:  fraction of the files written, before the monitor is started
+    :param skip_fraction:   fraction of the files left out at their start (recording started late)
+    :return:                tuple (LiveEvaluator, pandas DataFrame of all live results)
+    """
+    import shutil
+    from live_monitor import LiveEvaluator
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    evaluator = LiveEvaluator(out_dir, campaign["filename"], campaign["df_airfoil"], campaign["l_ref"],
+                              campaign["alpha_sens_offset"], campaign["prandtl_data"],
+                              defective_sensor_list=campaign["defective_sensor_list"],
+                              flap_pivots=campaign["flap_pivots"])
+    contents = dict()
+    for source_name, tail in evaluator.tails.items():
+        with open(os.path.join(campaign["data_dir"], os.path.basename(tail.path)), "rb") as file:
+            content = file.read()
+        header = b"".join(line + b"\n" for line in content.split(b"\n")[:tail.skip_lines])
+        start = content.index(b"\n", max(len(header), int(skip_fraction * len(content)))) + 1 \
+            if skip_fraction > 0. else len(header)
+        contents[tail.path] = header + content[start:]
+
+    results = []
+    for k in range(1, n_chunks + 1):
+        for path, content in contents.items():
+            with open(path, "ab") as file:
+                file.write(content[len(content) * (k - 1) // n_chunks:len(content) * k // n_chunks])
+        if k >= start_fraction * n_chunks:
+            df = evaluator.update()
+            if len(df) > 0:
+                results.append(df)
+    df_results = pd.concat(results) if len(results) > 0 else pd.DataFrame(columns=["alpha", "cl", "cd"])
+    return evaluator, df_results
+
+
+def check_live_monitor(campaign, out_dir, start_fraction=0.4, column_tolerances=None):
+    """
+    runs the live monitor on a synthetic run, started when start_fraction of the files is written. The offsets have
+    to come from the zero flow interval at the start of the files, the means of the live results of the segments
+    after the start are compared with the exact values. A monitor on files starting in the flow has to refuse the
+    zero flow calibration
+    :return:    dict {case name: comparison DataFrame}
+    """
+    if column_tolerances is None:
+        column_tolerances = {"alpha": (0.05, 0.), "cl": (0.02, 0.02), "cd": (0.001, 0.05)}
+    evaluator, df_live = _replay_live_monitor(campaign, os.path.join(out_dir, "late_start"),
+                                              start_fraction=start_fraction)
+    df_segments = campaign["df_segments"]
+    t_monitor = df_segments["start"].iloc[0] + start_fraction * (df_segments["end"].iloc[-1] -
+                                                                  df_segments["start"].iloc[0])
+    after_start = (df_segments["start"] > t_monitor).to_numpy()
+    df_means = pd.DataFrame([df_live.loc[(df_live.index >= start) & (df_live.index <= end),
+                                         list(column_tolerances)].mean()
+                             for start, end in zip(df_segments["start"][after_start],
+                                                   df_segments["end"][after_start])])
+    results = {"live monitor (late start)": compare_frames(
+        campaign["df_truth"].loc[after_start, list(column_tolerances)].reset_index(drop=True),
+        df_means.reset_index(drop=True), column_tolerances)}
+
+    evaluator, df_live = _replay_live_monitor(campaign, os.path.join(out_dir, "in_flow"), skip_fraction=0.4)
+    refused = evaluator.calibration_error is not None and len(df_live) == 0
+    results["live monitor (calibration in flow)"] = pd.DataFrame(
+        [{"column": "refused", "max_abs": float(not refused), "max_rel": np.nan, "tol_abs": 0., "tol_rel": 0.,
+          "passed": refused}]).set_index("column")
+    return results
+
+
+def check_example_run(data_dir=example_dir, filename=example_filename, alpha_sens_offset=example_alpha_sens_offset):
+    """
+    runs reference and engine of synchronize_data on the raw data files of the example run
+    :return:    dict {case name: comparison DataFrame}
+    """
+    sync_data = _read_raw_data(data_dir, filename, alpha_sens_offset, sync_drive=True)
+    return {"synchronize_data": compare_frames(Auswertung.synchronize_data(sync_data),
+                                               fast_engines.synchronize_data(sync_data),
+                                               tolerances["synchronize_data"])}
+
+
+def read_reference_output(filename=reference_output_file):
+    """
+    reads reference output file (time in s since start of the run) with columns renamed as in calc_time_series
+    """
+    df = pd.read_csv(filename, sep=r"\s+")
+    return df.rename(columns=reference_output_columns)
+
+
+def compare_reference_output(df_time_series, t_start, filename=reference_output_file, column_tolerances=None):
+    """
+    compares time series of the reference pipeline (e.g. df_filt of calc_time_series) with the reference output file
+    :param df_time_series:      DataFrame with DatetimeIndex
+    :param t_start:             time of the first line of the reference output file
+    :return:                    comparison DataFrame
+    """
+    if column_tolerances is None:
+        column_tolerances = reference_output_tolerances
+    df_ref = read_reference_output(filename)
+    t = (t_start + pd.to_timedelta(df_ref["time"], unit="s")).to_numpy().astype("datetime64[ns]").view("int64")
+    t_series = df_time_series.index.to_numpy().astype("datetime64[ns]").view("int64")
+    columns = [col for col in column_tolerances if col in df_ref.columns and col in df_time_series.columns]
+    df_interp = pd.DataFrame({col: np.interp(t, t_series, df_time_series[col].to_numpy(dtype=float))
+                              for col in columns})
+    return compare_frames(df_ref.loc[:, columns], df_interp, column_tolerances)
+
+
+def example_campaign_settings(foil_coord_path=None, work_dir="benchmark_results"):
+    """
+    evaluation settings of the example run with the tap geometry of example_settings
+    :param foil_coord_path: airfoil coordinate file; None: contour of the XFOIL cp file of example_settings, written as
+                            coordinate file to work_dir
+    :return:                dict with "df_airfoil", "prandtl_data", "l_ref", "flap_pivots", "defective_sensor_list"
+                            and "T_air"
+    """
+    s = example_settings
+    if foil_coord_path is None:
+        name = os.path.splitext(os.path.basename(s["foil_cp_file"]))[0]
+        foil_coord_path = os.path.join(work_dir, name + ".dat")
+        os.makedirs(work_dir, exist_ok=True)
+        np.savetxt(foil_coord_path, read_xfoil_cp(s["foil_cp_file"])[:, :2], fmt="%.5f", header=name, comments="")
+    df_airfoil, _ = Auswertung.read_airfoil_geometry(s["msr_pts_file"], c=s["l_ref"], foil_source=foil_coord_path,
+                                                     eta_TE_flap=0., eta_LE_flap=0., flap_pivots=s["flap_pivots"])
+    return {"df_airfoil": df_airfoil, "prandtl_data": s["prandtl_data"], "l_ref": s["l_ref"],
+            "flap_pivots": np.array(s["flap_pivots"]), "defective_sensor_list": s["defective_sensor_list"],
+            "T_air": s["T_air"]}
+
+
+def check_reference_output(data_dir=example_dir, filename=example_filename,
+                           alpha_sens_offset=example_alpha_sens_offset, campaign_settings=None, foil_coord_path=None):
+    """
+    evaluates the time series of the example run with the reference pipeline and compares it with the reference output
+    file. Requires all raw data files of the example run
+    :param campaign_settings:   dict with "df_airfoil", "prandtl_data", "l_ref", "flap_pivots", "defective_sensor_list"
+                                and "T_air"; None: example_campaign_settings(foil_coord_path)
+    :return:                    tuple (comparison DataFrame or None, reason if skipped)
+    """
+    missing = missing_raw_data(data_dir, filename)
+    if len(missing) > 0:
+        return None, "raw data files missing: " + ", ".join(os.path.basename(path) for path in missing)
+    if campaign_settings is None:
+        try:
+            campaign_settings = example_campaign_settings(foil_coord_path)
+        except ImportError as error:
+            # airfoilwinggeometry is needed for the tap positions
+            return None, "airfoil geometry of the example run not available ({0})".format(error)
+
+    s = campaign_settings
+    df_sync = Auswertung.read_and_synchronize(data_dir, filename, 0., alpha_sens_offset, sync_drive=True)
+    calibration_file = os.path.join(data_dir, os.path.basename(reference_output_file).replace(
+        "test_results.csv", "sensor_calibration_data.p"))
+    df_sync, _ = Auswertung.apply_calibration(df_sync, "file", calibration_file, s["T_air"], s["prandtl_data"],
+                                              s["df_airfoil"], s["defective_sensor_list"])
+    df_filt = Auswertung.filter_data(df_sync.copy())
+    _, df_filt, _ = Auswertung.calc_time_series(df_sync, df_filt, s["df_airfoil"], s["prandtl_data"], s["l_ref"],
+                                                s["flap_pivots"], 0., 0., 0., s["defective_sensor_list"])
+    return compare_reference_output(df_filt, df_sync.index[0]), None
+
+
+def print_results(name, results, n_columns=5):
+    """
+    prints status of every case with the columns closest to (or above) their tolerance
+    """
+    for case, df in results.items():
+        print("{0} / {1}: {2} ({3} columns)".format(name, case, "ok" if df["passed"].all() else "FAILED", len(df)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df = df.assign(usage=df["max_abs"] / df["tol_abs"])
+        df = df.sort_values(["passed", "usage"], ascending=[True, False]).head(n_columns)
+        print(df.drop(columns="usage").to_string(float_format="{0:.3e}".format))
+        print()
+
+
+def all_passed(results):
+    return all(df["passed"].all() for df in results.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="compares fast engines with the reference pipeline")
+    parser.add_argument("--synthetic-seeds", type=int, nargs="*", default=[0, 1], help="seeds of synthetic runs")
+    parser.add_argument("--duration", type=float, default=120., help="length of the synthetic runs in s")
+    parser.add_argument("--stages", nargs="+", default=None, help="stages to check (default: all)")
+    parser.add_argument("--data-dir", default=os.path.join("benchmark_results", "data"),
+                        help="directory of synthetic runs")
+    parser.add_argument("--report", default=None, help="CSV file of all comparisons")
+    parser.add_argument("--foil", default=None,
+                        help="airfoil coordinate file of the example run (default: contour of its XFOIL cp file)")
+    args = parser.parse_args()
+
+    all_results = dict()
+
+    all_results["example run"] = check_example_run()
+    df_reference, reason = check_reference_output(foil_coord_path=args.foil)
+    if df_reference is None:
+        print("WARNING: comparison with reference output {0} skipped ({1})\n".format(reference_output_file, reason),
+              file=sys.stderr)
+    else:
+        all_results["reference output"] = {"time series": df_reference}
+
+    for seed in args.synthetic_seeds:
+        campaign = generate_campaign(os.path.join(args.data_dir, "accuracy_s{0}".format(seed)),
+                                     duration=args.duration, seed=seed)
+        all_results["synthetic run {0}".format(seed)] = check_stages(campaign, stages=args.stages)
+        all_results["synthetic run {0}".format(seed)].update(
+            check_live_monitor(campaign, os.path.join(args.data_dir, "live_s{0}".format(seed))))
+
+    for name, results in all_results.items():
+        print_results(name, results)
+
+    if args.report is not None:
+        pd.concat({(name, case): df for name, results in all_results.items() for case, df in results.items()},
+                  names=["run", "case"]).to_csv(args.report)
+
+    passed = all(all_passed(results) for results in all_results.values())
+    print("all comparisons passed" if passed else "deviations above tolerance")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio acquisition gateway for the measurement streams of a test drive:
+--> receives scanner frames, AOA encoder readings and NMEA sentences over UDP and/or TCP. Every line is sent as
+    "<source> <line of the raw data file>", e.g. "static_K02 1523 98012.3 ...", "AOA 2023-09-26 15:13:32.801 7016 0"
+    or "GPS $GPRMC,...", one or more lines per UDP datagram
+--> writes everything to a compact binary journal (numeric rows as float64, NMEA sentences as text), which can be
+    exported to the usual raw data files for the offline evaluation
+--> publishes synchronized blocks (see live_monitor.StreamSynchronizer) to in-process consumers via asyncio queues
+--> replay of raw data files (e.g. example_data) at real or accelerated speed, so that the whole chain can be run on
+    one machine without hardware
+
+Usage:
+python acquisition_gateway.py serve --journal run.journal [--udp-port 5005] [--tcp-port 5006] [--geometry df_airfoil.p]
+python acquisition_gateway.py replay example_data 20230926-1713 [--speed 10] [--protocol udp] [--port 5005]
+python acquisition_gateway.py export run.journal out_dir 20230926-1713
+"""
+import os
+import json
+import time
+import socket
+import struct
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+
+from live_monitor import StreamSynchronizer, scanner_sources
+
+journal_magic = b"FTJ1"
+# record header: source index, receive time in ns, payload length in bytes
+record_header = struct.Struct("<BqI")
+# number of numeric fields per line (scanners: time, pressures, time delta; AOA: time in ms, position, turn)
+source_fields = dict([(unit_name, n_sens + 2) for unit_name, n_sens in scanner_sources] + [("AOA", 3), ("GPS", 0)])
+source_names = list(source_fields)
+
+max_datagram_size = 60000
+udp_receive_buffer = 2**23
+
+
+def lines_to_rows(source_name, lines):
+    """
+    converts lines of one source into the journal payload
+    :return:    numpy.ndarray of float64 rows (scanners, AOA) or list of NMEA sentences (GPS)
+    """
+    if source_name == "GPS":
+        return [line for line in lines if line.startswith("$")]
+    rows = [line.split() for line in lines]
+    rows = [row for row in rows if len(row) == (source_fields[source_name] + 1 if source_name == "AOA"
+                                                else source_fields[source_name])]
+    if source_name == "AOA":
+        t = np.array([row[0] + "T" + row[1] for row in rows], dtype="datetime64[ms]").astype(float)
+        return np.column_stack((t, np.array([row[2:] for row in rows], dtype=float).reshape(-1, 2)))
+    return np.array(rows, dtype=float).reshape(-1, source_fields[source_name])
+
+
+def rows_to_lines(source_name, rows):
+    """
+    inverse of lines_to_rows: lines in the format of the raw data files
+    """
+    if source_name == "GPS":
+        return list(rows)
+    if source_name == "AOA":
+        t = pd.to_datetime(rows[:, 0], unit="ms").strftime("%Y-%m-%d %H:%M:%S.%f").str[:-3]
+        return ["{0} {1:.0f} {2:.0f}".format(t_i, row[1], row[2]) for t_i, row in zip(t, rows)]
+    return [" ".join("{0:.10g}".format(value) for value in row) for row in rows]
+
+
+class JournalWriter:
+    """
+    binary journal of received data
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        header = json.dumps({"sources": source_names, "fields": source_fields}).encode()
+        self.file.write(journal_magic + struct.pack("<I", len(header)) + header)
+        self.n_bytes = self.file.tell()
+
+    def write(self, source_name, t_receive_ns, rows):
+        if source_name == "GPS":
+            payload = "\n".join(rows).encode("ascii")
+        else:
+            payload = np.ascontiguousarray(rows, dtype="<f8").tobytes()
+        if len(payload) == 0:
+            return
+        self.file.write(record_header.pack(source_names.index(source_name), t_receive_ns, len(payload)) + payload)
+        self.n_bytes += record_header.size + len(payload)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_journal(path):
+    """
+    reads a journal written by JournalWriter
+    :return:    generator of tuples (source name, receive time in ns, rows (see lines_to_rows))
+    """
+    with open(path, "rb") as file:
+        if file.read(4) != journal_magic:
+            raise ValueError(f"{path} is not a journal file")
+        header = json.loads(file.read(struct.unpack("<I", file.read(4))[0]))
+        while True:
+            record = file.read(record_header.size)
+            if len(record) < record_header.size:
+                return
+            i_source, t_receive_ns, n_bytes = record_header.unpack(record)
+            payload = file.read(n_bytes)
+            if len(payload) < n_bytes:
+                # incomplete last record of an interrupted journal
+                return
+            source_name = header["sources"][i_source]
+            if source_name == "GPS":
+                yield source_name, t_receive_ns, payload.decode("ascii").split("\n")
+            else:
+                yield source_name, t_receive_ns, np.frombuffer(payload, dtype="<f8").reshape(
+                    -1, header["fields"][source_name])
+
+
+def export_journal(path, out_dir, filename):
+    """
+    writes the content of a journal to raw data files ("<filename>_<source>.dat"), which can be read by Auswertung.py
+    :return:    list of written file paths
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    files = dict()
+    for source_name, _, rows in read_journal(path):
+        if source_name not in files:
+            files[source_name] = open(os.path.join(out_dir, f"{filename}_{source_name}.dat"), "w")
+            if source_name not in ("AOA", "GPS"):
+                # first line of scanner files is skipped by read_DLR_pressure_scanner_file
+                files[source_name].write(rows_to_lines(source_name, rows[:1])[0] + "\n")
+        files[source_name].writelines(line + "\n" for line in rows_to_lines(source_name, rows))
+    for file in files.values():
+        file.close()
+    return [file.name for file in files.values()]
+
+
+class AcquisitionGateway:
+    """
+    receives lines of all sources, journals them and publishes synchronized blocks
+    """
+
+    def __init__(self, journal_path, alpha_sens_offset, sigma_wall=0., block_interval=0.1, queue_size=100):
+        """
+        :param journal_path:        path of binary journal (None: no journal)
+        :param alpha_sens_offset:   AOA sensor offset
+        :param sigma_wall:          wall correction of alpha (see read_AOA_file)
+        :param block_interval:      interval of synchronization and publishing in s
+        :param queue_size:          number of blocks per consumer queue; oldest blocks are dropped for slow consumers
+        """
+        self.journal = JournalWriter(journal_path) if journal_path is not None else None
+        self.stream = StreamSynchronizer(alpha_sens_offset, sigma_wall)
+        self.block_interval = block_interval
+        self.queue_size = queue_size
+        self.queues = []
+        self.n_lines = dict((source_name, 0) for source_name in source_names)
+        # lines received since the last synchronization
+        self.pending_lines = dict((source_name, []) for source_name in source_names)
+        self.n_unknown = 0
+        self.n_blocks = 0
+        self.n_dropped = 0
+
+    def subscribe(self):
+        """
+        :return:    asyncio.Queue, which receives the synchronized blocks as pandas DataFrame (UTC time index)
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.queues.append(queue)
+        return queue
+
+    def handle_data(self, data, t_receive_ns=None):
+        """
+        :param data:    bytes with one or more complete lines "<source> <line>"
+        """
+        if t_receive_ns is None:
+            t_receive_ns = time.time_ns()
+        lines = dict()
+        for line in data.decode("ascii", errors="replace").splitlines():
+            source_name, _, line = line.strip().partition(" ")
+            if source_name in source_fields:
+                lines.setdefault(source_name, []).append(line)
+            elif source_name:
+                self.n_unknown += 1
+        for source_name, source_lines in lines.items():
+            self.n_lines[source_name] += len(source_lines)
+            if self.journal is not None:
+                self.journal.write(source_name, t_receive_ns, lines_to_rows(source_name, source_lines))
+            self.pending_lines[source_name] += source_lines
+
+    def publish(self):
+        """
+        synchronizes the received data and puts new blocks into the consumer queues
+        """
+        # synchronization once per block interval keeps the receiving part of the event loop short
+        for source_name, lines in self.pending_lines.items():
+            self.stream.add_lines(source_name, lines)
+            self.pending_lines[source_name] = []
+        t, values = self.stream.synchronize()
+        if self.journal is not None:
+            self.journal.flush()
+        if t is None:
+            return
+        block = pd.DataFrame(values, columns=self.stream.columns,
+                             index=pd.DatetimeIndex(t.view("datetime64[ns]"), name="Time").tz_localize("UTC"))
+        self.n_blocks += 1
+        for queue in self.queues:
+            if queue.full():
+                queue.get_nowait()
+                self.n_dropped += 1
+            queue.put_nowait(block)
+
+    async def _handle_tcp(self, reader, writer):
+        partial = b""
+        while True:
+            data = await reader.read(2**16)
+            if not data:
+                break
+            # complete lines only, the rest is kept for the next read
+            data = partial + data
+            i_split = data.rfind(b"\n") + 1
+            partial = data[i_split:]
+            if i_split > 0:
+                self.handle_data(data[:i_split])
+        writer.close()
+
+    async def serve(self, host="127.0.0.1", udp_port=5005, tcp_port=None, duration=None):
+        """
+        receives data until cancelled (or for duration seconds)
+        """
+        loop = asyncio.get_running_loop()
+        gateway = self
+
+        class _UDPProtocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                gateway.handle_data(data)
+
+        transport, server = None, None
+        if udp_port is not None:
+            # large receive buffer: datagrams arriving during synchronization and consumers are not lost
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, udp_receive_buffer)
+            sock.bind((host, udp_port))
+            transport, _ = await loop.create_datagram_endpoint(_UDPProtocol, sock=sock)
+        if tcp_port is not None:
+            server = await asyncio.start_server(self._handle_tcp, host, tcp_port)
+        t_end = None if duration is None else loop.time() + duration
+        try:
+            while t_end is None or loop.time() < t_end:
+                await asyncio.sleep(self.block_interval)
+                self.publish()
+        finally:
+            if transport is not None:
+                transport.close()
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+            self.publish()
+            if self.journal is not None:
+                self.journal.close()
+
+
+def replay_lines(data_dir, filename):
+    """
+    lines of the raw data files of a run with their time since start of the run
+    :return:    tuple (numpy.ndarray of times in s, list of lines "<source> <line>"), sorted by time
+    """
+    from live_monitor import parse_scanner_lines, parse_aoa_lines, parse_gps_lines
+
+    times, lines = [], []
+    for source_name in source_names:
+        path = os.path.join(data_dir, f"{filename}_{source_name}.dat")
+        if not os.path.exists(path):
+            continue
+        with open(path) as file:
+            source_lines = [line.strip() for line in file.readlines()]
+        if source_name == "GPS":
+            source_lines = [line for line in source_lines if "RMC" in line and len(parse_gps_lines([line])[0]) > 0]
+            t = parse_gps_lines(source_lines)[0] / 1e9
+        elif source_name == "AOA":
+            source_lines = [line for line in source_lines if len(line.split()) == 4]
+            t = parse_aoa_lines(source_lines, 0.)[0] / 1e9
+        else:
+            # first line is skipped by read_DLR_pressure_scanner_file
+            source_lines = [line for line in source_lines[1:] if len(line.split()) == source_fields[source_name]]
+            t = parse_scanner_lines(source_lines, source_fields[source_name] - 2)[0] / 1e3
+        if len(source_lines) > 0:
+            times.append(t - t[0])
+            lines += [source_name + " " + line for line in source_lines]
+    if len(times) == 0:
+        raise FileNotFoundError(f"no raw data files {filename}_*.dat in {data_dir}")
+    times = np.concatenate(times)
+    order = np.argsort(times, kind="stable")
+    return times[order], [lines[i] for i in order]
+
+
+async def replay(data_dir, filename, host="127.0.0.1", port=5005, protocol="udp", speed=1., chunk_s=0.01):
+    """
+    sends the raw data files of a run to a gateway
+    :param speed:       replay speed relative to real time (e.g. 10: ten times faster)
+    :param chunk_s:     lines within chunk_s seconds (run time) are sent together
+    :return:            number of sent lines
+    """
+    times, lines = replay_lines(data_dir, filename)
+    loop = asyncio.get_running_loop()
+    if protocol == "udp":
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+        send = transport.sendto
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+        send = writer.write
+
+    # chunks of lines
+    i_chunks = np.flatnonzero(np.diff(np.floor(times / chunk_s), prepend=-1) > 0)
+    i_chunks = np.append(i_chunks, len(lines))
+    t_start = loop.time()
+    for i_start, i_end in zip(i_chunks[:-1], i_chunks[1:]):
+        delay = t_start + times[i_start] / speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        data = "".join(line + "\n" for line in lines[i_start:i_end]).encode("ascii")
+        if protocol == "udp":
+            # datagrams with complete lines
+            while len(data) > max_datagram_size:
+                i_split = data.rindex(b"\n", 0, max_datagram_size) + 1
+                send(data[:i_split])
+                data = data[i_split:]
+            send(data)
+        else:
+            send(data)
+            await writer.drain()
+
+    if protocol == "udp":
+        transport.close()
+    else:
+        writer.close()
+        await writer.wait_closed()
+    return len(lines)
+
+
+async def print_blocks(queue):
+    """
+    example consumer: prints size and time range of the synchronized blocks
+    """
+    while True:
+        block = await queue.get()
+        print("{0:%H:%M:%S.%f} - {1:%H:%M:%S.%f}: {2} samples".format(block.index[0], block.index[-1], len(block)))
+
+
+async def evaluate_blocks(queue, evaluator):
+    """
+    consumer evaluating the synchronized blocks with a live_monitor.LiveEvaluator
+    """
+    while True:
+        block = await queue.get()
+        df = evaluator.process(block.index.as_unit("ns").asi8, block.to_numpy())
+        if len(df.index) > 0:
+            last = df.iloc[-1]
+            print("{0:%H:%M:%S}  alpha {1:6.2f}  cl {2:6.3f}  cd {3:7.4f}  cm {4:6.3f}  Re {5:8.0f}".format(
+                df.index[-1], last["alpha"], last["cl"], last["cd"], last["cm"], last["Re"]))
+
+
+async def _serve(args):
+    lambda_wall, sigma_wall, xi_wall = 0., 0., 0.
+    if args.cp_wall_correction is not None:
+        from wall_correction import calc_wall_correction_coefficients
+
+        lambda_wall, sigma_wall, xi_wall = calc_wall_correction_coefficients(args.cp_wall_correction, args.l_ref,
+                                                                             args.probe_position)
+    gateway = AcquisitionGateway(args.journal, args.alpha_sens_offset, sigma_wall)
+    if args.geometry is not None:
+        from live_monitor import LiveEvaluator
+
+        offsets = None
+        if args.calibration_file is not None:
+            from calibration import offsets_from_file
+
+            offsets, _, _ = offsets_from_file(args.calibration_file)
+        prandtl_data = {"unit name static": "static_K04", "i_sens_static": 31,
+                        "unit name total": "static_K04", "i_sens_total": 32}
+        evaluator = LiveEvaluator(None, None, pd.read_pickle(args.geometry), args.l_ref, args.alpha_sens_offset,
+                                  prandtl_data, defective_sensor_list=[0], lambda_wall=lambda_wall,
+                                  sigma_wall=sigma_wall, xi_wall=xi_wall, offsets=offsets)
+        consumer = asyncio.create_task(evaluate_blocks(gateway.subscribe(), evaluator))
+    else:
+        consumer = asyncio.create_task(print_blocks(gateway.subscribe()))
+    try:
+        await gateway.serve(args.host, args.udp_port, args.tcp_port, args.duration)
+    finally:
+        consumer.cancel()
+        print("received lines:", gateway.n_lines, "blocks:", gateway.n_blocks, "dropped blocks:", gateway.n_dropped)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="acquisition gateway and replay of raw data files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_serve = subparsers.add_parser("serve", help="receive, journal and publish data")
+    parser_serve.add_argument("--journal", default=None, help="path of binary journal")
+    parser_serve.add_argument("--host", default="127.0.0.1")
+    parser_serve.add_argument("--udp-port", type=int, default=5005)
+    parser_serve.add_argument("--tcp-port", type=int, default=None)
+    parser_serve.add_argument("--duration", type=float, default=None, help="stop after duration in s")
+    parser_serve.add_argument("--alpha-sens-offset", type=float, default=214.73876953125, help="AOA sensor offset")
+    parser_serve.add_argument("--geometry", default=None, help="pickle of tap DataFrame: evaluate blocks live")
+    parser_serve.add_argument("--l-ref", type=float, default=0.5, help="chord length in m")
+    parser_serve.add_argument("--cp-wall-correction", default=None,
+                              help="cp distribution file of the wall correction; default: no wall correction")
+    parser_serve.add_argument("--probe-position", type=float, nargs=2, default=None, metavar=("X", "Z"),
+                              help="static reference probe position relative to the leading edge in m")
+    parser_serve.add_argument("--calibration-file", default=None,
+                              help="calibration pickle (*_sensor_calibration_data.p) instead of the zero flow interval")
+
+    parser_replay = subparsers.add_parser("replay", help="send raw data files of a run to a gateway")
+    parser_replay.add_argument("data_dir")
+    parser_replay.add_argument("filename")
+    parser_replay.add_argument("--host", default="127.0.0.1")
+    parser_replay.add_argument("--port", type=int, default=5005)
+    parser_replay.add_argument("--protocol", choices=["udp", "tcp"], default="udp")
+    parser_replay.add_argument("--speed", type=float, default=1., help="replay speed relative to real time")
+
+    parser_export = subparsers.add_parser("export", help="write journal to raw data files")
+    parser_export.add_argument("journal")
+    parser_export.add_argument("out_dir")
+    parser_export.add_argument("filename")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(_serve(args))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "replay":
+        n_lines = asyncio.run(replay(args.data_dir, args.filename, args.host, args.port, args.protocol, args.speed))
+        print(f"sent {n_lines} lines")
+    else:
+        for path in export_journal(args.journal, args.out_dir, args.filename):
+            print(path)
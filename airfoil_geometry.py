@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+airfoil geometry service: pressure tap coordinates and normal vectors for arbitrary flap settings, cached in memory
+(LRU) and optionally persisted to a pickle file. scipy and airfoilwinggeometry are imported on first use
+"""
+import os
+import sys
+import pickle
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from profiling import profiler
+
+# locations of the airfoilwinggeometry repository, used if the package is not installed. Further locations can be set
+# in the environment variable AIRFOILWINGGEOMETRY_PATH (separated by os.pathsep)
+airfoilwinggeometry_paths = ["C:/git/airfoilwinggeometry", "D:/Python_Codes/Uebung1/modules/airfoilwinggeometry"]
+
+
+def import_airfoil_tools():
+    """
+    imports AirfoilTools of the airfoilwinggeometry package
+    :return:    AirfoilTools module
+    """
+    paths = os.environ.get("AIRFOILWINGGEOMETRY_PATH", "").split(os.pathsep) + airfoilwinggeometry_paths
+    for path in paths:
+        if path != "" and path not in sys.path and os.path.isdir(path):
+            sys.path.append(path)
+    from airfoilwinggeometry.AirfoilPackage import AirfoilTools
+    return AirfoilTools
+
+
+def file_hash(filename, chunk_size=1 << 20):
+    """
+    calculates sha1 hash of the content of a file
+    :param filename:        path of file
+    :param chunk_size:      number of bytes read at once
+    :return:                hex digest string
+    """
+    h = hashlib.sha1()
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def geometry_key(foil_source, msr_pts_file, c, flap_pivots, eta_LE_flap, eta_TE_flap):
+    """
+    generates cache key of an airfoil geometry. Coordinate file and measurement point Excel are identified by their
+    content, so renamed or moved files still hit the cache, while edited files do not
+    :param foil_source:     path of airfoil coordinate file
+    :param msr_pts_file:    path of Excel file with measurement points
+    :param c:               airfoil chord length
+    :param flap_pivots:     2x2 numpy.ndarray with positions of flap hinges
+    :param eta_LE_flap:     leading edge flap deflection angle
+    :param eta_TE_flap:     trailing edge flap deflection angle
+    :return:                tuple (geometry hash, eta_LE_flap, eta_TE_flap)
+    """
+    h = hashlib.sha1()
+    h.update(file_hash(foil_source).encode())
+    h.update(file_hash(msr_pts_file).encode())
+    h.update(np.float64(c).tobytes())
+    h.update(np.ascontiguousarray(flap_pivots, dtype=np.float64).tobytes())
+    return h.hexdigest(), float(eta_LE_flap), float(eta_TE_flap)
+
+
+class GeometryCache:
+    """
+    LRU cache of airfoil geometries (tap DataFrame and at.Airfoil object) for multiple flap angle pairs. If a pickle
+    file is given, the cache is loaded from it once and written back after every miss, so that the geometries are
+    also reused between runs
+    """
+
+    def __init__(self, pickle_file="", max_entries=16):
+        self.pickle_file = pickle_file
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if pickle_file != "" and os.path.exists(pickle_file):
+            try:
+                with open(pickle_file, "rb") as file:
+                    data = pickle.load(file)
+            except (EOFError, pickle.UnpicklingError, ValueError, AttributeError) as error:
+                # e.g. truncated file of an interrupted write: start with an empty cache
+                print(f"geometry cache {pickle_file} not readable ({error!r}), starting empty")
+                data = None
+            # pickle files of the old single-entry format ([df, foil, eta_LE, eta_TE]) are ignored
+            if isinstance(data, OrderedDict):
+                self.entries = data
+                self._evict()
+
+    def get(self, key):
+        """
+        returns cached (df, foil) tuple or None, if key is not cached
+        """
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        """
+        stores (df, foil) tuple and evicts least recently used entries
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self._evict()
+        if self.pickle_file != "":
+            # write to temporary file first, the pickle is shared by several runs and processes
+            tmp_path = "{0}.{1}.tmp".format(self.pickle_file, os.getpid())
+            with open(tmp_path, "wb") as file:
+                pickle.dump(self.entries, file)
+            os.replace(tmp_path, self.pickle_file)
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+# one cache per pickle file, kept alive for the whole batch run
+_caches = dict()
+
+
+def get_geometry_cache(pickle_file="", max_entries=16):
+    """
+    returns the in-memory geometry cache belonging to pickle_file (created on first call)
+    """
+    if pickle_file not in _caches:
+        _caches[pickle_file] = GeometryCache(pickle_file, max_entries=max_entries)
+    cache = _caches[pickle_file]
+    cache.max_entries = max_entries
+    return cache
+
+
+def build_airfoil_geometry(filename, c, foil_source, eta_TE_flap, eta_LE_flap, flap_pivots):
+    """
+    builds tap DataFrame and at.Airfoil object (see read_airfoil_geometry in Auswertung.py) without any caching
+    :param filename:            file name of Excel eg. "Messpunkte Demonstrator.xlsx".
+    :param c:                   airfoil chord length
+    :param foil_source:         string, path of airfoil coordinate file
+    :param eta_TE_flap:         trailing edge flap deflection angle
+    :param eta_LE_flap:         leading edge flap deflection angle
+    :param flap_pivots:         2x2 numpy.ndarray with positions of flap hinges
+    :return df, foil:           DataFrame with tap information and at.Airfoil object
+    """
+    from scipy import interpolate
+    at = import_airfoil_tools()
+
+    # initialize airfoilTools object
+    foil = at.Airfoil(foil_source)
+
+    if eta_TE_flap != 0.0:
+        foil.flap(xFlap=flap_pivots[1, 0], yFlap=flap_pivots[1, 1], etaFlap=eta_TE_flap)
+    if eta_LE_flap != 0.0:
+        foil.LEflap(xFlap=flap_pivots[0, 0], yFlap=flap_pivots[0, 1], etaFlap=eta_LE_flap)
+
+    # Read Excel file
+    df = pd.read_excel(filename, usecols="A:F", skiprows=1, skipfooter=1)
+    df = df.dropna(subset=['Sensor unit K', 'Sensor port'])
+    df = df.drop(df[df["Kommentar"] == "inop"].index).reset_index(drop=True)
+    df = df.astype({'Messpunkt': 'int32', 'Sensor unit K': 'int32', 'Sensor port': 'int32'})
+
+    # arc length table of the (flapped) airfoil contour
+    table = arc_length_table(foil.tck, u_end=foil.u[-1])
+
+    # append virtual trailing edge pressure taps (pressure is mean between last sensor at to and bottom side)
+    df_virt_top = pd.DataFrame([[np.nan, "virtual_top", 0, -1, -1, np.nan]], columns=df.columns)
+    # virtual bottom trailing edge tap: s value must be calculated
+    df_virt_bot = pd.DataFrame([[np.nan, "virtual_bot", table[1][-1]*c*1000, -1, -1, np.nan]],
+                               columns=df.columns)
+    df = pd.concat([df_virt_top, df, df_virt_bot]).reset_index(drop=True)
+
+    df["s"] = df["Position [mm]"]/(c*1000)
+
+    # invert arc length for all taps at once
+    u_taps = invert_arc_length(df["s"].to_numpy(), foil.tck, table)
+
+    coords_taps = np.array(interpolate.splev(u_taps, foil.tck)).T
+    n_taps = np.dot(unit_tangent(u_taps, foil.tck), np.array([[0, -1], [1, 0]]))
+
+    df["x"] = coords_taps[:, 0]
+    df["y"] = coords_taps[:, 1]
+
+    df["x_n"] = n_taps[:, 0]
+    df["y_n"] = n_taps[:, 1]
+
+    return df, foil
+
+
+# Gauss-Legendre nodes and weights on [0, 1] for the arc length integration of one table interval
+_GL_NODES, _GL_WEIGHTS = np.polynomial.legendre.leggauss(8)
+_GL_NODES = 0.5 * (_GL_NODES + 1.0)
+_GL_WEIGHTS = 0.5 * _GL_WEIGHTS
+
+
+def _speed(u, tck):
+    """
+    |dr/du| of the spline curve, evaluated for an array of curve parameters
+    """
+    from scipy import interpolate
+    dx, dy = interpolate.splev(u, tck, der=1)
+    return np.hypot(dx, dy)
+
+
+def _arc_length_increment(u_a, u_b, tck):
+    """
+    arc length between curve parameters u_a and u_b (arrays of equal shape), Gauss-Legendre quadrature
+    """
+    u_a = np.asarray(u_a, dtype=float)
+    du = np.asarray(u_b, dtype=float) - u_a
+    u_gl = u_a[..., np.newaxis] + du[..., np.newaxis] * _GL_NODES
+    return du * np.sum(_speed(u_gl.ravel(), tck).reshape(u_gl.shape) * _GL_WEIGHTS, axis=-1)
+
+
+def arc_length_table(tck, u_start=0.0, u_end=1.0, n_table=2001):
+    """
+    precomputes dense table of the arc length s(u) of a spline curve, starting at u_start (trailing edge)
+    :param tck:         spline representation (e.g. at.Airfoil.tck)
+    :param u_start:     first curve parameter
+    :param u_end:       last curve parameter
+    :param n_table:     number of table points
+    :return:            tuple (u, s) of numpy.ndarrays
+    """
+    u = np.linspace(u_start, u_end, n_table)
+    s = np.concatenate(([0.0], np.cumsum(_arc_length_increment(u[:-1], u[1:], tck))))
+    return u, s
+
+
+def arc_length(u, tck, table):
+    """
+    calculates arc lengths of an array of curve parameters: table value at the next lower table point plus quadrature
+    of the remaining interval
+    :param u:           numpy.ndarray of curve parameters
+    :param tck:         spline representation
+    :param table:       tuple (u, s) from arc_length_table
+    :return:            numpy.ndarray of arc lengths
+    """
+    u_table, s_table = table
+    j = np.clip(np.searchsorted(u_table, u, side="right") - 1, 0, len(u_table) - 2)
+    return s_table[j] + _arc_length_increment(u_table[j], u, tck)
+
+
+def invert_arc_length(s, tck, table, n_newton=4):
+    """
+    calculates curve parameters u of an array of arc lengths s. Start values are interpolated from the arc length
+    table, then all values are refined simultaneously with Newton iterations (ds/du = |dr/du|)
+    :param s:           numpy.ndarray of arc lengths
+    :param tck:         spline representation
+    :param table:       tuple (u, s) from arc_length_table
+    :param n_newton:    number of Newton iterations
+    :return:            numpy.ndarray of curve parameters
+    """
+    u_table, s_table = table
+    s = np.asarray(s, dtype=float)
+
+    u = np.interp(s, s_table, u_table)
+    profiler.count("root_solve", np.size(u))
+    for _ in range(n_newton):
+        u = np.clip(u - (arc_length(u, tck, table) - s) / _speed(u, tck), u_table[0], u_table[-1])
+
+    return u
+
+
+def invert_x(x, topside, tck, table, n_newton=4):
+    """
+    calculates curve parameters u of an array of x coordinates on the upper or lower airfoil surface. Start values
+    are interpolated from x(u) at the arc length table points of the respective surface, then refined simultaneously
+    with Newton iterations
+    :param x:           numpy.ndarray of x coordinates
+    :param topside:     boolean numpy.ndarray, True for points on the upper surface (trailing edge to leading edge)
+    :param tck:         spline representation
+    :param table:       tuple (u, s) from arc_length_table
+    :param n_newton:    number of Newton iterations
+    :return:            numpy.ndarray of curve parameters
+    """
+    from scipy import interpolate
+    u_table = table[0]
+    x = np.asarray(x, dtype=float)
+    topside = np.asarray(topside, dtype=bool)
+
+    # split contour at leading edge (minimum x)
+    x_table = interpolate.splev(u_table, tck)[0]
+    i_LE = np.argmin(x_table)
+
+    # x decreases on upper surface, so both branches are reversed/ordered for np.interp
+    u = np.where(topside,
+                 np.interp(x, x_table[i_LE::-1], u_table[i_LE::-1]),
+                 np.interp(x, x_table[i_LE:], u_table[i_LE:]))
+    u_lo = np.where(topside, u_table[0], u_table[i_LE])
+    u_hi = np.where(topside, u_table[i_LE], u_table[-1])
+
+    profiler.count("root_solve", np.size(u))
+    for _ in range(n_newton):
+        x_u = interpolate.splev(u, tck)[0]
+        dx_du = interpolate.splev(u, tck, der=1)[0]
+        # avoid division by zero at leading edge, where dx/du vanishes
+        dx_du = np.where(np.abs(dx_du) < 1e-12, np.copysign(1e-12, dx_du), dx_du)
+        u = np.clip(u - (x_u - x) / dx_du, u_lo, u_hi)
+
+    return u
+
+
+def unit_tangent(u, tck):
+    """
+    unit tangent vectors of the spline curve for an array of curve parameters
+    :return:        numpy.ndarray of shape (len(u), 2)
+    """
+    from scipy import interpolate
+    d = np.array(interpolate.splev(u, tck, der=1)).T
+    return d / np.linalg.norm(d, axis=1)[:, np.newaxis]
@@ -1,33 +1,94 @@
-from airfoilwinggeometry.AirfoilPackage import AirfoilTools as at
-import pandas as pd
+"""
+converts normalized x positions of pressure taps (column "x_norm" of the measurement point sheet) to line coordinates
+s around the airfoil contour, starting at the trailing edge
+
+Usage:
+python airfoil_x_to_s.py "Messpunkte Demonstrator_Mue13-33.xlsx" --airfoil mue13-33-le15.dat
+                         [--airfoil ...] [--sheet Tabelle2 ...] [--chord 700] [--out out.xlsx]
+"""
 import os
+import argparse
+import numpy as np
+import pandas as pd
+from airfoil_geometry import arc_length, arc_length_table, import_airfoil_tools, invert_x
 
-if os.getlogin() == 'joeac':
-    WDIR = "C:/WDIR/MoProMa_Auswertung/"
-else:
-    WDIR = "D:/Python_Codes/Workingdirectory_Auswertung"
+cols = ["Messpunkt Name", "Name Auswertung", "x", "x_norm"]
 
-file_path_messpkt = os.path.join(WDIR, 'Messpunkte Demonstrator_Mue13-33.xlsx')
-file_path_messpkt_new = os.path.join(WDIR, 'Messpunkte Demonstrator_Mue13-33_new.xlsx')
-file_path_airfoil = "C:/XFOIL6.99/mue13-33-le15.dat"
 
-cols = ["Messpunkt Name", "Name Auswertung", "x", "x_norm"]
+def convert_x_to_s(df, foil, chord, table=None):
+    """
+    adds columns "s_norm" and "s" to the measurement point DataFrame. Taps up to the one with the lowest x_norm are
+    located on the upper surface, all following taps on the lower surface
+    :param df:          pandas DataFrame with column "x_norm"
+    :param foil:        at.Airfoil object
+    :param chord:       chord length used to scale s_norm to s (e.g. in mm)
+    :param table:       arc length table of foil (see airfoil_geometry.arc_length_table). Calculated, if None
+    :return:            pandas DataFrame with s_norm and s columns
+    """
+    if table is None:
+        table = arc_length_table(foil.tck, u_end=foil.u[-1])
+
+    x_norm = df["x_norm"].to_numpy(dtype=float)
+    # NaN entries (e.g. empty rows of the sheet) are skipped as by Series.argmin
+    topside = np.arange(len(x_norm)) <= np.nanargmin(x_norm)
+
+    u = invert_x(x_norm, topside, foil.tck, table)
+
+    df = df.copy()
+    df["s_norm"] = arc_length(u, foil.tck, table)
+    df["s"] = df["s_norm"] * chord
+
+    return df
+
+
+def convert_excel(file_path_messpkt, airfoil_files, sheet_names=("Tabelle2",), chord=700., file_path_out=None):
+    """
+    converts all given sheets of the measurement point Excel for all given airfoils. The arc length table is built
+    only once per airfoil
+    :param file_path_messpkt:   path of Excel with measurement points
+    :param airfoil_files:       list of paths of airfoil coordinate files
+    :param sheet_names:         list of sheet names
+    :param chord:               chord length used to scale s_norm to s
+    :param file_path_out:       path of output Excel. One sheet per airfoil and input sheet is written. If None, the
+                                results are only returned
+    :return:                    dict {(airfoil file, sheet name): pandas DataFrame}
+    """
+    sheets = pd.read_excel(file_path_messpkt, names=cols, sheet_name=list(sheet_names), usecols="B:E", skiprows=0)
+
+    at = import_airfoil_tools()
 
-df = pd.read_excel(file_path_messpkt, names=cols, sheet_name="Tabelle2", usecols="B:E", skiprows=0)
+    results = dict()
+    for airfoil_file in airfoil_files:
+        foil = at.Airfoil(airfoil_file)
+        table = arc_length_table(foil.tck, u_end=foil.u[-1])
+        for sheet_name in sheet_names:
+            results[(airfoil_file, sheet_name)] = convert_x_to_s(sheets[sheet_name], foil, chord, table=table)
 
-foil = at.Airfoil(file_path_airfoil)
+    if file_path_out is not None:
+        with pd.ExcelWriter(file_path_out) as writer:
+            for (airfoil_file, sheet_name), df in results.items():
+                if len(airfoil_files) > 1:
+                    # excel sheet names are limited to 31 characters
+                    sheet_name = "{0}_{1}".format(os.path.splitext(os.path.basename(airfoil_file))[0],
+                                                  sheet_name)[:31]
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
 
+    return results
 
 
-for i in df.index:
-    if i > df.loc[:, "x_norm"].argmin():
-        topside = False
-    else:
-        topside = True
-    s = at.s_curve(at.usearch_x(df.loc[i, "x_norm"], foil.tck, topside=topside), foil.tck)
-    df.loc[i, "s_norm"] = s
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="convert pressure tap x positions to line coordinates s")
+    parser.add_argument("messpkt", help="Excel file with measurement points")
+    parser.add_argument("--airfoil", action="append", required=True, help="airfoil coordinate file (repeatable)")
+    parser.add_argument("--sheet", action="append", help="sheet name (repeatable), default: Tabelle2")
+    parser.add_argument("--chord", type=float, default=700., help="chord length to scale s_norm, default: 700")
+    parser.add_argument("--out", help="output Excel, default: <messpkt>_new.xlsx")
+    args = parser.parse_args()
 
-df.loc[:, "s"] = df.loc[:, "s_norm"] * 700
+    file_path_messpkt_new = args.out
+    if file_path_messpkt_new is None:
+        file_path_messpkt_new = os.path.splitext(args.messpkt)[0] + "_new.xlsx"
 
-df.to_excel(file_path_messpkt_new, index=False)
-print("done")
+    convert_excel(args.messpkt, args.airfoil, sheet_names=args.sheet or ["Tabelle2"], chord=args.chord,
+                  file_path_out=file_path_messpkt_new)
+    print("done")
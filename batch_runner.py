@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+batch evaluation of whole test campaigns. Runs are defined declaratively in JSON campaign files (instead of editing
+airfoil and run in __main__ of Auswertung.py) and are evaluated concurrently in a process pool. Airfoil geometries and
+reference polars are prepared once in the main process and handed to every worker on start-up, so workers share them
+read-only instead of rebuilding them per run.
+
+Output: one polar file per run ("<run>_polar.csv") and a summary table ("summary.csv") in the output directory
+
+Campaign file:
+{
+  "output_dir": "batch_results",
+  "n_workers": 4,
+  "defaults": {"l_ref": 0.5, "flap_pivots": [[0.325, 0.09], [0.87, -0.004]], ...},
+  "runs": [{"name": "T012_R27", "data_dir": "...", "seg_def_files": ["T012_R027.xlsx"], ...}, ...]
+}
+Every run entry is merged with "defaults" and completed by pipeline.make_config (see default_config and required_keys
+of pipeline.py). Relative paths are relative to the campaign file. With "calc_wind": true, the polar files contain the
+wind columns (see wind_polar_columns of pipeline.py).
+
+Usage:
+python batch_runner.py campaign.json [campaign2.json ...] [--workers N] [--output DIR] [--runs T010_R23 T012_R27]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+from Auswertung import read_segment_definition, flap_angles, read_airfoil_geometry
+from airfoil_geometry import geometry_key, get_geometry_cache, import_airfoil_tools
+from pipeline import make_config, evaluate_polar
+from profiling import profiler
+
+# read-only data shared by the main process (set by _init_worker)
+_reference_polars = dict()
+
+
+def load_campaign(config_file):
+    """
+    reads a campaign file and returns the complete run definitions
+    :param config_file:     path of JSON campaign file
+    :return:                tuple (list of run configurations, campaign options dict with "output_dir" and "n_workers")
+    """
+    with open(config_file, encoding="utf-8") as file:
+        campaign = json.load(file)
+
+    base_dir = os.path.dirname(os.path.abspath(config_file))
+    try:
+        runs = [make_config(run_def, defaults=campaign.get("defaults"), base_dir=base_dir)
+                for run_def in campaign["runs"]]
+    except ValueError as error:
+        raise ValueError("{0}: {1}".format(config_file, error))
+
+    options = {"output_dir": os.path.join(base_dir, campaign.get("output_dir", "batch_results")),
+               "n_workers": campaign.get("n_workers", None)}
+
+    return runs, options
+
+
+def prepare_shared_data(runs):
+    """
+    builds airfoil geometries of all flap settings used in the campaign and reads the reference polars once
+    :param runs:    list of run configurations
+    :return:        tuple (geometries {pickle file: {geometry key: (df, foil)}}, reference polars {path: PolarTool})
+    """
+    at = import_airfoil_tools()
+
+    geometries = dict()
+    reference_polars = dict()
+    for run in runs:
+        cache = get_geometry_cache(run["pickle_path_msr_pts"])
+        for seg_def_file in run["seg_def_files"]:
+            raw_data_filenames, _, etas_TE_flap, etas_LE_flap, _ = \
+                read_segment_definition(os.path.join(run["segments_def_dir"], seg_def_file))
+            for i in range(len(raw_data_filenames)):
+                eta_TE_flap, eta_LE_flap = flap_angles(etas_TE_flap, etas_LE_flap, i)
+                read_airfoil_geometry(run["file_path_msr_pts"], c=run["l_ref"], foil_source=run["foil_coord_path"],
+                                      eta_LE_flap=eta_LE_flap, eta_TE_flap=eta_TE_flap,
+                                      flap_pivots=run["flap_pivots"], pickle_file=run["pickle_path_msr_pts"])
+                key = geometry_key(run["foil_coord_path"], run["file_path_msr_pts"], run["l_ref"],
+                                   run["flap_pivots"], eta_LE_flap, eta_TE_flap)
+                geometries.setdefault(run["pickle_path_msr_pts"], dict())[key] = cache.entries[key]
+
+        for XFOIL_polar_file in run["XFOIL_polar_files"]:
+            path = os.path.join(run["ref_dat_path"], XFOIL_polar_file)
+            if path not in reference_polars:
+                reference_polars[path] = at.PolarTool(name=XFOIL_polar_file.split(".pol")[0])
+                reference_polars[path].ImportXFoilPolar(path, drag_correction_factor=1.12)
+
+    return geometries, reference_polars
+
+
+def _init_worker(geometries, reference_polars):
+    """
+    initializer of the worker processes: fills the in-memory geometry caches and stores the reference polars
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+    for pickle_file, entries in geometries.items():
+        get_geometry_cache(pickle_file).entries.update(entries)
+    _reference_polars.update(reference_polars)
+
+
+def evaluate_run(run, output_dir):
+    """
+    evaluates all segment definition files of one run and writes its polar file
+    :param run:         run configuration (see pipeline.make_config)
+    :param output_dir:  directory of polar files
+    :return:            dict with one row of the summary table
+    """
+    t_start = time.perf_counter()
+    summary = {"run": run["name"], "status": "ok"}
+    try:
+        sensor_check_dir = output_dir if run["check_sensors"] else None
+        if run["profile"]:
+            profiler.reset()
+            profiler.enable()
+            try:
+                df_polar = evaluate_polar(run, sensor_check_dir=sensor_check_dir)
+            finally:
+                profiler.disable()
+            profiler.write_json(os.path.join(output_dir, "{0}_profile.json".format(run["name"])))
+        else:
+            df_polar = evaluate_polar(run, sensor_check_dir=sensor_check_dir)
+
+        polar_file = os.path.join(output_dir, "{0}_polar.csv".format(run["name"]))
+        df_polar.to_csv(polar_file, index=False)
+
+        if run["plot_polar"]:
+            plot_run_polar(run, df_polar, output_dir)
+
+        summary.update({"n_points": len(df_polar),
+                        "Re_mean": df_polar["Re"].mean(),
+                        "alpha_min": df_polar["alpha"].min(),
+                        "alpha_max": df_polar["alpha"].max(),
+                        "cl_max": df_polar["cl"].max(),
+                        "cd_min": df_polar["cd"].min(),
+                        "cl_cd_max": (df_polar["cl"] / df_polar["cd"]).max(),
+                        "polar_file": polar_file})
+        if "wind_quality" in df_polar.columns:
+            summary.update({"gust_rms_max": df_polar["gust_rms"].max(),
+                            "n_gusty": int((~df_polar["wind_quality"].astype(bool)).sum())})
+    except Exception as error:
+        summary["status"] = "failed: {0!r}".format(error)
+        traceback.print_exc()
+
+    summary["runtime_s"] = time.perf_counter() - t_start
+    return summary
+
+
+def plot_run_polar(run, df_polar, output_dir):
+    """
+    saves plot of the measured polar together with the reference polars of the run ("Polar_<run>.pdf")
+    """
+    at = import_airfoil_tools()
+    polar = at.PolarTool(name=run["name"], Re=np.around(df_polar["Re"].mean() / 5e4) * 5e4,
+                         flapangle=df_polar["eta_TE_flap"].iloc[0], WindtunnelName="MoProMa-Car")
+    polar.parseMoProMa_Polar(df_polar)
+    reference_polars = [_reference_polars[os.path.join(run["ref_dat_path"], f)] for f in run["XFOIL_polar_files"]]
+
+    plot_kwargs = dict() if run["PPAX"] is None else {"PPAX": run["PPAX"]}
+
+    cwd = os.getcwd()
+    os.chdir(output_dir)
+    try:
+        polar.plotPolar(additionalPolars=reference_polars, Colorplot=True, saveFlag=True, format="pdf",
+                        saveFileName="Polar_" + run["name"], **plot_kwargs)
+    finally:
+        os.chdir(cwd)
+
+
+def run_campaign(runs, output_dir, n_workers=None):
+    """
+    evaluates runs concurrently in a process pool and writes summary table
+    :param runs:        list of run configurations (see load_campaign)
+    :param output_dir:  directory of polar files and summary table
+    :param n_workers:   number of worker processes. If None, number of CPUs
+    :return:            summary table as pandas DataFrame
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    names = [run["name"] for run in runs]
+    if len(set(names)) != len(names):
+        raise ValueError("run names are not unique: " + ", ".join(names))
+
+    geometries, reference_polars = prepare_shared_data(runs)
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(geometries, reference_polars)) as executor:
+        futures = {executor.submit(evaluate_run, run, output_dir): run["name"] for run in runs}
+        for future in as_completed(futures):
+            summary = future.result()
+            print("{0}: {1} ({2:.1f} s)".format(summary["run"], summary["status"], summary["runtime_s"]))
+            summaries.append(summary)
+
+    df_summary = pd.DataFrame(summaries).set_index("run").loc[names]
+    df_summary.to_csv(os.path.join(output_dir, "summary.csv"))
+
+    return df_summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="evaluates all runs of one or several campaign files")
+    parser.add_argument("campaigns", nargs="+", help="JSON campaign files")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--output", default=None, help="output directory (default: output_dir of first campaign)")
+    parser.add_argument("--runs", nargs="*", default=None, help="evaluate only these runs")
+    args = parser.parse_args()
+
+    runs = []
+    options = None
+    for config_file in args.campaigns:
+        campaign_runs, campaign_options = load_campaign(config_file)
+        runs += campaign_runs
+        if options is None:
+            options = campaign_options
+    if args.runs is not None:
+        runs = [run for run in runs if run["name"] in args.runs]
+
+    output_dir = args.output if args.output is not None else options["output_dir"]
+    n_workers = args.workers if args.workers is not None else options["n_workers"]
+
+    df_summary = run_campaign(runs, output_dir, n_workers=n_workers)
+    print(df_summary.to_string())
+    sys.exit(0 if (df_summary["status"] == "ok").all() else 1)
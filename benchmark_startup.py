@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+startup benchmark: measures the cold import time of the evaluation modules, each in a fresh interpreter, and checks,
+that no heavy optional dependency is loaded by the import
+
+Usage:
+python benchmark_startup.py [--repeat 5] [--modules pipeline Auswertung batch_runner] [--importtime]
+"""
+import sys
+import json
+import argparse
+import subprocess
+import numpy as np
+
+# modules, which must not be loaded by importing the processing functions
+heavy_modules = ["matplotlib", "pyproj", "pynmea2", "scipy", "airfoilwinggeometry"]
+
+_probe = """
+import sys, time, json
+t_start = time.perf_counter()
+import {module}
+t_import = time.perf_counter() - t_start
+loaded = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy}))
+print(json.dumps({{"t_import": t_import, "loaded": loaded}}))
+"""
+
+
+def measure_import(module, repeat=5):
+    """
+    imports module in fresh interpreters
+    :param module:      module name
+    :param repeat:      number of interpreter starts
+    :return:            tuple (numpy.ndarray of import times in s, list of heavy modules loaded by the import)
+    """
+    times = []
+    loaded = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", _probe.format(module=module, heavy=heavy_modules)],
+                                capture_output=True, text=True, check=True)
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(data["t_import"])
+        loaded = data["loaded"]
+    return np.array(times), loaded
+
+
+def print_importtime(module, n_lines=15):
+    """
+    prints the modules with the largest cumulative import time (python -X importtime)
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module], capture_output=True,
+                            text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: self [us] | cumulative [us] | module"
+        fields = line[len("import time:"):].split("|")
+        rows.append((int(fields[1]), fields[2].strip()))
+    print("largest cumulative import times of {0}:".format(module))
+    for t_cumulative, name in sorted(rows, reverse=True)[:n_lines]:
+        print("{0:>10.1f} ms  {1}".format(t_cumulative / 1000., name))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="measures cold import time of the evaluation modules")
+    parser.add_argument("--repeat", type=int, default=5, help="number of interpreter starts per module")
+    parser.add_argument("--modules", nargs="+", default=["pipeline", "Auswertung"], help="modules to import")
+    parser.add_argument("--importtime", action="store_true", help="print python -X importtime breakdown")
+    args = parser.parse_args()
+
+    failed = False
+    print("{0:<16}{1:>12}{2:>12}  {3}".format("module", "median [ms]", "min [ms]", "heavy modules loaded"))
+    for module in args.modules:
+        times, loaded = measure_import(module, repeat=args.repeat)
+        print("{0:<16}{1:>12.1f}{2:>12.1f}  {3}".format(module, np.median(times) * 1000., times.min() * 1000.,
+                                                      ", ".join(loaded) if len(loaded) > 0 else "-"))
+        failed = failed or len(loaded) > 0
+        if args.importtime:
+            print_importtime(module)
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+reproducible benchmark of the evaluation pipeline. A synthetic run (synthetic_campaign.py, fixed seed) of configurable
+length and sample rate is generated once per parameter set, then every pipeline stage and the end-to-end polar
+generation (read and synchronize, calibration, calculate_polar) are timed over several repeats. Results are appended
+to a JSON lines file together with git commit, machine and library versions, so that runs can be compared across
+commits.
+
+Usage:
+python benchmark_suite.py run [--duration 300] [--sample-rate 100] [--repeat 3] [--stages read_GPS calculate_polar]
+python benchmark_suite.py compare [--baseline COMMIT] [--current COMMIT] [--results FILE]
+python benchmark_suite.py list [--results FILE]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+import pipeline
+from profiling import profiler
+from synthetic_campaign import generate_campaign
+
+results_file = os.path.join("benchmark_results", "results.jsonl")
+data_root = os.path.join("benchmark_results", "data")
+
+# parameters, which have to agree for results to be comparable
+comparable_parameters = ["duration", "sample_rate", "seed", "ptot_method"]
+
+
+def git_info():
+    """
+    :return:    dict with commit hash, subject and dirty flag of the working tree (None if no git repository)
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        subject = subprocess.run(["git", "log", "-1", "--format=%s"], cwd=cwd, capture_output=True, text=True,
+                                 check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "subject": None, "dirty": None}
+    return {"commit": commit, "subject": subject, "dirty": status.strip() != ""}
+
+
+def machine_info():
+    import scipy
+
+    return {"machine": platform.machine(), "processor": platform.processor(), "node": platform.node(),
+            "cpu_count": os.cpu_count(), "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "scipy": scipy.__version__}
+
+
+def prepare_campaign(duration, sample_rate, seed=0, data_dir=None):
+    """
+    generates synthetic run (deterministic for given parameters) in data_dir (default: below data_root)
+    :return:    campaign dict (see generate_campaign)
+    """
+    if data_dir is None:
+        data_dir = os.path.join(data_root, "d{0:g}_f{1:g}_s{2}".format(duration, sample_rate, seed))
+    return generate_campaign(data_dir, duration=duration, sample_rate=sample_rate, seed=seed)
+
+
+def _settings(campaign):
+    """
+    evaluation settings of the synthetic run (no wall correction)
+    """
+    return {"prandtl_data": campaign["prandtl_data"], "df_airfoil": campaign["df_airfoil"], "l_ref": campaign["l_ref"],
+            "flap_pivots": campaign["flap_pivots"], "defective_sensor_list": campaign["defective_sensor_list"],
+            "alpha_sens_offset": campaign["alpha_sens_offset"], "T_air": campaign["T_air"],
+            "lambda_wall": 0., "sigma_wall": 0., "xi_wall": 0.}
+
+
+def end_to_end(campaign, ptot_method="gaussian_fit_average"):
+    """
+    polar generation from raw data files (as in evaluate_polar, without result cache)
+    """
+    s = _settings(campaign)
+    _, calibration_infos, _, _, df_segments = pipeline.read_segment_definition(campaign["seg_def_path"])
+    df_sync = pipeline.read_and_synchronize(campaign["data_dir"], campaign["filename"], s["sigma_wall"],
+                                            s["alpha_sens_offset"], sync_drive=campaign["sync_drive"])
+    df_sync, _ = pipeline.apply_calibration(df_sync, calibration_infos[0], None, s["T_air"], s["prandtl_data"],
+                                            s["df_airfoil"], s["defective_sensor_list"])
+    return pipeline.calculate_polar(df_sync, df_segments, s["prandtl_data"], s["df_airfoil"], s["l_ref"],
+                                    s["flap_pivots"], s["lambda_wall"], s["sigma_wall"], s["xi_wall"],
+                                    s["defective_sensor_list"], total_ref_pressure_method=ptot_method)
+
+
+def stage_functions(campaign, ptot_method="gaussian_fit_average"):
+    """
+    builds benchmark cases of the pipeline stages. Inputs of every stage are prepared once (outside of the timing);
+    stages modifying their input get a copy
+    :return:    dict {stage name: function without arguments}
+    """
+    s = _settings(campaign)
+    paths = pipeline.raw_data_paths(campaign["data_dir"], campaign["filename"], campaign["sync_drive"])
+
+    GPS = pipeline.read_GPS(paths["GPS"])
+    t0 = GPS["Time"].iloc[0]
+    alphas, delta_t_GPS_PC = pipeline.read_AOA_file(paths["AOA"], s["sigma_wall"], t0, s["alpha_sens_offset"])
+    scanners = {name: pipeline.read_DLR_pressure_scanner_file(paths[name], n_sens=5 if name == "pstat_rake" else 32,
+                                                              t0=t0)
+                for name in ["static_K02", "static_K03", "static_K04", "ptot_rake", "pstat_rake"]}
+    drive = pipeline.read_drive(paths["drive"], t0=t0, delta_t=delta_t_GPS_PC)
+    sync_data = list(scanners.values()) + [alphas, drive, GPS]
+
+    _, calibration_infos, _, _, df_segments = pipeline.read_segment_definition(campaign["seg_def_path"])
+    df_sync = pipeline.synchronize_data(sync_data)
+    df_cal, _ = pipeline.apply_calibration(df_sync.copy(), calibration_infos[0], None, s["T_air"], s["prandtl_data"],
+                                           s["df_airfoil"], s["defective_sensor_list"])
+    df_filt = pipeline.filter_data(df_cal.copy())
+
+    # time series stages (as in calc_time_series on filtered data), intermediate results prepared in order
+    df_ptot = pipeline.calc_ptot_pstat(df_filt.copy(), s["defective_sensor_list"], s["prandtl_data"],
+                                       total_ref_pressure_method="trimmed average")
+    df_wind = pipeline.calc_airspeed_wind(df_ptot.copy(), s["l_ref"])
+    df_cp = pipeline.calc_cp(df_wind.copy(), pressure_data_ident_strings=['stat', 'ptot'])
+    df_cl, _ = pipeline.calc_cl_cm_cdp(df_cp.copy(), s["df_airfoil"], s["flap_pivots"], s["lambda_wall"],
+                                       s["sigma_wall"], s["xi_wall"])
+
+    return {
+        "read_GPS": lambda: pipeline.read_GPS(paths["GPS"]),
+        "read_AOA_file": lambda: pipeline.read_AOA_file(paths["AOA"], s["sigma_wall"], t0, s["alpha_sens_offset"]),
+        "read_DLR_pressure_scanner_file": lambda: pipeline.read_DLR_pressure_scanner_file(paths["static_K02"],
+                                                                                          n_sens=32, t0=t0),
+        "read_drive": lambda: pipeline.read_drive(paths["drive"], t0=t0, delta_t=delta_t_GPS_PC),
+        "synchronize_data": lambda: pipeline.synchronize_data(sync_data),
+        "apply_calibration": lambda: pipeline.apply_calibration(df_sync.copy(), calibration_infos[0], None,
+                                                                s["T_air"], s["prandtl_data"], s["df_airfoil"],
+                                                                s["defective_sensor_list"]),
+        "filter_data": lambda: pipeline.filter_data(df_cal.copy()),
+        "calc_ptot_pstat": lambda: pipeline.calc_ptot_pstat(df_filt.copy(), s["defective_sensor_list"],
+                                                            s["prandtl_data"],
+                                                            total_ref_pressure_method="trimmed average"),
+        "calc_airspeed_wind": lambda: pipeline.calc_airspeed_wind(df_ptot.copy(), s["l_ref"]),
+        "calc_cp": lambda: pipeline.calc_cp(df_wind.copy(), pressure_data_ident_strings=['stat', 'ptot']),
+        "calc_cl_cm_cdp": lambda: pipeline.calc_cl_cm_cdp(df_cp.copy(), s["df_airfoil"], s["flap_pivots"],
+                                                          s["lambda_wall"], s["sigma_wall"], s["xi_wall"]),
+        "calc_cd": lambda: pipeline.calc_cd(df_cl.copy(), s["l_ref"], s["lambda_wall"], s["sigma_wall"],
+                                            s["xi_wall"], s["defective_sensor_list"], extrapol_flag=False),
+        "calculate_polar": lambda: pipeline.calculate_polar(df_cal, df_segments, s["prandtl_data"], s["df_airfoil"],
+                                                            s["l_ref"], s["flap_pivots"], s["lambda_wall"],
+                                                            s["sigma_wall"], s["xi_wall"],
+                                                            s["defective_sensor_list"],
+                                                            total_ref_pressure_method=ptot_method),
+        "end_to_end": lambda: end_to_end(campaign, ptot_method=ptot_method),
+    }
+
+
+def time_stage(func, repeat=3):
+    """
+    :return:    numpy.ndarray of wall times in s
+    """
+    times = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t_start)
+    return np.array(times)
+
+
+def run_benchmark(duration=300., sample_rate=100., repeat=3, seed=0, stages=None, ptot_method="gaussian_fit_average",
+                  breakdown=True):
+    """
+    times pipeline stages on a synthetic run
+    :param duration:        length of the synthetic run in s
+    :param sample_rate:     sample rate of the pressure scanners in Hz
+    :param repeat:          number of timed calls per stage
+    :param seed:            seed of the synthetic run
+    :param stages:          list of stage names (default: all, see stage_functions)
+    :param ptot_method:     total reference pressure method of calculate_polar and end_to_end
+    :param breakdown:       if True, the end-to-end run is repeated once with the profiler (sub-stages and counters)
+    :return:                result dict
+    """
+    campaign = prepare_campaign(duration, sample_rate, seed=seed)
+    cases = stage_functions(campaign, ptot_method=ptot_method)
+    if stages is None:
+        stages = list(cases.keys())
+    unknown = [name for name in stages if name not in cases]
+    if len(unknown) > 0:
+        raise ValueError("unknown stages: " + ", ".join(unknown))
+
+    timings = dict()
+    for name in stages:
+        times = time_stage(cases[name], repeat=repeat)
+        timings[name] = {"median_s": float(np.median(times)), "min_s": float(times.min()),
+                         "times_s": times.tolist()}
+        print("{0:<34}{1:>10.4f}{2:>10.4f}".format(name, timings[name]["median_s"], timings[name]["min_s"]))
+
+    result = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+              **git_info(),
+              "machine": machine_info(),
+              "parameters": {"duration": duration, "sample_rate": sample_rate, "repeat": repeat, "seed": seed,
+                             "ptot_method": ptot_method},
+              "timings": timings}
+
+    if breakdown:
+        profiler.reset()
+        profiler.enable()
+        end_to_end(campaign, ptot_method=ptot_method)
+        profiler.disable()
+        result["profile"] = profiler.summary()
+
+    return result
+
+
+def append_result(result, filename=results_file):
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    with open(filename, "a") as file:
+        file.write(json.dumps(result) + "\n")
+
+
+def load_results(filename=results_file):
+    """
+    :return:    list of result dicts (oldest first)
+    """
+    if not os.path.exists(filename):
+        return []
+    with open(filename) as file:
+        return [json.loads(line) for line in file if line.strip() != ""]
+
+
+def _select(results, commit, parameters):
+    """
+    latest result of a commit (or latest result if commit is None) with the given parameters
+    """
+    for result in reversed(results):
+        if parameters is not None and any(result["parameters"][key] != parameters[key]
+                                          for key in comparable_parameters):
+            continue
+        if commit is None or (result["commit"] is not None and result["commit"].startswith(commit)):
+            return result
+    raise ValueError("no comparable benchmark result{0}".format("" if commit is None else " of commit " + commit))
+
+
+def compare_results(baseline, current):
+    """
+    :return:    pandas DataFrame with median times of both results and ratio current / baseline per stage
+    """
+    stages = [name for name in current["timings"] if name in baseline["timings"]]
+    df = pd.DataFrame({"baseline [s]": [baseline["timings"][name]["median_s"] for name in stages],
+                       "current [s]": [current["timings"][name]["median_s"] for name in stages]}, index=stages)
+    df["ratio"] = df["current [s]"] / df["baseline [s]"]
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="benchmark of the evaluation pipeline on synthetic runs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_run = subparsers.add_parser("run", help="time pipeline stages and append result")
+    parser_run.add_argument("--duration", type=float, default=300., help="length of the synthetic run in s")
+    parser_run.add_argument("--sample-rate", type=float, default=100., help="sample rate in Hz")
+    parser_run.add_argument("--repeat", type=int, default=3, help="timed calls per stage")
+    parser_run.add_argument("--seed", type=int, default=0, help="seed of the synthetic run")
+    parser_run.add_argument("--stages", nargs="+", default=None, help="stages to time (default: all)")
+    parser_run.add_argument("--ptot-method", default="gaussian_fit_average", help="total reference pressure method")
+    parser_run.add_argument("--no-breakdown", action="store_true", help="skip profiled end-to-end run")
+    parser_run.add_argument("--results", default=results_file, help="JSON lines file of results")
+
+    parser_compare = subparsers.add_parser("compare", help="compare two stored results")
+    parser_compare.add_argument("--baseline", default=None, help="commit of baseline (default: second latest)")
+    parser_compare.add_argument("--current", default=None, help="commit of current result (default: latest)")
+    parser_compare.add_argument("--results", default=results_file, help="JSON lines file of results")
+
+    parser_list = subparsers.add_parser("list", help="list stored results")
+    parser_list.add_argument("--results", default=results_file, help="JSON lines file of results")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        print("{0:<34}{1:>10}{2:>10}".format("stage", "median [s]", "min [s]"))
+        result = run_benchmark(duration=args.duration, sample_rate=args.sample_rate, repeat=args.repeat,
+                               seed=args.seed, stages=args.stages, ptot_method=args.ptot_method,
+                               breakdown=not args.no_breakdown)
+        if "profile" in result:
+            profiler.print_table()
+        append_result(result, args.results)
+        print("result of commit {0}{1} appended to {2}".format(result["commit"], " (dirty)" if result["dirty"] else "",
+                                                                args.results))
+
+    elif args.command == "compare":
+        results = load_results(args.results)
+        if len(results) < 2 and (args.baseline is None or args.current is None):
+            sys.exit("at least two results are needed in " + args.results)
+        current = _select(results, args.current, None)
+        if args.baseline is None:
+            # latest earlier result with the same parameters
+            earlier = results[:results.index(current)]
+            baseline = _select(earlier, None, current["parameters"])
+        else:
+            baseline = _select(results, args.baseline, current["parameters"])
+        print("baseline: {0} ({1})  current: {2} ({3})".format(baseline["commit"], baseline["timestamp"],
+                                                             current["commit"], current["timestamp"]))
+        print(compare_results(baseline, current).to_string(float_format="{0:.4f}".format))
+
+    elif args.command == "list":
+        for result in load_results(args.results):
+            print("{0}  {1}{2:<6}  {3}  {4}".format(result["timestamp"], result["commit"],
+                                                   "+dirty" if result["dirty"] else "",
+                                                   json.dumps(result["parameters"]),
+                                                   result["timings"].get("end_to_end", {}).get("median_s", "")))
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+pressure sensor calibration: every calibration source is resolved to one offset vector (pandas Series, indexed by
+channel name), which is subtracted from the pressure channels by broadcasting
+"""
+import pickle
+import numpy as np
+import pandas as pd
+
+# order of the sensor units in the calibration pickle file and number of sensors per unit
+calibration_file_units = [("pstat_rake", 5), ("ptot_rake", 32), ("static_K02", 32), ("static_K03", 32),
+                          ("static_K04", 32)]
+
+
+def pressure_columns(columns):
+    """
+    identifies pressure sensor channels by name
+    :param columns:     iterable of column names
+    :return:            list of pressure column names
+    """
+    return [col for col in columns if "static_K" in col or "rake" in col]
+
+
+def offsets_from_file(filename):
+    """
+    reads calibration offsets from calibration pickle file (written by the measurement software)
+    :param filename:    path of "*_sensor_calibration_data.p" file
+    :return:            tuple (offsets, l_ref, T_air), offsets as pandas Series indexed by channel name
+    """
+    with open(filename, "rb") as file:
+        calibr_data = pickle.load(file)
+
+    l_ref = calibr_data[6]
+    T_air = calibr_data[5] + 273.15
+
+    offsets = dict()
+    for i_unit, (unit_name, n_sens) in enumerate(calibration_file_units):
+        if len(calibr_data[i_unit]) != n_sens:
+            raise ValueError("calibration file {0}: {1} offsets for unit {2}, expected {3}".format(
+                filename, len(calibr_data[i_unit]), unit_name, n_sens))
+        for i_sens, value in enumerate(calibr_data[i_unit]):
+            offsets[unit_name + f"_{i_sens + 1}"] = value
+
+    return pd.Series(offsets, dtype=float), l_ref, T_air
+
+
+def offsets_from_manual_file(filename):
+    """
+    reads manually determined calibration offsets (pickled pandas Series indexed by channel name)
+    """
+    with open(filename, "rb") as file:
+        return pickle.load(file)
+
+
+def offsets_from_interval(df, start_time, end_time, ref_cols=None):
+    """
+    calculates calibration offsets from a zero flow time interval: offsets are the deviations of each channel's mean
+    from the mean of the reference channels
+    :param df:          pandas DataFrame with time index and pressure data
+    :param start_time:  start of time interval
+    :param end_time:    end of time interval
+    :param ref_cols:    list of channels used for the reference mean (e.g. only used and functional sensors). If
+                        None, all pressure channels are used
+    :return:            pandas Series with offsets indexed by channel name
+    """
+    cols = pressure_columns(df.columns)
+    mask = (df.index >= start_time) & (df.index <= end_time)
+    means = df.loc[mask, cols].mean(axis=0)
+    if ref_cols is None:
+        ref_cols = cols
+    return means - means[ref_cols].mean()
+
+
+def resolve_offsets(calibration_type, df, filename=None, start_time=None, end_time=None, ref_cols=None):
+    """
+    resolves a calibration source to one offset vector
+    :param calibration_type:    one of "file", "20sec", "manual", "time interval", "None"
+    :param df:                  pandas DataFrame with time index and pressure data
+    :param filename:            calibration pickle file ("file" and "manual")
+    :param start_time:          start of zero flow interval ("time interval")
+    :param end_time:            end of zero flow interval ("time interval")
+    :param ref_cols:            reference channels for the mean ("time interval")
+    :return:                    tuple (offsets, l_ref, T_air). l_ref and T_air are None, if not given by the source
+    """
+    l_ref = T_air = None
+    if calibration_type == "file":
+        offsets, l_ref, T_air = offsets_from_file(filename)
+    elif calibration_type == "20sec":
+        # interval of first 20 seconds is right-open
+        offsets = offsets_from_interval(df.loc[df.index < df.index[0] + pd.Timedelta(seconds=20)],
+                                        df.index[0], df.index[-1])
+    elif calibration_type == "manual":
+        offsets = offsets_from_manual_file(filename)
+    elif calibration_type == "time interval":
+        offsets = offsets_from_interval(df, start_time, end_time, ref_cols=ref_cols)
+    elif calibration_type == "None":
+        offsets = pd.Series(dtype=float)
+    else:
+        raise ValueError("wrong parameter 'calibration_type' passed. Either 'file', '20sec', 'manual', "
+                         "'time interval' or 'None'")
+    return offsets, l_ref, T_air
+
+
+def apply_offsets(df, offsets):
+    """
+    subtracts calibration offsets from the pressure channels. Offsets are aligned by channel name and broadcast over
+    all samples
+    :param df:          pandas DataFrame with pressure data
+    :param offsets:     pandas Series with offsets indexed by channel name
+    :return:            pandas DataFrame with calibrated pressures
+    """
+    missing = offsets.index.difference(df.columns)
+    if len(missing) > 0:
+        raise ValueError("calibration offsets for channels not present in data: " + ", ".join(missing))
+
+    cols = offsets.index.to_list()
+    df[cols] = df[cols].to_numpy() - offsets.to_numpy()[np.newaxis, :]
+
+    return df
+
+
+def _ns(index):
+    """
+    converts DatetimeIndex to int64 nanoseconds since epoch (UTC), independent of the index resolution
+    """
+    return index.values.astype("datetime64[ns]").view("int64")
+
+
+def drift_offsets_from_intervals(df, intervals, ref_cols=None):
+    """
+    calculates calibration offsets for several zero flow intervals. The interval means of all channels are calculated
+    in one pass over the sorted time index with cumulative sums
+    :param df:          pandas DataFrame with sorted time index and pressure data (NaN samples are skipped)
+    :param intervals:   list of (start_time, end_time) tuples
+    :param ref_cols:    list of channels used for the reference mean. If None, all pressure channels are used
+    :return:            tuple (t_centers, offsets): numpy.ndarray of interval center times (ns since epoch) and
+                        pandas DataFrame with one row of offsets per interval, columns are channel names
+    """
+    cols = pressure_columns(df.columns)
+    if ref_cols is None:
+        ref_cols = cols
+
+    t = _ns(df.index)
+    bounds = np.array([[pd.Timestamp(start).value, pd.Timestamp(end).value] for start, end in intervals])
+    i_start = np.searchsorted(t, bounds[:, 0], side="left")
+    i_end = np.searchsorted(t, bounds[:, 1], side="right")
+    if np.any(i_end <= i_start):
+        raise ValueError("calibration interval without data")
+
+    # cumulative sums and counts of valid samples (NaN samples are skipped as by mean()), relative to the channel mean
+    # (avoids loss of precision for absolute pressures)
+    block = df[cols].to_numpy(dtype=float)
+    valid = np.isfinite(block)
+    n_valid = valid.sum(axis=0)
+    shift = np.zeros(block.shape[1])
+    np.divide(np.where(valid, block, 0.).sum(axis=0), n_valid, out=shift, where=n_valid > 0)
+    csum = np.zeros((block.shape[0] + 1, block.shape[1]))
+    np.cumsum(np.where(valid, block - shift, 0.), axis=0, out=csum[1:])
+    count = np.zeros((block.shape[0] + 1, block.shape[1]))
+    np.cumsum(valid, axis=0, out=count[1:])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (csum[i_end] - csum[i_start]) / (count[i_end] - count[i_start]) + shift
+
+    means = pd.DataFrame(means, columns=cols)
+    offsets = means.sub(means[ref_cols].mean(axis=1), axis=0)
+    t_centers = (t[i_start] + t[i_end - 1]) // 2
+
+    return t_centers, offsets
+
+
+def apply_drift_offsets(df, t_centers, offsets):
+    """
+    subtracts time dependent calibration offsets. Offsets are interpolated linearly between the interval centers
+    (constant before the first and after the last interval) for all samples and channels at once
+    :param df:          pandas DataFrame with time index and pressure data
+    :param t_centers:   numpy.ndarray of interval center times (ns since epoch), sorted
+    :param offsets:     pandas DataFrame with one row of offsets per interval
+    :return:            pandas DataFrame with calibrated pressures
+    """
+    missing = offsets.columns.difference(df.columns)
+    if len(missing) > 0:
+        raise ValueError("calibration offsets for channels not present in data: " + ", ".join(missing))
+
+    t = _ns(df.index)
+    order = np.argsort(t_centers)
+    t_centers = np.asarray(t_centers)[order]
+    offset_values = offsets.to_numpy()[order]
+
+    # interpolation weights of every sample between its two neighbouring interval centers
+    i_hi = np.clip(np.searchsorted(t_centers, t), 1, max(len(t_centers) - 1, 1))
+    i_lo = i_hi - 1
+    if len(t_centers) == 1:
+        i_hi = i_lo = np.zeros_like(t)
+        w = np.zeros(len(t))
+    else:
+        w = np.clip((t - t_centers[i_lo]) / (t_centers[i_hi] - t_centers[i_lo]), 0., 1.)
+
+    cols = offsets.columns.to_list()
+    df[cols] = df[cols].to_numpy() - ((1. - w)[:, np.newaxis] * offset_values[i_lo] +
+                                      w[:, np.newaxis] * offset_values[i_hi])
+
+    return df
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+decimation of long time series for plotting. A trace is cut to a number of points in the order of the horizontal
+resolution of the figure, while peaks stay visible:
+--> min-max envelope: minimum and maximum of every bin of equal time span (default, keeps every extremum)
+--> LTTB (largest triangle three buckets): one point per bucket, chosen by the largest triangle area with the
+    neighbouring buckets (smoother shape, single spikes may be lost)
+
+Usage:
+from decimation import decimate
+series_plot = decimate(df.loc[mask, "cl"], n_points=2000, method="minmax")
+"""
+import numpy as np
+
+
+def _as_float(x):
+    """
+    :return:    numpy.ndarray of float, datetime values as ns
+    """
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype("int64").astype(float)
+    return x.astype(float)
+
+
+def minmax_indices(x, y, n_bins):
+    """
+    positions of the minimum and maximum of y within n_bins bins of equal width in x (x sorted ascending)
+    :param x:       numpy.ndarray of x values (float or datetime64)
+    :param y:       numpy.ndarray of y values; NaN values are ignored
+    :param n_bins:  number of bins
+    :return:        sorted numpy.ndarray of positions (at most 2 * n_bins)
+    """
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+    i_valid = np.flatnonzero(~np.isnan(y))
+    if len(i_valid) <= 2 * n_bins:
+        return i_valid
+    x, y = x[i_valid], y[i_valid]
+
+    # bin of every sample
+    span = x[-1] - x[0]
+    bins = np.minimum(((x - x[0]) / span * n_bins).astype(int), n_bins - 1) if span > 0 else np.zeros(len(x), int)
+    # bins are contiguous, because x is sorted: reduce per bin, then first sample equal to the bin minimum/maximum
+    starts = np.flatnonzero(np.diff(bins, prepend=-1) != 0)
+    counts = np.diff(np.append(starts, len(x)))
+    positions = []
+    for reduce in (np.minimum, np.maximum):
+        i_extreme = np.flatnonzero(y == np.repeat(reduce.reduceat(y, starts), counts))
+        _, i_first = np.unique(bins[i_extreme], return_index=True)
+        positions.append(i_extreme[i_first])
+    return i_valid[np.unique(np.concatenate(positions))]
+
+
+def lttb_indices(x, y, n_out):
+    """
+    positions of the points selected by largest triangle three buckets (x sorted ascending)
+    :param x:       numpy.ndarray of x values (float or datetime64)
+    :param y:       numpy.ndarray of y values; NaN values are ignored
+    :param n_out:   number of points (including first and last point)
+    :return:        sorted numpy.ndarray of positions
+    """
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+    i_valid = np.flatnonzero(~np.isnan(y))
+    if len(i_valid) <= n_out or n_out < 3:
+        return i_valid
+    x, y = x[i_valid], y[i_valid]
+
+    # n_out - 2 buckets between first and last point
+    edges = np.linspace(1, len(x) - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = len(x) - 1
+    i_previous = 0
+    for i_bucket in range(n_out - 2):
+        start, end = edges[i_bucket], edges[i_bucket + 1]
+        # average point of the next bucket (last point for the last bucket)
+        next_start, next_end = end, edges[i_bucket + 2] if i_bucket + 2 < len(edges) else len(x)
+        x_next = x[next_start:next_end].mean()
+        y_next = y[next_start:next_end].mean()
+        # triangle areas (factor 1/2 omitted)
+        areas = np.abs((x[i_previous] - x_next) * (y[start:end] - y[i_previous]) -
+                       (x[i_previous] - x[start:end]) * (y_next - y[i_previous]))
+        i_previous = start + np.argmax(areas)
+        selected[i_bucket + 1] = i_previous
+    return i_valid[selected]
+
+
+def decimate(series, n_points=2000, method="minmax"):
+    """
+    decimates a pandas Series with sorted index
+    :param series:      pandas Series (e.g. index time)
+    :param n_points:    number of bins ("minmax", at most 2 * n_points points) or points ("lttb"); None: no decimation
+    :param method:      "minmax" or "lttb"
+    :return:            pandas Series with selected samples
+    """
+    if n_points is None or len(series) <= 2 * n_points:
+        return series
+    if method == "minmax":
+        positions = minmax_indices(series.index.values, series.values, n_points)
+    elif method == "lttb":
+        positions = lttb_indices(series.index.values, series.values, n_points)
+    else:
+        raise ValueError(f"unknown decimation method {method}")
+    return series.iloc[positions]
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+vectorized engines of the pipeline stages calc_ptot_pstat, synchronize_data, calc_cl_cm_cdp and calc_cd. Signatures
+and results are the same as of the reference implementations in Auswertung.py; instead of row-wise DataFrame.apply,
+merge_asof and per-row loops they work on numpy arrays (sorting along rows, trapezoidal weights as matrix products,
+nearest-neighbour matching with searchsorted). Deviations from the reference have to stay within the tolerances of
+accuracy_harness.py, which compares both on the example run and on synthetic runs.
+
+Usage:
+import fast_engines
+df = fast_engines.calc_ptot_pstat(df, defective_sensor_list, prandtl_data, "trimmed average")
+"""
+import numpy as np
+import pandas as pd
+
+from Auswertung import _calc_rake_sensor_pos, _fit_gaussian_cp, _gaussian_cptot, gaussian_fit_average
+from profiling import profiled
+
+# stage name: engine (used by accuracy_harness.py)
+engines = dict()
+
+
+def _engine(func):
+    engines[func.__name__] = func
+    return func
+
+
+def trapezoid_weights(x):
+    """
+    weights w of the trapezoidal rule, so that trapezoid(y, x) = y @ w
+    """
+    x = np.asarray(x, dtype=float)
+    w = np.zeros_like(x)
+    if len(x) > 1:
+        dx = np.diff(x)
+        w[:-1] += 0.5 * dx
+        w[1:] += 0.5 * dx
+    return w
+
+
+def linear_interpolation_matrix(x, x_new):
+    """
+    matrix M (len(x_new) x len(x)) of linear interpolation, so that np.interp(x_new, x, y) = M @ y for x_new within x
+    """
+    x = np.asarray(x, dtype=float)
+    i_hi = np.clip(np.searchsorted(x, x_new, side="right"), 1, len(x) - 1)
+    w_hi = (x_new - x[i_hi - 1]) / (x[i_hi] - x[i_hi - 1])
+    M = np.zeros((len(x_new), len(x)))
+    M[np.arange(len(x_new)), i_hi - 1] = 1. - w_hi
+    M[np.arange(len(x_new)), i_hi] += w_hi
+    return M
+
+
+@_engine
+@profiled("calc_ptot_pstat_fast")
+def calc_ptot_pstat(df, defective_sensor_list, prandtl_data, total_ref_pressure_method="trimmed median"):
+    """
+    engine of calc_ptot_pstat: trimmed means/medians of all rows from one sort along the rows
+    """
+    df = df.copy()
+
+    cols = [f'ptot_rake_{i}' for i in range(1, 33) if i not in np.array(defective_sensor_list) + 1]
+    colname_total = prandtl_data['unit name total'] + '_' + str(prandtl_data['i_sens_total'])
+    colname_static = prandtl_data['unit name static'] + '_' + str(prandtl_data['i_sens_static'])
+
+    p_rake = df[cols].to_numpy(dtype=float)
+    n = p_rake.shape[1]
+
+    if total_ref_pressure_method == "gaussian_fit_average":
+        # curve fit per row, but on numpy rows instead of DataFrame.apply
+        index = pd.Index(cols + [colname_total, colname_static])
+        p = np.column_stack((p_rake, df[colname_total].to_numpy(dtype=float),
+                             df[colname_static].to_numpy(dtype=float)))
+        ptot = [gaussian_fit_average(pd.Series(row, index=index), defective_sensor_list) for row in p]
+    elif total_ref_pressure_method == "trimmed median":
+        p_sorted = np.sort(p_rake, axis=1)
+        ptot = np.median(p_sorted[:, int(np.floor(n * 0.7)):int(np.ceil(n * (1 - 0.0)))], axis=1)
+    elif total_ref_pressure_method == "trimmed average":
+        p_sorted = np.sort(p_rake, axis=1)
+        ptot = np.mean(p_sorted[:, int(n * 0.7):int(n * (1 - 0.05))], axis=1)
+    elif total_ref_pressure_method == "prandtl":
+        ptot = df[colname_total]
+    else:
+        ptot = None
+
+    if ptot is not None:
+        df["ptot"] = np.asarray(ptot, dtype=float)
+    df["pstat"] = df[colname_static]
+
+    return df
+
+
+def _interpolate_block(t, block):
+    """
+    linear interpolation of NaNs in the columns of block (time stamps t), values after the last one are held constant
+    """
+    valid = ~np.isnan(block)
+    if valid.all():
+        return block
+    rows = valid.any(axis=1)
+    shared = (valid == rows[:, np.newaxis]).all()
+    if not shared:
+        # individual NaN patterns: column by column
+        for j in range(block.shape[1]):
+            if valid[:, j].any():
+                block[:, j] = _interpolate_block(t, block[:, j:j + 1])[:, 0]
+        return block
+    if not rows.any():
+        return block
+
+    # time stamps as float (as in pandas), so that interpolation weights are rounded the same way
+    t = t.astype(float)
+    i_valid = np.flatnonzero(rows)
+    t_valid = t[i_valid]
+    i_first = i_valid[0]
+    k_hi = np.clip(np.searchsorted(t_valid, t[i_first:], side="left"), 1, len(i_valid) - 1) \
+        if len(i_valid) > 1 else np.zeros(len(t) - i_first, dtype=int)
+    k_lo = np.maximum(k_hi - 1, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w_hi = np.clip((t[i_first:] - t_valid[k_lo]) / (t_valid[k_hi] - t_valid[k_lo]), 0., 1.)
+    w_hi = np.nan_to_num(w_hi)[:, np.newaxis]
+    block[i_first:] = (1. - w_hi) * block[i_valid[k_lo]] + w_hi * block[i_valid[k_hi]]
+    return block
+
+
+@_engine
+@profiled("synchronize_data_fast")
+def synchronize_data(merge_dfs_list, tolerance=pd.Timedelta("1ms")):
+    """
+    engine of synchronize_data: samples within tolerance of the time stamps of the first DataFrame are matched with
+    searchsorted, all columns are then interpolated in time in one pass per DataFrame
+    """
+    def sorted_times(df):
+        # UTC time stamps in ns, order of rows within the first and last time stamp
+        t = df["Time"].dt.as_unit("ns").array.asi8
+        order = np.flatnonzero((t >= t[0]) & (t <= t[-1]))
+        if not (np.diff(t) >= 0).all():
+            order = order[np.argsort(t[order], kind="stable")]
+        return t[order], order
+
+    dfs = [merge_dfs_list[0]] + [df for df in merge_dfs_list[1:] if len(df.index) > 0]
+    column_blocks = [df.columns.drop("Time") for df in dfs]
+    t_master, order = sorted_times(dfs[0])
+    # column-major, as pandas stores the columns
+    data = np.empty((len(t_master), sum(len(columns) for columns in column_blocks)), order="F")
+
+    j = 0
+    tol = tolerance.value
+    for df, columns in zip(dfs, column_blocks):
+        block = data[:, j:j + len(columns)]
+        j += len(columns)
+        if df is dfs[0]:
+            block[:] = df[columns].to_numpy(dtype=float)[order]
+        else:
+            t, order = sorted_times(df)
+            # nearest sample (on ties the earlier one) within tolerance
+            i_right = np.clip(np.searchsorted(t, t_master, side="left"), 0, len(t) - 1)
+            i_left = np.clip(i_right - 1, 0, len(t) - 1)
+            d_left = np.abs(t_master - t[i_left])
+            d_right = np.abs(t[i_right] - t_master)
+            i_near = np.where(d_left <= d_right, i_left, i_right)
+            matched = np.minimum(d_left, d_right) <= tol
+            block[:] = np.nan
+            block[matched] = df[columns].to_numpy(dtype=float)[order[i_near[matched]]]
+        # time interpolation of missing values (as DataFrame.interpolate(method="time"): no values before the first
+        # one). Columns of one DataFrame share the rows with values, so interpolation weights are calculated once
+        _interpolate_block(t_master, block)
+
+    index = pd.DatetimeIndex(t_master.view("datetime64[ns]"), name="Time").tz_localize("UTC")
+    return pd.DataFrame(data, index=index, columns=[col for columns in column_blocks for col in columns],
+                        copy=False)
+
+
+@_engine
+@profiled("calc_cl_cm_cdp_fast")
+def calc_cl_cm_cdp(df, df_airfoil, flap_pivots=[], lambda_wall=0., sigma_wall=0., xi_wall=0.):
+    """
+    engine of calc_cl_cm_cdp: integrals as matrix-vector products with trapezoidal weights
+    """
+    sens_ident_cols = ["static_K0{0:d}_{1:d}".format(df_airfoil.loc[i, "Sensor unit K"],
+                                                     df_airfoil.loc[i, "Sensor port"]) for i in df_airfoil.index[1:-1]]
+    virtual_TE = (df[sens_ident_cols[0]] + df[sens_ident_cols[-1]]) / 2
+    df = df.copy()
+    df["static_virtualTE_top"] = df["static_virtualTE_bot"] = virtual_TE
+    # same column order as reference
+    cols = df.columns.to_list()
+    cols = cols[:3*32] + cols[-2:] + cols[3*32:-2]
+    df = df[cols]
+    sens_ident_cols = ["static_virtualTE_top"] + sens_ident_cols + ["static_virtualTE_bot"]
+
+    cp = df[sens_ident_cols].to_numpy(dtype=float)
+    alpha = np.deg2rad(df["alpha"].to_numpy(dtype=float))
+    x_n = df_airfoil["x_n"].to_numpy(dtype=float)
+    y_n = df_airfoil["y_n"].to_numpy(dtype=float)
+    xy = df_airfoil[["x", "y"]].to_numpy(dtype=float)
+    s = df_airfoil["s"].to_numpy(dtype=float)
+    w = trapezoid_weights(s)
+
+    # normal force components in body axes, then projection to aerodynamic axes
+    c_x = cp @ (x_n * w)
+    c_y = cp @ (y_n * w)
+    new_cols = {"cl": -(-np.sin(alpha) * c_x + np.cos(alpha) * c_y),
+                "cdp": -(np.cos(alpha) * c_x + np.sin(alpha) * c_y)}
+
+    n_taps = np.column_stack((x_n, y_n))
+    r_ref = np.array([0.25, 0.]) - xy
+    new_cols["cm"] = -(cp @ (np.cross(n_taps, r_ref) * w))
+
+    flap_pivots = np.array(flap_pivots)
+    if len(flap_pivots) >= 1:
+        flap_pivot_TE = flap_pivots if len(flap_pivots) == 1 else flap_pivots[1, :]
+        mask = xy[:, 0] >= np.ravel(flap_pivot_TE)[0]
+        r_ref_F = xy - np.ravel(flap_pivot_TE)[:2]
+        new_cols["cmr_TE"] = cp[:, mask] @ (np.cross(n_taps[mask], r_ref_F[mask]) * trapezoid_weights(s[mask]))
+    if len(flap_pivots) > 1:
+        flap_pivot_LE = flap_pivots[0, :]
+        mask = xy[:, 0] <= flap_pivot_LE[0]
+        r_ref_F = xy - flap_pivot_LE
+        new_cols["cmr_LE"] = cp[:, mask] @ (np.cross(n_taps[mask], r_ref_F[mask]) * trapezoid_weights(s[mask]))
+
+    # wall corrections
+    factor_cl = 1 - 2 * lambda_wall * (sigma_wall + xi_wall) - sigma_wall
+    new_cols["cl"] = new_cols["cl"] * factor_cl
+    new_cols["cm"] = new_cols["cm"] * (1 - 2 * lambda_wall * (sigma_wall + xi_wall))
+    df[sens_ident_cols] = cp * factor_cl
+
+    for name, values in new_cols.items():
+        df[name] = values
+
+    return df, sens_ident_cols
+
+
+@_engine
+@profiled("calc_cd_fast")
+def calc_cd(df, l_ref, lambda_wall, sigma_wall, xi_wall, defective_sensor_list, extrapol_flag=False, *,
+            gauss_span=5.0, n_z=1001):
+    """
+    engine of calc_cd: static pressure interpolation as one matrix product, extrapolated drag integrated for all rows
+    at once (Gaussian fits are still done per row)
+    """
+    z_tot, z_stat = _calc_rake_sensor_pos(defective_sensor_list=defective_sensor_list)
+
+    cp_stat = df.filter(regex=r"^pstat_rake_").to_numpy(dtype=float) @ linear_interpolation_matrix(z_stat, z_tot).T
+    cp_tot = np.delete(df.filter(regex=r"^ptot_rake_").to_numpy(dtype=float), defective_sensor_list, axis=1)
+    wall_factor = 1.0 - 2.0 * lambda_wall * (sigma_wall + xi_wall)
+
+    d_cd_jones = 2.0 * np.sqrt(np.abs(cp_tot - cp_stat)) * (1.0 - np.sqrt(np.abs(cp_tot)))
+    cd_meas = d_cd_jones @ trapezoid_weights(z_tot) / (l_ref * 1000.0) * wall_factor
+    df["cd"] = cd_meas
+
+    if extrapol_flag:
+        params = np.array([_fit_gaussian_cp(z_tot, row) for row in cp_tot]).reshape(-1, 3)
+        A, mu, sigma = params[:, 0:1], params[:, 1:2], params[:, 2:3]
+
+        # extended grids of all rows: z_ext = z_lo + (z_hi - z_lo) * u
+        z_lo = np.minimum(z_tot.min(), mu - gauss_span * sigma)
+        z_hi = np.maximum(z_tot.max(), mu + gauss_span * sigma)
+        z_ext = z_lo + (z_hi - z_lo) * np.linspace(0., 1., n_z)
+
+        cp_tot_ext = _gaussian_cptot(z_ext, A, mu, sigma)
+        cp_stat_ext = np.array([np.interp(z_row, z_tot, cp_row, left=cp_row[0], right=cp_row[-1])
+                                for z_row, cp_row in zip(z_ext, cp_stat)]).reshape(z_ext.shape)
+
+        d_cd_ext = 2.0 * np.sqrt(np.abs(cp_tot_ext - cp_stat_ext)) * (1.0 - np.sqrt(np.abs(cp_tot_ext)))
+        # trapezoid on equidistant grids
+        dz = (z_hi - z_lo)[:, 0] / (n_z - 1)
+        cd_extrap = dz * (d_cd_ext.sum(axis=1) - 0.5 * (d_cd_ext[:, 0] + d_cd_ext[:, -1])) / (l_ref * 1000.0)
+        df["cd_extrapol"] = cd_extrap * wall_factor
+
+        mask = df["cd_extrapol"] > 1.1 * df["cd"]
+        df.loc[mask, "cd"] = df.loc[mask, "cd_extrapol"]
+        df["cd_extrapol_flag"] = mask
+
+    return df
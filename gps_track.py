@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+processing of the GPS track of a test drive. All fixes are projected once (the pyproj transformer is cached per
+coordinate reference system), then distance, heading and curvature are calculated vectorially and the track is split
+into straight passes and turnarounds. The results are added as columns to the synchronized data, so that plotting and
+segment detection do not need further projections:
+
+x_track, y_track    projected coordinates in m (EPSG code of track_crs or local east/north plane at the first fix)
+track_distance      driven distance since the first fix in m
+heading             course over ground in deg (0: north, 90: east)
+curvature           curvature of the track in 1/m (positive: left turn)
+pass_id             number of the straight pass (-1: no straight pass)
+turnaround          True between two passes of opposite direction
+
+Usage:
+from gps_track import gps_track, add_track_columns, pass_segments
+df_track = gps_track(read_GPS(path), crs="EPSG:31287")
+df_sync = add_track_columns(df_sync, df_track)
+df_passes = pass_segments(df_track)
+"""
+import functools
+import numpy as np
+import pandas as pd
+
+# mean earth radius in m (local plane projection)
+earth_radius = 6371008.8
+
+track_columns = ["x_track", "y_track", "track_distance", "heading", "curvature", "pass_id", "turnaround"]
+
+
+@functools.lru_cache(maxsize=8)
+def get_transformer(crs_to, crs_from="EPSG:4326"):
+    """
+    cached pyproj transformer (longitude, latitude order)
+    """
+    from pyproj import Transformer
+    return Transformer.from_crs(crs_from, crs_to, always_xy=True)
+
+
+def project_fixes(latitude, longitude, crs=None):
+    """
+    :param latitude:    numpy.ndarray of latitudes in deg
+    :param longitude:   numpy.ndarray of longitudes in deg
+    :param crs:         target coordinate reference system, e.g. "EPSG:31287". None: local east/north plane with
+                        origin at the first fix (no pyproj needed, accurate for tracks of some km)
+    :return:            tuple (x, y) in m
+    """
+    latitude = np.asarray(latitude, dtype=float)
+    longitude = np.asarray(longitude, dtype=float)
+    if crs is None:
+        lat0 = np.radians(latitude[0])
+        x = earth_radius * np.radians(longitude - longitude[0]) * np.cos(lat0)
+        y = earth_radius * np.radians(latitude - latitude[0])
+        return x, y
+    return get_transformer(crs).transform(longitude, latitude)
+
+
+def track_kinematics(t, x, y, min_speed=2.):
+    """
+    distance, heading and curvature of a track
+    :param t:           numpy.ndarray of times in s
+    :param x:           numpy.ndarray of east coordinates in m
+    :param y:           numpy.ndarray of north coordinates in m
+    :param min_speed:   curvature is NaN below this speed in m/s
+    :return:            tuple (distance in m, heading in deg, curvature in 1/m, speed in m/s)
+    """
+    distance = np.concatenate(([0.], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))
+    if len(t) < 2:
+        return distance, np.full(len(t), np.nan), np.full(len(t), np.nan), np.zeros(len(t))
+    vx = np.gradient(x, t)
+    vy = np.gradient(y, t)
+    speed = np.hypot(vx, vy)
+    psi = np.unwrap(np.arctan2(vx, vy))
+    heading = np.degrees(psi) % 360.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # heading is measured clockwise, curvature positive for left turns
+        curvature = np.where(speed > min_speed, -np.gradient(psi, t) / speed, np.nan)
+    return distance, heading, curvature, speed
+
+
+def detect_passes(t, heading, curvature, speed, min_speed=5., max_curvature=1 / 300., min_duration=10.):
+    """
+    straight passes (speed above min_speed, radius above 1/max_curvature, at least min_duration long) and
+    turnarounds (between passes, which differ by more than 90 deg in heading)
+    :return:    tuple (pass ids (-1: no pass), turnaround flags)
+    """
+    straight = (speed > min_speed) & (np.abs(np.nan_to_num(curvature, nan=np.inf)) < max_curvature)
+    # start and end of straight runs
+    edges = np.diff(np.concatenate(([0], straight.astype(int), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    long_enough = t[ends - 1] - t[starts] >= min_duration
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    pass_id = np.full(len(t), -1)
+    for i_pass, (start, end) in enumerate(zip(starts, ends)):
+        pass_id[start:end] = i_pass
+
+    turnaround = np.zeros(len(t), dtype=bool)
+    if len(starts) > 1:
+        # circular mean heading of passes
+        psi = np.radians(heading)
+        mean_heading = np.array([np.arctan2(np.sin(psi[start:end]).mean(), np.cos(psi[start:end]).mean())
+                                 for start, end in zip(starts, ends)])
+        change = np.abs(np.angle(np.exp(1j * np.diff(mean_heading))))
+        for end, next_start in zip(ends[:-1][change > np.pi / 2], starts[1:][change > np.pi / 2]):
+            turnaround[end:next_start] = True
+    return pass_id, turnaround
+
+
+def gps_track(df_gps, crs=None, **pass_parameters):
+    """
+    processes the GPS fixes of a run (read_GPS)
+    :param df_gps:          pandas DataFrame with "Time", "Latitude", "Longitude" columns
+    :param crs:             coordinate reference system of projected coordinates (see project_fixes)
+    :param pass_parameters: see detect_passes
+    :return:                pandas DataFrame with track_columns, index Time
+    """
+    df_gps = df_gps.dropna(subset=["Latitude", "Longitude"]).drop_duplicates(subset="Time").sort_values("Time")
+    index = pd.DatetimeIndex(df_gps["Time"], name="Time")
+    t = (index - index[0]).total_seconds().to_numpy() if len(index) > 0 else np.empty(0)
+
+    x, y = project_fixes(df_gps["Latitude"].to_numpy(), df_gps["Longitude"].to_numpy(), crs)
+    distance, heading, curvature, speed = track_kinematics(t, x, y)
+    pass_id, turnaround = detect_passes(t, heading, curvature, speed, **pass_parameters)
+    return pd.DataFrame({"x_track": x, "y_track": y, "track_distance": distance, "heading": heading,
+                         "curvature": curvature, "pass_id": pass_id, "turnaround": turnaround}, index=index)
+
+
+def add_track_columns(df, df_track):
+    """
+    adds the track columns to a time series (e.g. synchronized data). Continuous quantities are interpolated (heading
+    across north without jumps), pass ids and turnaround flags are taken from the previous fix
+    :param df:          pandas DataFrame with time index
+    :param df_track:    result of gps_track
+    :return:            pandas DataFrame with track_columns
+    """
+    t = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+    t_track = pd.DatetimeIndex(df_track.index).as_unit("ns").asi8
+    columns = dict()
+    for col in ["x_track", "y_track", "track_distance", "curvature"]:
+        columns[col] = np.interp(t, t_track, df_track[col].to_numpy())
+    columns["heading"] = np.degrees(np.interp(t, t_track, np.unwrap(np.radians(df_track["heading"].to_numpy())))) % 360.
+    i_fix = np.clip(np.searchsorted(t_track, t, side="right") - 1, 0, len(t_track) - 1)
+    columns["pass_id"] = df_track["pass_id"].to_numpy()[i_fix]
+    columns["turnaround"] = df_track["turnaround"].to_numpy()[i_fix]
+    df = df.drop(columns=[col for col in track_columns if col in df.columns])
+    return pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1)
+
+
+def pass_segments(df):
+    """
+    time intervals of the straight passes (input for segment definition)
+    :param df:  pandas DataFrame with track columns (gps_track or add_track_columns)
+    :return:    pandas DataFrame with "start", "end", "heading" (circular mean) and "length" per pass id
+    """
+    df_passes = df.loc[df["pass_id"] >= 0]
+    psi = np.radians(df_passes["heading"])
+    groups = pd.DataFrame({"time": df_passes.index, "sin": np.sin(psi), "cos": np.cos(psi),
+                           "distance": df_passes["track_distance"]}, index=df_passes.index).groupby(
+        df_passes["pass_id"].to_numpy())
+    segments = pd.DataFrame({"start": groups["time"].min(), "end": groups["time"].max(),
+                             "heading": np.degrees(np.arctan2(groups["sin"].mean(), groups["cos"].mean())) % 360.,
+                             "length": groups["distance"].max() - groups["distance"].min()})
+    segments.index.name = "pass_id"
+    return segments
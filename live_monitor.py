@@ -0,0 +1,605 @@
+# -*- coding: utf-8 -*-
+"""
+live evaluation during the test drive. Follows the raw data files, while the measurement software writes them:
+--> only bytes appended since the last update are read and parsed (incomplete last lines are kept for the next update)
+--> time base as in the offline evaluation: first GPS fix, scanner and AOA time stamps relative to their first sample
+--> incremental synchronization on the time stamps of static_K02, as soon as all sources have data up to that time
+--> zero flow calibration from the first seconds of the run (as calibration "20sec"), read from the start of the raw
+    data files (independent of the ring buffers, so the monitor can also be started late), or offsets of a calibration
+    file. The calibration is refused, if the Prandtl probe shows flow in the zero flow interval
+--> causal low-pass filter (Butterworth, filter state kept between updates) instead of the Savitzky-Golay filter
+--> cl, cd, cm, Re and alpha with the coefficient functions of the pipeline (fast_engines.py) at a reduced output rate
+--> fixed size ring buffers for raw data and results, so memory does not grow with the length of the run
+
+Usage:
+python live_monitor.py data_dir 20230926-1713 --geometry df_airfoil.p [--l-ref 0.5] [--alpha-sens-offset 214.73876953125]
+                       [--interval 0.2] [--window 5] [--calibration 20] [--calibration-file FILE] [--cutoff 2]
+                       [--rate 10] [--log live.csv]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+import fast_engines
+from Auswertung import calc_airspeed_wind, calc_cp, parse_gprmc_row
+from calibration import pressure_columns
+
+# scanner sources: (name, number of sensors). static_K02 is the master clock as in read_and_synchronize
+scanner_sources = [("static_K02", 32), ("static_K03", 32), ("static_K04", 32), ("ptot_rake", 32), ("pstat_rake", 5)]
+
+# result channels
+result_columns = ["alpha", "cl", "cd", "cm", "Re", "U_TAS", "U_CAS", "U_GPS"]
+
+gear_ratio = 60 / (306 * 2)
+
+
+class FileTail:
+    """
+    reads lines appended to a growing text file
+    """
+
+    def __init__(self, path, skip_lines=0):
+        """
+        :param path:        file path (file does not have to exist yet)
+        :param skip_lines:  number of lines at the start of the file to be ignored
+        """
+        self.path = path
+        self.skip_lines = skip_lines
+        self.offset = 0
+        self.partial = b""
+        self.n_lines = 0
+
+    def read_lines(self):
+        """
+        :return:    list of complete lines appended since the last call (str, without line break)
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset:
+            # file was truncated or replaced: start from the beginning
+            self.offset = 0
+            self.partial = b""
+            self.n_lines = 0
+        if size == self.offset:
+            return []
+
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            chunk = file.read(size - self.offset)
+        self.offset += len(chunk)
+
+        lines = (self.partial + chunk).split(b"\n")
+        self.partial = lines.pop()
+        n_skip = max(0, min(self.skip_lines - self.n_lines, len(lines)))
+        self.n_lines += len(lines)
+        return [line.decode("ascii", errors="replace").strip() for line in lines[n_skip:]]
+
+
+class RingBuffer:
+    """
+    time stamps (int64 ns) and values of the latest samples of one source
+    """
+
+    def __init__(self, capacity, n_channels):
+        self.t = np.zeros(capacity, dtype=np.int64)
+        self.values = np.full((capacity, n_channels), np.nan)
+        self.capacity = capacity
+        self.n = 0
+        self.i_next = 0
+
+    def append(self, t, values):
+        t = t[-self.capacity:]
+        values = values[-self.capacity:]
+        n_new = len(t)
+        i = (self.i_next + np.arange(n_new)) % self.capacity
+        self.t[i] = t
+        self.values[i] = values
+        self.i_next = (self.i_next + n_new) % self.capacity
+        self.n = min(self.n + n_new, self.capacity)
+
+    def data(self):
+        """
+        :return:    tuple (time stamps, values) of the stored samples, oldest first
+        """
+        i = (self.i_next - self.n + np.arange(self.n)) % self.capacity
+        return self.t[i], self.values[i]
+
+    def latest_time(self):
+        return self.t[(self.i_next - 1) % self.capacity] if self.n > 0 else None
+
+
+def parse_scanner_lines(lines, n_sens):
+    """
+    parses lines of a pressure scanner file ("time_ms p_1 ... p_n temperature")
+    :return:    tuple (numpy.ndarray of times in ms, numpy.ndarray of pressures (n_lines x n_sens))
+    """
+    rows = [line.split() for line in lines]
+    rows = [row for row in rows if len(row) == n_sens + 2]
+    if len(rows) == 0:
+        return np.empty(0), np.empty((0, n_sens))
+    data = np.array(rows, dtype=float)
+    return data[:, 0], data[:, 1:n_sens + 1]
+
+
+def scanner_file_start(path, n_sens, duration_s, chunk_size=2**18):
+    """
+    reads the samples of the first duration_s seconds of a pressure scanner file, outliers are dropped as in
+    read_DLR_pressure_scanner_file
+    :param path:        path of scanner file (header line, then "time_ms p_1 ... p_n temperature")
+    :param n_sens:      number of sensors
+    :param duration_s:  length of the interval from the first sample in s
+    :return:            numpy.ndarray of pressures (samples x n_sens) or None, if the file does not cover duration_s yet
+    """
+    if not os.path.exists(path):
+        return None
+    lines = []
+    with open(path, "rb") as file:
+        content = b""
+        while True:
+            chunk = file.read(chunk_size)
+            content += chunk
+            lines = [line.decode("ascii", errors="replace").strip() for line in content.split(b"\n")[1:-1]]
+            t_ms, p = parse_scanner_lines(lines, n_sens)
+            if len(t_ms) > 0 and t_ms[-1] - t_ms[0] >= duration_s * 1000.:
+                break
+            if len(chunk) < chunk_size:
+                return None
+    p = p[t_ms < t_ms[0] + duration_s * 1000.]
+    median = np.median(p, axis=0)
+    return p[np.all((p >= 0.85 * median) & (p <= 1.07 * median), axis=1)]
+
+
+def parse_aoa_lines(lines, alpha_sens_offset):
+    """
+    parses lines of the AOA file ("date time position turn"), alpha as in read_AOA_file (without wall correction)
+    :return:    tuple (numpy.ndarray of computer times in ns, numpy.ndarray of alpha)
+    """
+    rows = [line.split() for line in lines]
+    rows = [row for row in rows if len(row) == 4]
+    if len(rows) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    t = np.array([row[0] + "T" + row[1] for row in rows], dtype="datetime64[ns]").view("int64")
+    counts = np.array([row[2:] for row in rows], dtype=float)
+    abs_sensor_pos_deg = - counts[:, 0] / 2**14 * 360 - counts[:, 1] * 360 + alpha_sens_offset
+    return t, abs_sensor_pos_deg * gear_ratio
+
+
+def parse_gps_lines(lines):
+    """
+    parses NMEA lines (RMC sentences as in read_GPS)
+    :return:    tuple (numpy.ndarray of UTC times in ns, numpy.ndarray of GPS speed)
+    """
+    fixes = [parse_gprmc_row(pd.Series([line])) for line in lines if "RMC" in line]
+    fixes = [fix for fix in fixes if fix[0] is not None]
+    if len(fixes) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    t = pd.DatetimeIndex([fix[0] for fix in fixes]).tz_convert("UTC").as_unit("ns").asi8
+    return t, np.array([fix[3] for fix in fixes], dtype=float)
+
+
+class _Source:
+    """
+    raw data source: parser columns and ring buffer. Samples are kept until the time base (first GPS fix) is known
+    """
+
+    def __init__(self, name, columns, capacity):
+        self.name = name
+        self.columns = columns
+        self.buffer = RingBuffer(capacity, len(columns))
+        self.t_first = None
+        self.pending = []
+
+    def add(self, t_raw, values, t0):
+        """
+        :param t_raw:   time stamps in the clock of the source (ns)
+        :param t0:      time of first GPS fix in ns or None, if not known yet
+        """
+        if len(t_raw) == 0:
+            return
+        if self.t_first is None:
+            self.t_first = t_raw[0]
+        if t0 is None:
+            self.pending.append((t_raw, values))
+            # keep bounded number of samples until the time base is known
+            while sum(len(t) for t, _ in self.pending) > self.buffer.capacity and len(self.pending) > 1:
+                self.pending.pop(0)
+            return
+        self.flush(t0)
+        self.buffer.append(t0 + t_raw - self.t_first, values)
+
+    def flush(self, t0):
+        """
+        moves the samples received before the time base was known into the ring buffer
+        """
+        for t_pending, values_pending in self.pending:
+            self.buffer.append(t0 + t_pending - self.t_first, values_pending)
+        self.pending = []
+
+
+class StreamSynchronizer:
+    """
+    incremental synchronization of scanner, AOA and GPS lines (same line format as the raw data files) on the time
+    stamps of static_K02
+    """
+
+    def __init__(self, alpha_sens_offset, sigma_wall=0., sample_rate=100., buffer_s=10.):
+        """
+        :param alpha_sens_offset:   AOA sensor offset
+        :param sigma_wall:          wall correction of alpha (see read_AOA_file)
+        :param sample_rate:         sample rate of the pressure scanners in Hz
+        :param buffer_s:            seconds of raw data kept per source
+        """
+        self.alpha_sens_offset = alpha_sens_offset
+        self.sigma_wall = sigma_wall
+        capacity = int(buffer_s * sample_rate)
+        self.sources = [_Source(unit_name, [unit_name + f"_{i}" for i in range(1, n_sens + 1)], capacity)
+                        for unit_name, n_sens in scanner_sources]
+        self.aoa = _Source("AOA", ["alpha"], capacity)
+        self.gps = _Source("GPS", ["U_GPS"], int(buffer_s) + 2)
+        self.t0 = None
+        self.t_synced = None
+        self.n_outliers = 0
+
+        # synchronized channels: all scanner channels and alpha
+        self.columns = [col for source in self.sources for col in source.columns] + ["alpha"]
+
+    def source_names(self):
+        return [source.name for source in self.sources] + ["AOA", "GPS"]
+
+    def add_lines(self, source_name, lines):
+        """
+        :param source_name:     "static_K02", ..., "pstat_rake", "AOA" or "GPS"
+        :param lines:           list of lines (str) of this source
+        """
+        if len(lines) == 0:
+            return
+        if source_name == "GPS":
+            t, U_GPS = parse_gps_lines(lines)
+            if self.t0 is None and len(t) > 0:
+                self.t0 = int(t[0])
+                self.gps.t_first = self.t0
+                for source in self.sources + [self.aoa]:
+                    source.flush(self.t0)
+            if self.t0 is not None:
+                self.gps.add(t, U_GPS[:, np.newaxis], self.t0)
+        elif source_name == "AOA":
+            t_pc, alpha = parse_aoa_lines(lines, self.alpha_sens_offset)
+            self.aoa.add(t_pc, alpha[:, np.newaxis] * (1 + self.sigma_wall), self.t0)
+        else:
+            source = self.sources[[source.name for source in self.sources].index(source_name)]
+            t_ms, p = parse_scanner_lines(lines, len(source.columns))
+            if len(t_ms) == 0:
+                return
+            # drop outliers as in read_DLR_pressure_scanner_file, median of the buffered and the new samples
+            median = np.median(np.vstack((source.buffer.data()[1], p)), axis=0)
+            valid = np.all((p >= 0.85 * median) & (p <= 1.07 * median), axis=1)
+            self.n_outliers += np.sum(~valid)
+            source.add((t_ms[valid] * 1e6).astype(np.int64), p[valid], self.t0)
+
+    def synchronize(self):
+        """
+        synchronized samples of the master clock, which all sources have reached
+        :return:    tuple (time stamps in ns, values) of new samples or (None, None)
+        """
+        latest = [source.buffer.latest_time() for source in self.sources + [self.aoa]]
+        if any(t is None for t in latest):
+            return None, None
+        t_ready = min(latest)
+        t_master, values_master = self.sources[0].buffer.data()
+        new = t_master <= t_ready if self.t_synced is None else (t_master > self.t_synced) & (t_master <= t_ready)
+        if not new.any():
+            return None, None
+        t = t_master[new]
+        blocks = [values_master[new]]
+        for source in self.sources[1:] + [self.aoa]:
+            t_source, values_source = source.buffer.data()
+            blocks.append(np.column_stack([np.interp(t, t_source, values_source[:, j])
+                                           for j in range(values_source.shape[1])]))
+        self.t_synced = t[-1]
+        return t, np.hstack(blocks)
+
+    def U_GPS(self, t):
+        """
+        :return:    GPS speed interpolated at time stamps t (ns)
+        """
+        t_gps, U_GPS = self.gps.buffer.data()
+        return np.interp(t, t_gps, U_GPS[:, 0]) if len(t_gps) > 0 else np.full(len(t), np.nan)
+
+
+class LiveEvaluator:
+    """
+    incremental evaluation of one growing run. Call update() periodically, or process() with synchronized blocks of
+    another StreamSynchronizer (see acquisition_gateway.py)
+    """
+
+    def __init__(self, data_dir, filename, df_airfoil, l_ref, alpha_sens_offset, prandtl_data,
+                 defective_sensor_list=(), flap_pivots=(), lambda_wall=0., sigma_wall=0., xi_wall=0., T_air=288.15,
+                 calibration_s=20., offsets=None, max_calibration_speed=10., cutoff_Hz=2., sample_rate=100.,
+                 output_rate=10., buffer_s=10., history_s=600., ptot_method="trimmed average"):
+        """
+        :param data_dir:                directory of the raw data files (None, if blocks are passed to process())
+        :param filename:                common file name start, e.g. "20230926-1713"
+        :param df_airfoil:              tap DataFrame (see read_airfoil_geometry)
+        :param l_ref:                   chord length in m
+        :param alpha_sens_offset:       AOA sensor offset
+        :param prandtl_data:            Prandtl probe sensors (see calc_ptot_pstat)
+        :param defective_sensor_list:   indices of defective wake rake probes
+        :param flap_pivots:             flap hinge positions (see calc_cl_cm_cdp)
+        :param lambda_wall:             wall correction coefficient (see calc_wall_correction_coefficients)
+        :param sigma_wall:              wall correction coefficient, also of alpha (see read_AOA_file)
+        :param xi_wall:                 wall correction coefficient (see calc_wall_correction_coefficients)
+        :param T_air:                   air temperature in K
+        :param calibration_s:           length of the zero flow interval at the start of the run in s
+        :param offsets:                 calibration offsets (pandas Series indexed by channel name, e.g. of
+                                        calibration.offsets_from_file); None: zero flow interval at the start of the
+                                        run (read from the start of the files, if data_dir is given)
+        :param max_calibration_speed:   calibration of the zero flow interval is refused, if the uncalibrated Prandtl
+                                        probe gives a larger U_CAS in m/s (flow, e.g. the run has not started at
+                                        standstill)
+        :param cutoff_Hz:               cutoff frequency of the causal low-pass filter
+        :param sample_rate:             sample rate of the pressure scanners in Hz
+        :param output_rate:             rate of evaluated samples in Hz
+        :param buffer_s:                seconds of raw data kept per source
+        :param history_s:               seconds of results kept
+        :param ptot_method:             total reference pressure method (vectorized methods only)
+        """
+        self.df_airfoil = df_airfoil
+        self.l_ref = l_ref
+        self.prandtl_data = prandtl_data
+        self.defective_sensor_list = list(defective_sensor_list)
+        self.flap_pivots = np.array(flap_pivots, dtype=float)
+        self.lambda_wall = lambda_wall
+        self.sigma_wall = sigma_wall
+        self.xi_wall = xi_wall
+        self.T_air = T_air
+        self.calibration_ns = int(calibration_s * 1e9)
+        self.output_step_ns = int(1e9 / output_rate)
+        self.ptot_method = ptot_method
+        self.sample_rate = sample_rate
+
+        self.stream = StreamSynchronizer(alpha_sens_offset, sigma_wall, sample_rate, buffer_s)
+        self.tails = dict()
+        if data_dir is not None:
+            for source_name in self.stream.source_names():
+                self.tails[source_name] = FileTail(os.path.join(data_dir, f"{filename}_{source_name}.dat"),
+                                                   skip_lines=0 if source_name in ("AOA", "GPS") else 1)
+
+        self.columns = self.stream.columns
+        self.i_pressure = np.array([i for i, col in enumerate(self.columns) if col in pressure_columns(self.columns)])
+        self.t_start = None
+        self.calibration_sum = np.zeros(len(self.i_pressure))
+        self.n_calibration = 0
+        self.max_calibration_speed = max_calibration_speed
+        self.calibration_error = None
+        self.offsets = None
+        if offsets is not None:
+            self.offsets = offsets.reindex(self.columns[i] for i in self.i_pressure).fillna(0.).to_numpy(dtype=float)
+
+        from scipy import signal
+        self._b, self._a = signal.butter(2, cutoff_Hz, fs=sample_rate)
+        self._zi = None
+        self.t_last_output = None
+
+        self.results = RingBuffer(int(history_s * output_rate), len(result_columns))
+        self.t_update = 0.
+
+    def _set_offsets(self, means):
+        """
+        offsets of the zero flow interval from the means of the pressure channels (order of i_pressure). Refused, if
+        the Prandtl probe shows flow
+        """
+        i_total, i_static = [list(self.columns[i] for i in self.i_pressure).index(
+            self.prandtl_data["unit name " + kind] + "_{0:d}".format(self.prandtl_data["i_sens_" + kind]))
+            for kind in ("total", "static")]
+        rho = 1.225 * 288.15 / self.T_air
+        U_CAS = np.sqrt(2 * abs(means[i_total] - means[i_static]) / rho)
+        if not U_CAS <= self.max_calibration_speed:
+            self.calibration_error = "U_CAS = {0:.1f} m/s in zero flow interval".format(U_CAS)
+            print("\nzero flow calibration refused ({0}), give calibration offsets".format(self.calibration_error))
+            return
+        self.offsets = means - means.mean()
+
+    def _calibrate_from_files(self):
+        """
+        zero flow interval from the start of the scanner files (not limited by the ring buffers)
+        """
+        means = dict()
+        for source in self.stream.sources:
+            p = scanner_file_start(self.tails[source.name].path, len(source.columns), self.calibration_ns / 1e9)
+            if p is None:
+                return
+            means.update(zip(source.columns, p.mean(axis=0)))
+        self._set_offsets(np.array([means[self.columns[i]] for i in self.i_pressure]))
+
+    def _calibrate(self, t, values):
+        """
+        accumulates the zero flow interval (if not read from the files) and subtracts the offsets ("20sec"
+        calibration)
+        :return:    tuple (time stamps, values) of calibrated samples (empty during the zero flow interval and as long
+                    as there are no offsets)
+        """
+        if self.t_start is None:
+            self.t_start = t[0]
+        in_interval = t < self.t_start + self.calibration_ns
+        if self.offsets is None and self.calibration_error is None and len(self.tails) == 0:
+            self.calibration_sum += values[in_interval][:, self.i_pressure].sum(axis=0)
+            self.n_calibration += in_interval.sum()
+            if not in_interval.all():
+                self._set_offsets(self.calibration_sum / self.n_calibration)
+        if self.offsets is None:
+            return t[:0], values[:0]
+        t, values = t[~in_interval], values[~in_interval].copy()
+        values[:, self.i_pressure] -= self.offsets
+        return t, values
+
+    def _filter(self, values):
+        from scipy import signal
+
+        if self._zi is None:
+            self._zi = signal.lfilter_zi(self._b, self._a)[:, np.newaxis] * values[0]
+        filtered, self._zi = signal.lfilter(self._b, self._a, values, axis=0, zi=self._zi)
+        return filtered
+
+    def _coefficients(self, t, values):
+        """
+        evaluates samples with the coefficient functions of the pipeline
+        """
+        df = pd.DataFrame(values, columns=self.columns)
+        df["T_air"] = self.T_air
+        df = fast_engines.calc_ptot_pstat(df, self.defective_sensor_list, self.prandtl_data,
+                                          total_ref_pressure_method=self.ptot_method)
+        df = calc_airspeed_wind(df, self.l_ref)
+        df = calc_cp(df, pressure_data_ident_strings=['stat', 'ptot'])
+        df, _ = fast_engines.calc_cl_cm_cdp(df, self.df_airfoil, self.flap_pivots, self.lambda_wall, self.sigma_wall,
+                                            self.xi_wall)
+        df = fast_engines.calc_cd(df, self.l_ref, self.lambda_wall, self.sigma_wall, self.xi_wall,
+                                  self.defective_sensor_list)
+
+        df["U_GPS"] = self.stream.U_GPS(t)
+        return df[result_columns].to_numpy(dtype=float)
+
+    def update(self):
+        """
+        reads appended data and evaluates it
+        :return:    pandas DataFrame with the new results (empty, if there are none)
+        """
+        t_update = time.perf_counter()
+        for source_name, tail in self.tails.items():
+            self.stream.add_lines(source_name, tail.read_lines())
+        if self.t_start is None and self.stream.t0 is not None:
+            # the first sample of the master clock is at the first GPS fix (see _Source)
+            self.t_start = self.stream.t0
+        if self.offsets is None and self.calibration_error is None:
+            self._calibrate_from_files()
+        df = self.process(*self.stream.synchronize())
+        self.t_update = time.perf_counter() - t_update
+        return df
+
+    def process(self, t, values):
+        """
+        evaluates synchronized samples (see StreamSynchronizer.synchronize)
+        :param t:       time stamps in ns or None
+        :param values:  values of the synchronized channels (columns of StreamSynchronizer)
+        :return:        pandas DataFrame with the new results (empty, if there are none)
+        """
+        df = pd.DataFrame(columns=result_columns, index=pd.DatetimeIndex([], tz="UTC"))
+        if t is not None:
+            t, values = self._calibrate(t, values)
+        if t is not None and len(t) > 0:
+            filtered = self._filter(values)
+            # output rate
+            k = t // self.output_step_ns
+            out = np.concatenate(([self.t_last_output is None or k[0] > self.t_last_output], k[1:] > k[:-1]))
+            self.t_last_output = k[-1]
+            if out.any():
+                results = self._coefficients(t[out], filtered[out])
+                self.results.append(t[out], results)
+                df = pd.DataFrame(results, columns=result_columns,
+                                  index=pd.DatetimeIndex(t[out].view("datetime64[ns]")).tz_localize("UTC"))
+        return df
+
+    def window_statistics(self, window_s=5.):
+        """
+        mean and standard deviation of the results of the last window_s seconds (steadiness of the current segment)
+        :return:    pandas DataFrame with "mean" and "std" column, indexed by result channel
+        """
+        t, results = self.results.data()
+        if len(t) == 0:
+            return pd.DataFrame(index=result_columns, columns=["mean", "std"], dtype=float)
+        recent = results[t >= t[-1] - int(window_s * 1e9)]
+        return pd.DataFrame({"mean": np.nanmean(recent, axis=0), "std": np.nanstd(recent, axis=0)},
+                            index=result_columns)
+
+    def status(self):
+        if self.stream.t0 is None:
+            return "waiting for GPS fix"
+        if self.calibration_error is not None:
+            return "zero flow calibration refused: " + self.calibration_error
+        if self.offsets is None:
+            if len(self.tails) > 0:
+                return "zero flow calibration (waiting for {0:.0f} s of data)".format(self.calibration_ns / 1e9)
+            return "zero flow calibration ({0:.0f} s)".format(self.n_calibration / self.sample_rate)
+        return "evaluating"
+
+
+def steady(stats, alpha_std_max=0.1, U_rel_std_max=0.02):
+    """
+    steadiness criterion of the current segment (window statistics of LiveEvaluator)
+    """
+    return stats.loc["alpha", "std"] <= alpha_std_max and \
+        stats.loc["U_TAS", "std"] <= U_rel_std_max * abs(stats.loc["U_TAS", "mean"])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="live evaluation of a growing run")
+    parser.add_argument("data_dir", help="directory of raw data files")
+    parser.add_argument("filename", help="common file name start, e.g. 20230926-1713")
+    parser.add_argument("--geometry", required=True, help="pickle of tap DataFrame (df_airfoil)")
+    parser.add_argument("--l-ref", type=float, default=0.5, help="chord length in m")
+    parser.add_argument("--alpha-sens-offset", type=float, default=214.73876953125, help="AOA sensor offset")
+    parser.add_argument("--defective-sensors", type=int, nargs="*", default=[0], help="defective wake rake probes")
+    parser.add_argument("--flap-pivots", type=float, nargs="*", default=[], help="x_LE y_LE x_TE y_TE")
+    parser.add_argument("--cp-wall-correction", default=None,
+                        help="cp distribution file of the wall correction (see calc_wall_correction_coefficients); "
+                             "default: no wall correction")
+    parser.add_argument("--probe-position", type=float, nargs=2, default=None, metavar=("X", "Z"),
+                        help="static reference probe position relative to the leading edge in m")
+    parser.add_argument("--interval", type=float, default=0.2, help="update interval in s")
+    parser.add_argument("--window", type=float, default=5., help="window of segment statistics in s")
+    parser.add_argument("--calibration", type=float, default=20., help="zero flow interval at start in s")
+    parser.add_argument("--calibration-file", default=None,
+                        help="calibration pickle of the measurement software (*_sensor_calibration_data.p) instead of "
+                             "the zero flow interval")
+    parser.add_argument("--max-calibration-speed", type=float, default=10.,
+                        help="refuse zero flow calibration above this U_CAS in m/s")
+    parser.add_argument("--cutoff", type=float, default=2., help="cutoff frequency of low-pass filter in Hz")
+    parser.add_argument("--rate", type=float, default=10., help="output rate in Hz")
+    parser.add_argument("--log", default=None, help="CSV file, results are appended to")
+    parser.add_argument("--timeout", type=float, default=30., help="stop after this time without new data in s")
+    args = parser.parse_args()
+
+    prandtl_data = {"unit name static": "static_K04", "i_sens_static": 31,
+                    "unit name total": "static_K04", "i_sens_total": 32}
+    lambda_wall, sigma_wall, xi_wall = 0., 0., 0.
+    if args.cp_wall_correction is not None:
+        from wall_correction import calc_wall_correction_coefficients
+
+        lambda_wall, sigma_wall, xi_wall = calc_wall_correction_coefficients(args.cp_wall_correction, args.l_ref,
+                                                                             args.probe_position)
+    offsets = None
+    if args.calibration_file is not None:
+        from calibration import offsets_from_file
+
+        offsets, _, _ = offsets_from_file(args.calibration_file)
+    evaluator = LiveEvaluator(args.data_dir, args.filename, pd.read_pickle(args.geometry), args.l_ref,
+                              args.alpha_sens_offset, prandtl_data, defective_sensor_list=args.defective_sensors,
+                              flap_pivots=np.reshape(args.flap_pivots, (-1, 2)), lambda_wall=lambda_wall,
+                              sigma_wall=sigma_wall, xi_wall=xi_wall, calibration_s=args.calibration, offsets=offsets,
+                              max_calibration_speed=args.max_calibration_speed, cutoff_Hz=args.cutoff,
+                              output_rate=args.rate)
+
+    t_last_data = time.monotonic()
+    while time.monotonic() - t_last_data < args.timeout:
+        t_loop = time.monotonic()
+        df_new = evaluator.update()
+        if len(df_new.index) > 0:
+            t_last_data = t_loop
+            if args.log is not None:
+                df_new.to_csv(args.log, mode="a", header=not os.path.exists(args.log))
+            stats = evaluator.window_statistics(args.window)
+            last = df_new.iloc[-1]
+            sys.stdout.write("\r{0:%H:%M:%S}  alpha {1:6.2f}  cl {2:6.3f}  cd {3:7.4f}  cm {4:6.3f}  Re {5:8.0f}  "
+                             "std alpha {6:5.2f}  std cl {7:6.3f}  {8:<8} ({9:4.0f} ms)".format(
+                                 df_new.index[-1], last["alpha"], last["cl"], last["cd"], last["cm"], last["Re"],
+                                 stats.loc["alpha", "std"], stats.loc["cl", "std"],
+                                 "steady" if steady(stats) else "unsteady", evaluator.t_update * 1000.))
+        else:
+            sys.stdout.write("\r" + evaluator.status())
+        sys.stdout.flush()
+        time.sleep(max(0., args.interval - (time.monotonic() - t_loop)))
+    print()
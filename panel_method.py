@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+2-D panel method (Hess-Smith: constant strength source panels plus one constant vortex strength with Kutta condition)
+for an airfoil between two plane tunnel walls. The walls are modelled by the image method, all influence
+coefficients are calculated with numpy broadcasting.
+"""
+import hashlib
+import numpy as np
+from profiling import profiler
+
+# solved panel systems {key: dict}, one entry per geometry, reference length and wall configuration
+_systems = dict()
+
+
+def _source_velocity(xp, zp, x1, z1, x2, z2):
+    """
+    velocity induced by constant strength source panels of unit strength per length at field points. All arguments
+    are broadcast against each other
+    :return:        tuple (u, w) of global velocity components
+    """
+    dx = x2 - x1
+    dz = z2 - z1
+    L = np.hypot(dx, dz)
+    cx = dx / L
+    cz = dz / L
+
+    # field point in panel coordinates
+    xl = (xp - x1) * cx + (zp - z1) * cz
+    zl = -(xp - x1) * cz + (zp - z1) * cx
+
+    r1_sq = xl ** 2 + zl ** 2
+    r2_sq = (xl - L) ** 2 + zl ** 2
+    ul = np.log(r1_sq / r2_sq) / (4 * np.pi)
+    wl = (np.arctan2(zl, xl - L) - np.arctan2(zl, xl)) / (2 * np.pi)
+
+    return ul * cx - wl * cz, ul * cz + wl * cx
+
+
+def _images(z, d1, d2, n_images):
+    """
+    z coordinates of the wall images and their reflection parity. The walls are located at z = d1 and z = -d2.
+    The first entry is the original (parity 0)
+    :return:        tuple (z_img, parity) of numpy.ndarrays of shape (n, ...) with n = 2*(2*n_images+1)
+    """
+    h = d1 + d2
+    n = np.arange(-n_images, n_images + 1)
+    n = np.concatenate(([0], n[n != 0]))
+    z_straight = z[np.newaxis, ...] + 2 * h * n.reshape((-1,) + (1,) * np.ndim(z))
+    z_mirrored = 2 * d1 - z[np.newaxis, ...] + 2 * h * n.reshape((-1,) + (1,) * np.ndim(z))
+    parity = np.concatenate((np.zeros(len(n)), np.ones(len(n))))
+    return np.concatenate((z_straight, z_mirrored)), parity
+
+
+def _influence(xp, zp, x1, z1, x2, z2, d1, d2, n_images):
+    """
+    influence of all source panels (including images) and of the common unit vortex strength at field points
+    :return:        tuple (u_src, w_src, u_vor, w_vor) with source arrays of shape (n_points, n_panels) and vortex
+                    arrays of shape (n_points,)
+    """
+    z1_img, parity = _images(z1, d1, d2, n_images)
+    z2_img, _ = _images(z2, d1, d2, n_images)
+
+    u, w = _source_velocity(xp[np.newaxis, :, np.newaxis], zp[np.newaxis, :, np.newaxis],
+                            x1[np.newaxis, np.newaxis, :], z1_img[:, np.newaxis, :],
+                            x2[np.newaxis, np.newaxis, :], z2_img[:, np.newaxis, :])
+
+    # source images have the same sign, vortex images alternate in sign with each reflection
+    u_src = u.sum(axis=0)
+    w_src = w.sum(axis=0)
+    sign = (1 - 2 * parity)[:, np.newaxis, np.newaxis]
+    # velocity of a vortex panel is the source velocity rotated by -90 deg
+    u_vor = (sign * w).sum(axis=(0, 2))
+    w_vor = -(sign * u).sum(axis=(0, 2))
+
+    return u_src, w_src, u_vor, w_vor
+
+
+def _panels(coords, l_ref):
+    """
+    panel end points in m, ordered clockwise (so the left normal points out of the airfoil), zero length panels removed
+    """
+    coords = np.asarray(coords, dtype=float)[:, :2] * l_ref
+    # signed area > 0: counter clockwise ordering (XFOIL: trailing edge - upper side - leading edge - lower side)
+    x, z = coords.T
+    if np.sum(x[:-1] * z[1:] - x[1:] * z[:-1]) > 0:
+        coords = coords[::-1]
+    keep = np.concatenate(([True], np.hypot(*np.diff(coords, axis=0).T) > 1e-12 * l_ref))
+    coords = coords[keep]
+    return coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1]
+
+
+def solve_panel_system(coords, l_ref, d1=np.inf, d2=np.inf, n_images=20):
+    """
+    sets up and solves the panel system of an airfoil at zero angle of attack and U_inf = 1 between tunnel walls.
+    Results are cached per geometry, reference length and wall configuration
+    :param coords:      numpy.ndarray of shape (n, 2) with normalized airfoil coordinates (e.g. at.Airfoil.coords)
+    :param l_ref:       reference length (chord length) in m
+    :param d1:          distance of upper tunnel wall to chord line in m (np.inf: no wall)
+    :param d2:          distance of lower tunnel wall to chord line in m (np.inf: no wall)
+    :param n_images:    number of image repetitions in each direction
+    :return:            dict with panel end points, source strengths q and vortex strength gamma
+    """
+    if np.isinf(d1) or np.isinf(d2):
+        d1 = d2 = np.inf
+        n_images = 0
+    coords = np.ascontiguousarray(coords, dtype=np.float64)
+    key = (hashlib.sha1(coords.tobytes()).hexdigest(), float(l_ref), float(d1), float(d2), int(n_images))
+    if key in _systems:
+        return _systems[key]
+
+    x1, z1, x2, z2 = _panels(coords, l_ref)
+    n_pan = len(x1)
+    L = np.hypot(x2 - x1, z2 - z1)
+    tx, tz = (x2 - x1) / L, (z2 - z1) / L
+    nx, nz = -tz, tx
+    xc, zc = (x1 + x2) / 2, (z1 + z2) / 2
+
+    if np.isinf(d1):
+        # free flight: no images
+        u_src, w_src = _source_velocity(xc[:, np.newaxis], zc[:, np.newaxis], x1, z1, x2, z2)
+        u_vor, w_vor = w_src.sum(axis=1), -u_src.sum(axis=1)
+    else:
+        u_src, w_src, u_vor, w_vor = _influence(xc, zc, x1, z1, x2, z2, d1, d2, n_images)
+
+    # self induced velocity of panels on their own collocation points (outer side)
+    i = np.arange(n_pan)
+    u_self, w_self = _source_velocity(xc, zc, x1, z1, x2, z2)
+    u_src[i, i] += 0.5 * nx - u_self
+    w_src[i, i] += 0.5 * nz - w_self
+    u_vor += 0.5 * tx - w_self
+    w_vor += 0.5 * tz + u_self
+
+    # normal and tangential influence coefficients
+    A_n = u_src * nx[:, np.newaxis] + w_src * nz[:, np.newaxis]
+    A_t = u_src * tx[:, np.newaxis] + w_src * tz[:, np.newaxis]
+    B_n = u_vor * nx + w_vor * nz
+    B_t = u_vor * tx + w_vor * tz
+
+    # no penetration on all panels, Kutta condition on first and last panel (trailing edge)
+    A = np.zeros((n_pan + 1, n_pan + 1))
+    A[:n_pan, :n_pan] = A_n
+    A[:n_pan, n_pan] = B_n
+    A[n_pan, :n_pan] = A_t[0] + A_t[-1]
+    A[n_pan, n_pan] = B_t[0] + B_t[-1]
+    rhs = -np.concatenate((nx, [tx[0] + tx[-1]]))
+
+    from scipy import linalg
+    profiler.count("panel_solve")
+    sol = linalg.lu_solve(linalg.lu_factor(A), rhs)
+
+    system = dict(x1=x1, z1=z1, x2=x2, z2=z2, q=sol[:n_pan], gamma=sol[n_pan], d1=d1, d2=d2, n_images=n_images,
+                  x=xc, z=zc, V_t=tx + A_t @ sol[:n_pan] + B_t * sol[n_pan])
+    _systems[key] = system
+    return system
+
+
+def velocity(system, xp, zp):
+    """
+    calculates velocity (U_inf = 1) at field points in the flow field of a solved panel system
+    :param system:      dict from solve_panel_system
+    :param xp:          x coordinates of field points in m
+    :param zp:          z coordinates of field points in m
+    :return:            tuple (u, w) of numpy.ndarrays
+    """
+    xp = np.atleast_1d(np.asarray(xp, dtype=float))
+    zp = np.atleast_1d(np.asarray(zp, dtype=float))
+    if np.isinf(system["d1"]):
+        u_src, w_src = _source_velocity(xp[:, np.newaxis], zp[:, np.newaxis], system["x1"], system["z1"],
+                                        system["x2"], system["z2"])
+        u_vor, w_vor = w_src.sum(axis=1), -u_src.sum(axis=1)
+    else:
+        u_src, w_src, u_vor, w_vor = _influence(xp, zp, system["x1"], system["z1"], system["x2"], system["z2"],
+                                                system["d1"], system["d2"], system["n_images"])
+    u = 1.0 + u_src @ system["q"] + u_vor * system["gamma"]
+    w = w_src @ system["q"] + w_vor * system["gamma"]
+    return u, w
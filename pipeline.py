@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+importable evaluation pipeline. Exposes the processing stages of Auswertung.py and evaluates complete runs from an
+explicit configuration dict (instead of the settings in __main__ of Auswertung.py). Importing this module loads only
+numpy and pandas; matplotlib, pyproj, pynmea2, scipy and airfoilwinggeometry are imported by the stages using them.
+
+Example:
+import pipeline
+config = pipeline.make_config({"name": "T012_R27", "data_dir": "R027", ...})
+df_polar = pipeline.evaluate_polar(config)
+"""
+import os
+import numpy as np
+import pandas as pd
+
+from Auswertung import read_AOA_file, read_GPS, read_drive, read_DLR_pressure_scanner_file, synchronize_data, \
+    filter_data, read_airfoil_geometry, calc_ptot_pstat, calc_airspeed_wind, calc_cp, calc_cl_cm_cdp, calc_cd, \
+    calc_x_trans, calculate_polar, raw_data_paths, read_and_synchronize, parse_calibration_info, apply_calibration, \
+    read_segment_definition, flap_angles, load_measurement, calc_time_series
+from wall_correction import calc_wall_correction_coefficients
+from result_cache import FileContent, ResultCache, hash_inputs
+from wind_estimation import estimate_wind, segment_wind
+
+__all__ = ["read_AOA_file", "read_GPS", "read_drive", "read_DLR_pressure_scanner_file", "synchronize_data",
+           "filter_data", "read_airfoil_geometry", "calc_ptot_pstat", "calc_airspeed_wind", "calc_cp",
+           "calc_cl_cm_cdp", "calc_cd", "calc_x_trans", "calculate_polar", "raw_data_paths", "read_and_synchronize",
+           "parse_calibration_info", "apply_calibration", "read_segment_definition", "flap_angles",
+           "load_measurement", "calc_time_series", "calc_wall_correction_coefficients", "default_config",
+           "required_keys", "path_keys", "polar_columns", "wind_polar_columns", "make_config", "evaluate_polar"]
+
+# optional keys of a run configuration
+default_config = {"T_air": 288.,
+                  "ptot_method": "gaussian_fit_average",
+                  "sync_drive": False,
+                  "pickle_path_msr_pts": "",
+                  "ref_dat_path": "",
+                  "XFOIL_polar_files": [],
+                  "use_result_cache": True,
+                  "result_cache_max_bytes": 5 * 1024 ** 3,
+                  "check_sensors": False,
+                  "calc_wind": False,
+                  "probe_position": None,
+                  "plot_polar": False,
+                  "PPAX": None,
+                  "profile": False}
+
+# keys, which every run configuration must contain (named like the variables in __main__ of Auswertung.py)
+required_keys = ["name", "data_dir", "segments_def_dir", "seg_def_files", "foil_coord_path", "file_path_msr_pts",
+                 "cp_path_wall_correction", "alpha_sens_offset", "l_ref", "flap_pivots", "defective_sensor_list",
+                 "prandtl_data"]
+
+# keys holding paths, which are resolved relative to base_dir
+path_keys = ["data_dir", "segments_def_dir", "foil_coord_path", "file_path_msr_pts", "pickle_path_msr_pts",
+             "cp_path_wall_correction", "ref_dat_path"]
+
+# polar columns returned by evaluate_polar
+polar_columns = ['alpha', 'Re', 'cl', 'cd', 'cdp', "cd_extrapol_flag", 'U_CAS', 'U_TAS', 'cm', 'cmr_LE', 'cmr_TE']
+
+# polar columns added by evaluate_polar, if calc_wind is set
+wind_polar_columns = ['wind_component', 'gust_rms', 'wind_quality']
+
+
+def make_config(config, defaults=None, base_dir=None):
+    """
+    completes and checks a run configuration
+    :param config:      dict with run configuration
+    :param defaults:    dict with defaults overriding default_config (e.g. common settings of a campaign)
+    :param base_dir:    directory, relative paths are resolved against. If None, paths are used as given
+    :return:            complete run configuration dict
+    """
+    run = dict(default_config)
+    if defaults is not None:
+        run.update(defaults)
+    run.update(config)
+
+    missing = [key for key in required_keys if key not in run]
+    if len(missing) > 0:
+        raise ValueError("run configuration {0} misses keys {1}".format(run.get("name"), ", ".join(missing)))
+
+    if base_dir is not None:
+        for key in path_keys:
+            if run[key] != "":
+                run[key] = os.path.join(base_dir, run[key])
+    run["flap_pivots"] = np.array(run["flap_pivots"], dtype=float)
+
+    return run
+
+
+def evaluate_polar(config, result_cache=None, sensor_check_dir=None):
+    """
+    evaluates all segment definition files of one run
+    :param config:              run configuration (see make_config)
+    :param result_cache:        ResultCache object. If None, a cache in data_dir is used (if use_result_cache is set)
+    :param sensor_check_dir:    if given, sensor health reports are written to this directory
+    :return:                    pandas DataFrame with polar_columns (and wind_polar_columns, if calc_wind is set),
+                                "seg_def_file" and "eta_TE_flap" column
+    """
+    if result_cache is None:
+        result_cache = ResultCache(os.path.join(config["data_dir"], "result_cache"),
+                                   max_bytes=config["result_cache_max_bytes"], enabled=config["use_result_cache"])
+    defective_sensor_list = config["defective_sensor_list"]
+    prandtl_data = config["prandtl_data"]
+    flap_pivots = config["flap_pivots"]
+
+    list_of_df_polars = []
+    for seg_def_file in config["seg_def_files"]:
+        segments_def_path = os.path.join(config["segments_def_dir"], seg_def_file)
+        raw_data_filenames, calibration_infos, etas_TE_flap, etas_LE_flap, df_segments = \
+            read_segment_definition(segments_def_path)
+
+        l_ref = config["l_ref"]
+        list_of_dfs = []
+        list_of_calibration_keys = []
+        for i, filename in enumerate(raw_data_filenames):
+            eta_TE_flap, eta_LE_flap = flap_angles(etas_TE_flap, etas_LE_flap, i)
+            df_airfoil, at_airfoil = read_airfoil_geometry(config["file_path_msr_pts"], c=config["l_ref"],
+                                                           foil_source=config["foil_coord_path"],
+                                                           eta_LE_flap=eta_LE_flap, eta_TE_flap=eta_TE_flap,
+                                                           flap_pivots=flap_pivots,
+                                                           pickle_file=config["pickle_path_msr_pts"])
+            lambda_wall, sigma_wall, xi_wall = calc_wall_correction_coefficients(config["cp_path_wall_correction"],
+                                                                                 l_ref, config["probe_position"])
+            df_sync, l_ref_calibration, calibration_key = load_measurement(
+                config["data_dir"], filename, calibration_infos[i], df_airfoil, sigma_wall,
+                config["alpha_sens_offset"], config["sync_drive"], config["T_air"], prandtl_data,
+                defective_sensor_list, result_cache=result_cache, sensor_check_dir=sensor_check_dir)
+            if l_ref_calibration is not None:
+                l_ref = l_ref_calibration
+            list_of_dfs.append(df_sync)
+            list_of_calibration_keys.append(calibration_key)
+        df_sync = pd.concat(list_of_dfs)
+
+        # same key as in __main__ of Auswertung.py, so that both share cached polars
+        wall_coefficients = [lambda_wall, sigma_wall, xi_wall]
+        polar_key = hash_inputs(list_of_calibration_keys, FileContent(segments_def_path), df_airfoil, prandtl_data,
+                                l_ref, flap_pivots, wall_coefficients, defective_sensor_list, config["ptot_method"])
+        df_polar = result_cache.cached("polar", polar_key, calculate_polar, df_sync, df_segments, prandtl_data,
+                                       df_airfoil, l_ref, flap_pivots, lambda_wall, sigma_wall, xi_wall,
+                                       defective_sensor_list, total_ref_pressure_method=config["ptot_method"])
+        result_columns = list(polar_columns)
+        if config["calc_wind"]:
+            # wind of segments, gusts from unfiltered airspeed (same keys as in __main__ of Auswertung.py)
+            filter_key = hash_inputs(list_of_calibration_keys)
+            df_filt = result_cache.cached("filter", filter_key, lambda: filter_data(df_sync.copy()))
+            time_series_key = hash_inputs(filter_key, df_airfoil, prandtl_data, l_ref, flap_pivots, wall_coefficients,
+                                          defective_sensor_list, "trimmed average")
+            df_raw, df_filt, _ = result_cache.cached("time_series", time_series_key, calc_time_series, df_sync,
+                                                     df_filt, df_airfoil, prandtl_data, l_ref, flap_pivots,
+                                                     lambda_wall, sigma_wall, xi_wall, defective_sensor_list,
+                                                     total_ref_pressure_method="trimmed average")
+            df_filt = estimate_wind(df_filt, df_raw["U_TAS"])
+            df_polar = df_polar.join(segment_wind(df_filt, df_segments))
+            result_columns += wind_polar_columns
+        df_polar = df_polar.loc[:, result_columns]
+        df_polar["seg_def_file"] = seg_def_file
+        df_polar["eta_TE_flap"] = eta_TE_flap
+        list_of_df_polars.append(df_polar)
+
+    result_cache.flush_stats()
+    return pd.concat(list_of_df_polars, ignore_index=True)
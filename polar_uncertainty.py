@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo uncertainty of the polar points. The segment means of all pressures, alpha and T_air are perturbed by the
+main error sources and propagated through the coefficient calculations as batched array operations
+(samples x segments x sensors), i.e. thousands of perturbed polars without DataFrame stages or per-row loops:
+--> sensor noise: standard error of the segment mean (noise correlated over noise_correlation_s)
+--> calibration offset: one offset per pressure sensor and sample, the same for all segments of the run
+--> alpha encoder resolution: uniform quantization error of half a step
+--> rake position: position error of every wake rake probe (trapezoidal weights of the drag integral per sample)
+--> wall correction coefficients: relative error of lambda, sigma and xi (sigma also scales alpha)
+--> air temperature (Reynolds number)
+
+The batched model uses the vectorizable total pressure methods; for "gaussian_fit_average" it uses "trimmed average"
+and it integrates the drag over the measured rake range only. The perturbations are therefore added to the polar of
+calculate_polar: value = polar value + (sample of model - unperturbed model). Where cd of the polar comes from another
+drag model (Gaussian extrapolation beyond the rake, cd_extrapol_flag, or wake traverse, cd_traverse_flag), the cd
+intervals are NaN.
+
+Usage:
+from polar_uncertainty import polar_uncertainty
+df_unc = polar_uncertainty(df_sync, df_segments, df_polar, prandtl_data, df_airfoil, l_ref, lambda_wall, sigma_wall,
+                           xi_wall, defective_sensor_list, n_samples=2000)
+df_polar = df_polar.join(df_unc)        # columns cl_std, cl_lower, cl_upper, cd_std, ...
+"""
+import numpy as np
+import pandas as pd
+
+from Auswertung import _calc_rake_sensor_pos
+from fast_engines import linear_interpolation_matrix, trapezoid_weights
+from profiling import profiled
+from segment_figures import _segment_mean_std
+
+# standard deviations of the error sources (see module docstring), units in the names
+default_error_model = {"noise_correlation_s": 0.5,
+                       "calibration_offset_Pa": 2.0,
+                       "alpha_resolution_deg": 360 / 2**14 * 60 / (306 * 2),
+                       "rake_position_mm": 0.2,
+                       "wall_coefficients_rel": 0.1,
+                       "T_air_K": 1.0}
+
+uncertainty_quantities = ["alpha", "cl", "cd", "cm", "Re"]
+
+
+def _trapezoid_weights_batched(z):
+    """
+    trapezoidal weights along the last axis of z (see fast_engines.trapezoid_weights)
+    """
+    w = np.zeros_like(z)
+    dz = np.diff(z, axis=-1)
+    w[..., :-1] += 0.5 * dz
+    w[..., 1:] += 0.5 * dz
+    return w
+
+
+def _channels(df_airfoil, prandtl_data, defective_sensor_list):
+    """
+    column names of airfoil taps, wake rake probes and Prandtl probe
+    :return:    tuple (tap columns, total pressure rake columns, static pressure rake columns, Prandtl total column,
+                Prandtl static column)
+    """
+    cols_taps = ["static_K0{0:d}_{1:d}".format(df_airfoil.loc[i, "Sensor unit K"], df_airfoil.loc[i, "Sensor port"])
+                 for i in df_airfoil.index[1:-1]]
+    cols_tot = [f'ptot_rake_{i}' for i in range(1, 33) if i not in np.array(defective_sensor_list) + 1]
+    cols_stat = [f'pstat_rake_{i}' for i in range(1, 6)]
+    col_total = prandtl_data['unit name total'] + '_' + str(prandtl_data['i_sens_total'])
+    col_static = prandtl_data['unit name static'] + '_' + str(prandtl_data['i_sens_static'])
+    return cols_taps, cols_tot, cols_stat, col_total, col_static
+
+
+def batched_coefficients(p, alpha, T_air, wall, z_tot, channels, df_airfoil, l_ref, total_ref_pressure_method):
+    """
+    alpha, cl, cd, cm and Re of perturbed segment means (same equations as calc_ptot_pstat, calc_airspeed_wind,
+    calc_cp, calc_cl_cm_cdp and calc_cd without drag extrapolation)
+    :param p:           numpy.ndarray (samples, segments, channels) of pressures in Pa
+    :param alpha:       numpy.ndarray (samples, segments) of wall corrected angles of attack in deg
+    :param T_air:       numpy.ndarray (samples, segments) of air temperatures in K
+    :param wall:        numpy.ndarray (samples, 3) of lambda_wall, sigma_wall, xi_wall
+    :param z_tot:       numpy.ndarray (samples, total pressure probes) of rake probe positions in mm
+    :param channels:    dict of channel positions in p ("taps", "tot", "stat", "total", "static")
+    :return:            dict of numpy.ndarrays (samples, segments)
+    """
+    # total and static reference pressure
+    p_rake = p[..., channels["tot"]]
+    n = p_rake.shape[-1]
+    if total_ref_pressure_method == "prandtl":
+        ptot = p[..., channels["total"]]
+    elif total_ref_pressure_method == "trimmed median":
+        ptot = np.median(np.sort(p_rake, axis=-1)[..., int(np.floor(n * 0.7)):int(np.ceil(n))], axis=-1)
+    else:
+        ptot = np.mean(np.sort(p_rake, axis=-1)[..., int(n * 0.7):int(n * 0.95)], axis=-1)
+    pstat = p[..., channels["static"]]
+
+    # Reynolds number
+    R_s = 287.0500676
+    mu = (1.458E-6 * T_air ** (3 / 2)) / (T_air + 110.4)
+    rho = pstat / (R_s * T_air)
+    U_TAS = np.sqrt(np.abs(2 * np.abs(ptot - pstat) / rho))
+    Re = U_TAS * l_ref * rho / mu
+
+    # pressure coefficients
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cp = (p - pstat[..., None]) / (ptot - pstat)[..., None]
+    cp = np.where(np.isfinite(cp), cp, 0.)
+
+    # lift and moment coefficients (virtual trailing edge taps at both ends)
+    cp_taps = cp[..., channels["taps"]]
+    virtual_TE = (cp_taps[..., :1] + cp_taps[..., -1:]) / 2
+    cp_taps = np.concatenate((virtual_TE, cp_taps, virtual_TE), axis=-1)
+    w = trapezoid_weights(df_airfoil["s"].to_numpy(dtype=float))
+    x_n = df_airfoil["x_n"].to_numpy(dtype=float)
+    y_n = df_airfoil["y_n"].to_numpy(dtype=float)
+    xy = df_airfoil[["x", "y"]].to_numpy(dtype=float)
+    c_x = cp_taps @ (x_n * w)
+    c_y = cp_taps @ (y_n * w)
+    alpha_rad = np.deg2rad(alpha)
+    lambda_wall, sigma_wall, xi_wall = wall[:, 0:1], wall[:, 1:2], wall[:, 2:3]
+    factor_cm = 1 - 2 * lambda_wall * (sigma_wall + xi_wall)
+    cl = -(-np.sin(alpha_rad) * c_x + np.cos(alpha_rad) * c_y) * (factor_cm - sigma_wall)
+    cm = -(cp_taps @ (np.cross(np.column_stack((x_n, y_n)), np.array([0.25, 0.]) - xy) * w)) * factor_cm
+
+    # drag coefficient of measured rake range, probe positions of every sample
+    _, z_stat = _calc_rake_sensor_pos()
+    cp_tot = cp[..., channels["tot"]]
+    cp_stat = cp[..., channels["stat"]] @ linear_interpolation_matrix(z_stat, z_tot.mean(axis=0)).T
+    d_cd_jones = 2.0 * np.sqrt(np.abs(cp_tot - cp_stat)) * (1.0 - np.sqrt(np.abs(cp_tot)))
+    cd = np.einsum("skn,sn->sk", d_cd_jones, _trapezoid_weights_batched(z_tot)) / (l_ref * 1000.0) * factor_cm
+
+    return {"alpha": alpha, "cl": cl, "cd": cd, "cm": cm, "Re": Re}
+
+
+@profiled()
+def polar_uncertainty(df_raw, df_segments, df_polar, prandtl_data, df_airfoil, l_ref, lambda_wall, sigma_wall, xi_wall,
+                      defective_sensor_list, total_ref_pressure_method="trimmed average",
+                      error_model=None, n_samples=2000, confidence=0.95, seed=0, chunk_size=500):
+    """
+    confidence intervals of the polar points
+    :param df_raw:                      synchronized and calibrated data (input of calculate_polar)
+    :param df_segments:                 segment start and end times
+    :param df_polar:                    polar (calculate_polar)
+    :param total_ref_pressure_method:   see calc_ptot_pstat
+    :param error_model:                 dict with standard deviations, missing keys from default_error_model
+    :param n_samples:                   number of Monte Carlo samples
+    :param confidence:                  confidence level of the intervals
+    :param seed:                        seed of the random generator
+    :param chunk_size:                  samples evaluated at once (memory)
+    :return:                            pandas DataFrame (index of df_polar) with "<quantity>_std",
+                                        "<quantity>_lower" and "<quantity>_upper" of uncertainty_quantities (cd: NaN
+                                        for extrapolated or traverse drag)
+    """
+    error_model = {**default_error_model, **(error_model or dict())}
+    rng = np.random.default_rng(seed)
+
+    # channel positions in the pressure array
+    cols_taps, cols_tot, cols_stat, col_total, col_static = _channels(df_airfoil, prandtl_data, defective_sensor_list)
+    columns = list(dict.fromkeys(cols_taps + cols_tot + cols_stat + [col_total, col_static]))
+    channels = {"taps": [columns.index(col) for col in cols_taps], "tot": [columns.index(col) for col in cols_tot],
+                "stat": [columns.index(col) for col in cols_stat], "total": columns.index(col_total),
+                "static": columns.index(col_static)}
+
+    # segment means and standard errors (segments of df_polar, end time included as in calculate_polar)
+    segments = df_segments.loc[df_polar.index]
+    i_start = df_raw.index.searchsorted(segments["start"])
+    i_end = df_raw.index.searchsorted(segments["end"], side="right")
+    values = df_raw[columns + ["alpha", "T_air"]].to_numpy(dtype=float)
+    mean, std = _segment_mean_std(values, i_start, i_end)
+    duration = (pd.DatetimeIndex(segments["end"]) - pd.DatetimeIndex(segments["start"])).total_seconds().to_numpy()
+    n_eff = np.maximum(np.minimum(i_end - i_start, duration / error_model["noise_correlation_s"]), 1.)
+    std_error = std / np.sqrt(n_eff)[:, None]
+
+    z_tot, _ = _calc_rake_sensor_pos(defective_sensor_list=defective_sensor_list)
+    wall = np.array([lambda_wall, sigma_wall, xi_wall], dtype=float)
+    n_seg, n_ch = len(segments), len(columns)
+
+    def evaluate(p, alpha, T_air, wall_samples, z_samples):
+        return batched_coefficients(p, alpha, T_air, wall_samples, z_samples, channels, df_airfoil, l_ref,
+                                    total_ref_pressure_method)
+
+    # unperturbed model
+    nominal = evaluate(mean[None, :, :n_ch], mean[None, :, n_ch], mean[None, :, n_ch + 1], wall[None], z_tot[None])
+
+    samples = {quantity: [] for quantity in uncertainty_quantities}
+    for n in np.diff(np.append(np.arange(0, n_samples, chunk_size), n_samples)):
+        # sensor noise and calibration offsets (one offset per sensor and sample for all segments)
+        p = mean[None, :, :n_ch] + std_error[None, :, :n_ch] * rng.standard_normal((n, n_seg, n_ch)) + \
+            error_model["calibration_offset_Pa"] * rng.standard_normal((n, 1, n_ch))
+        # wall correction coefficients, sigma_wall was applied to alpha in read_AOA_file
+        wall_samples = wall * (1 + error_model["wall_coefficients_rel"] * rng.standard_normal((n, 3)))
+        alpha = mean[None, :, n_ch] / (1 + sigma_wall) * (1 + wall_samples[:, 1:2]) + \
+            std_error[None, :, n_ch] * rng.standard_normal((n, n_seg)) + \
+            error_model["alpha_resolution_deg"] * rng.uniform(-0.5, 0.5, (n, n_seg))
+        T_air = mean[None, :, n_ch + 1] + error_model["T_air_K"] * rng.standard_normal((n, 1))
+        z_samples = z_tot + error_model["rake_position_mm"] * rng.standard_normal((n, len(z_tot)))
+
+        result = evaluate(p, alpha, T_air, wall_samples, z_samples)
+        for quantity in uncertainty_quantities:
+            samples[quantity].append(result[quantity] - nominal[quantity])
+
+    # intervals around the polar of calculate_polar
+    q_lower, q_upper = (1 - confidence) / 2, (1 + confidence) / 2
+    data = dict()
+    for quantity in uncertainty_quantities:
+        delta = np.concatenate(samples[quantity])
+        data[quantity + "_std"] = delta.std(axis=0, ddof=1)
+        data[quantity + "_lower"] = df_polar[quantity].to_numpy(dtype=float) + np.quantile(delta, q_lower, axis=0)
+        data[quantity + "_upper"] = df_polar[quantity].to_numpy(dtype=float) + np.quantile(delta, q_upper, axis=0)
+
+    # drag of other models than the rake range integral
+    other_drag = np.zeros(len(df_polar), dtype=bool)
+    for flag in ["cd_extrapol_flag", "cd_traverse_flag"]:
+        if flag in df_polar.columns:
+            other_drag |= df_polar[flag].fillna(False).to_numpy(dtype=bool)
+    for key in ["cd_std", "cd_lower", "cd_upper"]:
+        data[key] = np.where(other_drag, np.nan, data[key])
+    return pd.DataFrame(data, index=df_polar.index)
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+stage-level instrumentation of the evaluation pipeline. For every call of an instrumented stage wall time, CPU time,
+memory (change of the resident set size, optionally the traced peak), rows and columns of the resulting DataFrame and
+the counts of expensive calls (curve_fit invocations, root solves) are recorded. The profiler is disabled by default; then an instrumented function costs one attribute lookup
+more per call.
+
+Usage:
+from profiling import profiler
+profiler.enable()               # or environment variable AUSWERTUNG_PROFILE=1
+... run evaluation ...
+profiler.print_table()
+profiler.write_json("profile.json")
+"""
+import os
+import sys
+import json
+import time
+import functools
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _rss():
+    """
+    current resident set size of the process in bytes (psutil, or /proc on Linux), None if not available
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Profiler:
+    """
+    records stage calls. Stages can be nested; wall/CPU times and counters of a stage include its sub-stages
+    """
+
+    def __init__(self, enabled=False, trace_memory=False):
+        """
+        :param enabled:         if False, nothing is recorded
+        :param trace_memory:    if True, peak memory of every stage is traced with tracemalloc (slows down allocations
+                                considerably). The change of the resident set size of every stage and the peak
+                                resident set size of the process are always recorded (if available)
+        """
+        self.enabled = False
+        self.trace_memory = trace_memory
+        self.records = []
+        self.counters = dict()
+        self._stack = []
+        self._n_started = 0
+        if enabled:
+            self.enable()
+
+    def enable(self, trace_memory=None):
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = False
+
+    def reset(self):
+        self.records = []
+        self.counters = dict()
+        self._stack = []
+        self._n_started = 0
+
+    def count(self, name, n=1):
+        """
+        counts expensive calls (e.g. "curve_fit", "root_solve")
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def start(self, name):
+        """
+        starts recording of a stage. Prefer the stage context manager or the profiled decorator
+        """
+        frame = {"stage": name,
+                 "parent": self._stack[-1]["stage"] if len(self._stack) > 0 else None,
+                 "depth": len(self._stack),
+                 "i_start": self._n_started,
+                 "counters": dict(self.counters),
+                 "t_cpu": time.process_time(),
+                 "rss": _rss()}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if len(self._stack) > 0:
+                self._stack[-1]["peak_acc"] = max(self._stack[-1]["peak_acc"], peak)
+            tracemalloc.reset_peak()
+            frame["mem_start"] = current
+            frame["peak_acc"] = current
+        self._n_started += 1
+        self._stack.append(frame)
+        frame["t_wall"] = time.perf_counter()
+
+    def stop(self, result=None):
+        """
+        stops recording of the innermost stage
+        :param result:  return value of the stage. Rows and columns are recorded for DataFrames (also as first tuple
+                        element)
+        """
+        t_wall = time.perf_counter()
+        frame = self._stack.pop()
+        record = {"stage": frame["stage"], "parent": frame["parent"], "depth": frame["depth"],
+                  "i_start": frame["i_start"], "wall_s": t_wall - frame["t_wall"], "cpu_s": time.process_time() - frame["t_cpu"]}
+
+        if self.trace_memory:
+            peak = max(frame["peak_acc"], tracemalloc.get_traced_memory()[1])
+            record["peak_mem_MB"] = (peak - frame["mem_start"]) / 1024 ** 2
+            if len(self._stack) > 0:
+                self._stack[-1]["peak_acc"] = max(self._stack[-1]["peak_acc"], peak)
+        rss = _rss()
+        if rss is not None and frame["rss"] is not None:
+            record["rss_delta_MB"] = (rss - frame["rss"]) / 1024 ** 2
+        if resource is not None:
+            # peak of the whole process so far, ru_maxrss is in kB on Linux and in bytes on macOS
+            scale = 1024 ** 2 if sys.platform == "darwin" else 1024
+            record["process_max_rss_MB"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+        if isinstance(result, tuple) and len(result) > 0:
+            result = result[0]
+        shape = getattr(result, "shape", None)
+        if shape is not None and hasattr(result, "columns"):
+            record["rows"], record["cols"] = shape
+
+        record["counters"] = {name: n - frame["counters"].get(name, 0) for name, n in self.counters.items()
+                              if n != frame["counters"].get(name, 0)}
+        self.records.append(record)
+
+    def stage(self, name):
+        """
+        context manager recording a stage, e.g. with profiler.stage("xfoil_export"): ...
+        """
+        return _Stage(self, name)
+
+    def summary(self):
+        """
+        aggregates records per stage
+        :return:    list of dicts (one per stage, in order of first call)
+        """
+        stages = dict()
+        for record in self.records:
+            entry = stages.setdefault(record["stage"], {"stage": record["stage"], "depth": record["depth"],
+                                                        "i_start": record["i_start"], "calls": 0, "wall_s": 0.,
+                                                        "cpu_s": 0., "counters": dict()})
+            entry["calls"] += 1
+            entry["wall_s"] += record["wall_s"]
+            entry["cpu_s"] += record["cpu_s"]
+            entry["depth"] = min(entry["depth"], record["depth"])
+            entry["i_start"] = min(entry["i_start"], record["i_start"])
+            for key in ["peak_mem_MB", "rss_delta_MB", "process_max_rss_MB"]:
+                if key in record:
+                    entry[key] = max(entry.get(key, 0.), record[key])
+            for key in ["rows", "cols"]:
+                if key in record:
+                    entry[key] = record[key]
+            for name, n in record["counters"].items():
+                entry["counters"][name] = entry["counters"].get(name, 0) + n
+        # records are appended on stop, i.e. sub-stages first: sort by first start
+        return sorted(stages.values(), key=lambda entry: entry["i_start"])
+
+    def report(self):
+        """
+        :return:    dict with summary per stage, all stage calls and total counters
+        """
+        return {"summary": self.summary(), "calls": self.records, "counters": dict(self.counters)}
+
+    def write_json(self, filename):
+        with open(filename, "w") as file:
+            json.dump(self.report(), file, indent=1)
+
+    def print_table(self):
+        """
+        prints summary per stage (sub-stages indented). "dRSS" is the largest change of the resident set size during a
+        call of the stage, "peak" the traced peak memory of the stage (trace_memory only)
+        """
+        summary = self.summary()
+        counter_names = sorted({name for entry in summary for name in entry["counters"]})
+        header = "{0:<32}{1:>7}{2:>10}{3:>10}{4:>11}{5:>11}{6:>10}{7:>6}".format(
+            "stage", "calls", "wall [s]", "cpu [s]", "dRSS [MB]", "peak [MB]", "rows", "cols")
+        print(header + "".join("{0:>12}".format(name) for name in counter_names))
+        for entry in summary:
+            line = "{0:<32}{1:>7d}{2:>10.3f}{3:>10.3f}{4:>11.1f}{5:>11.1f}{6:>10}{7:>6}".format(
+                "  " * entry["depth"] + entry["stage"], entry["calls"], entry["wall_s"], entry["cpu_s"],
+                entry.get("rss_delta_MB", float("nan")), entry.get("peak_mem_MB", float("nan")),
+                entry.get("rows", ""), entry.get("cols", ""))
+            print(line + "".join("{0:>12d}".format(entry["counters"].get(name, 0)) for name in counter_names))
+
+
+class _Stage:
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.result = None
+
+    def __enter__(self):
+        if self.profiler.enabled:
+            self.profiler.start(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if self.profiler.enabled:
+            self.profiler.stop(self.result)
+        return False
+
+
+# profiler of the evaluation pipeline
+profiler = Profiler(enabled=os.environ.get("AUSWERTUNG_PROFILE", "0") not in ("", "0"))
+
+
+def profiled(name=None):
+    """
+    decorator recording every call of the decorated function as stage (default name: function name)
+    """
+    def decorator(func):
+        stage_name = func.__name__ if name is None else name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            profiler.start(stage_name)
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                profiler.stop(result)
+        return wrapper
+    return decorator
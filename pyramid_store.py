@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+multi-resolution store of time series for browsing whole test days. Level 0 holds all samples, every further level
+min, max and mean of `factor` consecutive bins of the level below. Every level is a set of .npy files, which are
+opened memory mapped, so a request reads only the level and time window it needs:
+
+<store>/meta.json                       channels, factor, number of bins per level
+<store>/level_0_time.npy                time stamps in ns (int64)
+<store>/level_0_values.npy              samples (n x channels)
+<store>/level_<k>_time.npy              time stamp of first sample of every bin
+<store>/level_<k>_{min,max,mean}.npy    statistics of every bin (n_k x channels)
+<store>/level_<k>_count.npy             number of samples per bin
+
+The viewer is a small local web page (standard library http.server, no further dependencies), which fetches the
+envelope of the visible window at about one bin per pixel while panning and zooming.
+
+Usage:
+from pyramid_store import build_pyramid, PyramidStore
+build_pyramid(df, "run_pyramid")
+level, df_window = PyramidStore("run_pyramid").fetch(["cl", "cd"], t_start, t_end, max_points=2000)
+
+python pyramid_store.py build df_filt.p run_pyramid
+python pyramid_store.py view run_pyramid [--port 8050]
+"""
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+
+def _reduce_level(time, v_min, v_max, v_sum, count, factor):
+    """
+    combines factor consecutive bins
+    """
+    starts = np.arange(0, len(time), factor)
+    return (time[starts], np.minimum.reduceat(v_min, starts, axis=0), np.maximum.reduceat(v_max, starts, axis=0),
+            np.add.reduceat(v_sum, starts, axis=0), np.add.reduceat(count, starts))
+
+
+def build_pyramid(df, path, channels=None, factor=4, min_bins=250):
+    """
+    writes a multi-resolution store of a time series DataFrame
+    :param df:          pandas DataFrame with (UTC) time index
+    :param path:        directory of the store (overwritten)
+    :param channels:    list of columns; None: all numeric columns
+    :param factor:      bins of level k-1 per bin of level k
+    :param min_bins:    levels are added until a level has at most min_bins bins
+    :return:            number of levels
+    """
+    if channels is None:
+        channels = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])
+                    and not pd.api.types.is_bool_dtype(df[col])]
+    df = df.loc[~df.index.duplicated()].sort_index()
+    os.makedirs(path, exist_ok=True)
+    # levels of a previous store
+    for name in os.listdir(path):
+        if name.startswith("level_") and name.endswith(".npy"):
+            os.remove(os.path.join(path, name))
+
+    time = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+    values = df[channels].to_numpy(dtype=float)
+    np.save(os.path.join(path, "level_0_time.npy"), time)
+    np.save(os.path.join(path, "level_0_values.npy"), values)
+
+    # NaN samples are ignored in all statistics
+    valid = ~np.isnan(values)
+    level = (time, np.where(valid, values, np.inf), np.where(valid, values, -np.inf), np.where(valid, values, 0.),
+             valid.astype(np.int64))
+    n_bins = [len(time)]
+    while n_bins[-1] > min_bins:
+        time_k, v_min, v_max, v_sum, count = level = _reduce_level(*level[:4], level[4], factor)
+        k = len(n_bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = v_sum / count
+        np.save(os.path.join(path, f"level_{k}_time.npy"), time_k)
+        np.save(os.path.join(path, f"level_{k}_min.npy"), np.where(count > 0, v_min, np.nan))
+        np.save(os.path.join(path, f"level_{k}_max.npy"), np.where(count > 0, v_max, np.nan))
+        np.save(os.path.join(path, f"level_{k}_mean.npy"), mean)
+        np.save(os.path.join(path, f"level_{k}_count.npy"), count)
+        n_bins.append(len(time_k))
+
+    with open(os.path.join(path, "meta.json"), "w") as file:
+        json.dump({"channels": channels, "factor": factor, "n_bins": n_bins,
+                   "start": int(time[0]) if len(time) > 0 else None,
+                   "end": int(time[-1]) if len(time) > 0 else None}, file, indent=1)
+    return len(n_bins)
+
+
+class PyramidStore:
+    """
+    read access to a store written by build_pyramid
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as file:
+            self.meta = json.load(file)
+        self.channels = self.meta["channels"]
+        self._arrays = dict()
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    @staticmethod
+    def _window(time, t_start, t_end):
+        """
+        bins between t_start and t_end (ns) plus one bin before and after the window, so that lines continue to the
+        border of a plot
+        """
+        return (max(np.searchsorted(time, t_start) - 1, 0),
+                min(np.searchsorted(time, t_end, side="right") + 1, len(time)))
+
+    def level_for(self, t_start, t_end, max_points):
+        """
+        finest level with at most max_points bins between t_start and t_end (ns)
+        """
+        for k in range(len(self.meta["n_bins"])):
+            i_start, i_end = self._window(self._array(f"level_{k}_time"), t_start, t_end)
+            if i_end - i_start <= max_points:
+                return k
+        return len(self.meta["n_bins"]) - 1
+
+    def fetch(self, channels, t_start=None, t_end=None, max_points=2000, level=None):
+        """
+        statistics of the bins between t_start and t_end
+        :param channels:    list of channels
+        :param t_start:     start (pandas Timestamp, ns or None: start of store)
+        :param t_end:       end (pandas Timestamp, ns or None: end of store)
+        :param max_points:  maximum number of bins (selects the level, bins of the coarsest level are combined, if it
+                            has still more bins in the window)
+        :param level:       level (overrides max_points)
+        :return:            tuple (level, pandas DataFrame with time index and columns (channel, "min"/"max"/"mean"))
+        """
+        t_start = self.meta["start"] if t_start is None else pd.Timestamp(t_start).value
+        t_end = self.meta["end"] if t_end is None else pd.Timestamp(t_end).value
+        decimate = level is None
+        if level is None:
+            level = self.level_for(t_start, t_end, max_points)
+        i_channels = [self.channels.index(channel) for channel in channels]
+
+        time = self._array(f"level_{level}_time")
+        i_start, i_end = self._window(time, t_start, t_end)
+        time = np.asarray(time[i_start:i_end])
+        if level == 0:
+            values = np.asarray(self._array("level_0_values")[i_start:i_end, i_channels])
+            stats = dict((stat, values) for stat in ["min", "max", "mean"])
+            count = (~np.isnan(values)).astype(np.int64)
+        else:
+            stats = dict((stat, np.asarray(self._array(f"level_{level}_{stat}")[i_start:i_end, i_channels]))
+                         for stat in ["min", "max", "mean"])
+            count = np.asarray(self._array(f"level_{level}_count")[i_start:i_end, i_channels])
+
+        if decimate and len(time) > max_points > 0:
+            # coarsest level has too many bins in the window: combine consecutive bins
+            valid = count > 0
+            time, v_min, v_max, v_sum, count = _reduce_level(
+                time, np.where(valid, stats["min"], np.inf), np.where(valid, stats["max"], -np.inf),
+                np.where(valid, stats["mean"] * count, 0.), count, -(-len(time) // max_points))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                stats = {"min": np.where(count > 0, v_min, np.nan), "max": np.where(count > 0, v_max, np.nan),
+                         "mean": v_sum / count}
+        index = pd.DatetimeIndex(time.view("datetime64[ns]"), name="Time").tz_localize("UTC")
+        columns = pd.MultiIndex.from_product([channels, ["min", "max", "mean"]])
+        data = np.stack([stats["min"], stats["max"], stats["mean"]], axis=2).reshape(len(index), -1)
+        return level, pd.DataFrame(data, index=index, columns=columns)
+
+
+viewer_page = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>time series viewer</title>
+<style>body{font-family:sans-serif;margin:8px} canvas{border:1px solid #ccc;width:100%;height:70vh}</style></head>
+<body>
+<div><select id="channels" multiple size="4"></select>
+<button onclick="reset()">whole run</button> <span id="info"></span></div>
+<canvas id="plot"></canvas>
+<script>
+const colors = ["#1f77b4", "#d62728", "#000000", "#bcbd22", "#2ca02c", "#9467bd", "#8c564b", "#e377c2"];
+let meta, view, data = [], pending = null;
+const canvas = document.getElementById("plot"), ctx = canvas.getContext("2d");
+const select = document.getElementById("channels");
+function reset() { view = [meta.start, meta.end]; load(); }
+function selected() { return Array.from(select.selectedOptions).map(o => o.value); }
+async function load() {
+  const width = canvas.clientWidth;
+  const query = new URLSearchParams({channels: selected().join(","), start: Math.round(view[0]),
+                                     end: Math.round(view[1]), points: width});
+  const response = await fetch("/data?" + query);
+  data = await response.json();
+  draw();
+}
+function scheduleLoad() { clearTimeout(pending); pending = setTimeout(load, 100); draw(); }
+function draw() {
+  canvas.width = canvas.clientWidth; canvas.height = canvas.clientHeight;
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  const x = t => (t - view[0]) / (view[1] - view[0]) * canvas.width;
+  const n = data.channels ? data.channels.length : 0;
+  data.channels && data.channels.forEach((channel, j) => {
+    // own vertical scale per channel
+    let lo = Math.min(...channel.min.filter(v => v !== null)), hi = Math.max(...channel.max.filter(v => v !== null));
+    if (!(hi > lo)) { lo -= 1; hi += 1; }
+    const y = v => canvas.height - 20 - (v - lo) / (hi - lo) * (canvas.height - 40);
+    ctx.fillStyle = colors[j % colors.length] + "40"; ctx.strokeStyle = colors[j % colors.length];
+    for (let i = 0; i < data.time.length; i++) {
+      if (channel.min[i] === null) continue;
+      ctx.fillRect(x(data.time[i]), y(channel.max[i]), 1, Math.max(1, y(channel.min[i]) - y(channel.max[i])));
+    }
+    ctx.beginPath();
+    data.time.forEach((t, i) => { if (channel.mean[i] !== null) ctx.lineTo(x(t), y(channel.mean[i])); });
+    ctx.stroke();
+    ctx.fillStyle = colors[j % colors.length];
+    ctx.fillText(channel.name + " [" + lo.toPrecision(4) + ", " + hi.toPrecision(4) + "]", 10, 15 + 15 * j);
+  });
+  document.getElementById("info").textContent = new Date(view[0] / 1e6).toISOString() + " - " +
+    new Date(view[1] / 1e6).toISOString() + "  level " + data.level + ", " + (data.time || []).length + " bins";
+}
+canvas.addEventListener("wheel", e => {
+  e.preventDefault();
+  const t = view[0] + e.offsetX / canvas.clientWidth * (view[1] - view[0]), f = e.deltaY > 0 ? 1.25 : 0.8;
+  view = [t - (t - view[0]) * f, t + (view[1] - t) * f]; scheduleLoad();
+});
+let drag = null;
+canvas.addEventListener("mousedown", e => drag = [e.offsetX, view.slice()]);
+window.addEventListener("mouseup", () => drag = null);
+canvas.addEventListener("mousemove", e => {
+  if (!drag) return;
+  const dt = (e.offsetX - drag[0]) / canvas.clientWidth * (drag[1][1] - drag[1][0]);
+  view = [drag[1][0] - dt, drag[1][1] - dt]; scheduleLoad();
+});
+select.addEventListener("change", load);
+fetch("/meta").then(r => r.json()).then(m => {
+  meta = m;
+  m.channels.forEach((c, i) => select.add(new Option(c, c, false, ["cl", "cd", "alpha"].includes(c))));
+  reset();
+});
+</script></body></html>
+"""
+
+
+def serve_viewer(path, port=8050, host="127.0.0.1"):
+    """
+    serves the viewer page and the data of a store until interrupted
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    store = PyramidStore(path)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/":
+                self._send(viewer_page.encode(), "text/html; charset=utf-8")
+            elif url.path == "/meta":
+                self._send(json.dumps(store.meta).encode(), "application/json")
+            elif url.path == "/data":
+                query = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+                channels = [channel for channel in query.get("channels", "").split(",") if channel in store.channels]
+                level, df = store.fetch(channels, int(float(query["start"])), int(float(query["end"])),
+                                        max_points=int(query.get("points", 2000)))
+                df = df.astype(object).where(df.notna(), None)
+                body = {"level": level, "time": df.index.as_unit("ns").asi8.tolist(),
+                        "channels": [dict(name=channel, **dict((stat, df[(channel, stat)].tolist())
+                                                               for stat in ["min", "max", "mean"]))
+                                     for channel in channels]}
+                self._send(json.dumps(body).encode(), "application/json")
+            else:
+                self.send_error(404)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"viewer of {path} on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="multi-resolution time series store and viewer")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_build = subparsers.add_parser("build", help="build store from pickled DataFrame (time index)")
+    parser_build.add_argument("dataframe", help="pickle file of DataFrame, e.g. df_filt")
+    parser_build.add_argument("store", help="directory of store")
+    parser_build.add_argument("--channels", nargs="*", default=None, help="columns (default: all numeric columns)")
+    parser_build.add_argument("--factor", type=int, default=4, help="bins per bin of next level")
+    parser_view = subparsers.add_parser("view", help="serve viewer of a store")
+    parser_view.add_argument("store", help="directory of store")
+    parser_view.add_argument("--port", type=int, default=8050)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        n_levels = build_pyramid(pd.read_pickle(args.dataframe), args.store, args.channels, args.factor)
+        print(f"{args.store}: {n_levels} levels")
+    else:
+        serve_viewer(args.store, args.port)
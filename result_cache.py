@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+content-addressed on-disk cache for the results of the pipeline stages (sync, calibration, filtered frame,
+time-series coefficients, polar). The key of an entry is a hash of all stage inputs and parameters; files enter the key
+by their content, and every key is salted with the code of the stage (CACHE_VERSION and the source files of the stage
+function's module and of the local modules it uses), so that changed code never returns stale results. Entries are
+evicted least recently used, when the cache exceeds its size limit.
+
+Usage:
+python result_cache.py stats [cache_dir]
+python result_cache.py clear [cache_dir]
+"""
+import os
+import sys
+import json
+import pickle
+import hashlib
+import inspect
+import numpy as np
+import pandas as pd
+
+default_cache_dir = "result_cache"
+
+# increase to invalidate all entries (e.g. after changes, which the code salt does not see)
+CACHE_VERSION = 1
+
+
+def hash_inputs(*parts):
+    """
+    hashes stage inputs. Supported are str, bytes, numbers, None, lists/tuples/dicts of these, numpy arrays and pandas
+    objects. Use FileContent for files, which should enter the key by content
+    :return:        hex digest string
+    """
+    h = hashlib.sha1()
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()
+
+
+class FileContent:
+    """
+    marks a path, whose file content (instead of the path string) is part of a cache key
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+
+_file_hashes = dict()
+
+
+def _file_digest(path):
+    # file hashes are memoized by path, size and modification time
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hashes:
+        h = hashlib.sha1()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                h.update(chunk)
+        _file_hashes[key] = h.hexdigest()
+    return _file_hashes[key]
+
+
+_code_salts = dict()
+
+
+def code_salt(func):
+    """
+    hash of CACHE_VERSION and of the source files of the module of func and of all modules next to it, whose functions,
+    classes or modules func's module uses (e.g. calc_cd for calculate_polar, calibration.py for apply_calibration)
+    :return:        hex digest string
+    """
+    func = inspect.unwrap(func)
+    module_name = func.__globals__.get("__name__")
+    if module_name not in _code_salts:
+        source_file = os.path.abspath(inspect.getsourcefile(func))
+        base_dir = os.path.dirname(source_file)
+        files = {source_file}
+        for value in list(func.__globals__.values()):
+            module = value if inspect.ismodule(value) else inspect.getmodule(value)
+            path = getattr(module, "__file__", None)
+            if path is not None and path.endswith(".py") and os.path.dirname(os.path.abspath(path)) == base_dir:
+                files.add(os.path.abspath(path))
+        _code_salts[module_name] = hash_inputs(CACHE_VERSION, [FileContent(path) for path in sorted(files)])
+    return _code_salts[module_name]
+
+
+def _update(h, part):
+    h.update(type(part).__name__.encode())
+    if isinstance(part, FileContent):
+        h.update(_file_digest(part.path).encode() if os.path.exists(part.path) else b"missing")
+    elif isinstance(part, bytes):
+        h.update(part)
+    elif isinstance(part, str):
+        h.update(part.encode())
+    elif isinstance(part, (list, tuple)):
+        h.update(str(len(part)).encode())
+        for p in part:
+            _update(h, p)
+    elif isinstance(part, dict):
+        for k in sorted(part, key=str):
+            _update(h, str(k))
+            _update(h, part[k])
+    elif isinstance(part, np.ndarray):
+        h.update(str(part.shape).encode() + str(part.dtype).encode())
+        h.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, (pd.DataFrame, pd.Series)):
+        if isinstance(part, pd.DataFrame):
+            h.update(",".join(map(str, part.columns)).encode())
+        h.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    else:
+        # numbers, None, booleans, datetimes
+        h.update(repr(part).encode())
+
+
+class ResultCache:
+    """
+    on-disk cache of pickled stage results with hit/miss statistics per stage (counted in memory, written by
+    flush_stats)
+    """
+
+    def __init__(self, cache_dir=default_cache_dir, max_bytes=2 * 1024 ** 3, enabled=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._counts = dict()
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, stage, key):
+        return os.path.join(self.cache_dir, "{0}_{1}.p".format(stage, key))
+
+    def get(self, stage, key):
+        """
+        returns cached result or None
+        """
+        if not self.enabled:
+            return None
+        path = self._path(stage, key)
+        # entries may be evicted by other processes sharing the cache directory at any time
+        try:
+            with open(path, "rb") as file:
+                result = pickle.load(file)
+            # update access time for LRU eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self._count(stage, "misses")
+            return None
+        self._count(stage, "hits")
+        return result
+
+    def put(self, stage, key, result):
+        """
+        stores result and evicts least recently used entries, if the size limit is exceeded
+        """
+        if not self.enabled:
+            return
+        path = self._path(stage, key)
+        # write to temporary file first, several processes may share the cache directory
+        tmp_path = "{0}.{1}.tmp".format(path, os.getpid())
+        with open(tmp_path, "wb") as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def cached(self, stage, key, func, *args, **kwargs):
+        """
+        returns cached result of stage, or calls func(*args, **kwargs) and stores its result. The key is salted with
+        the code of func (see code_salt)
+        """
+        key = hash_inputs(key, code_salt(func))
+        result = self.get(stage, key)
+        if result is None:
+            result = func(*args, **kwargs)
+            self.put(stage, key, result)
+        return result
+
+    def _entries(self):
+        """
+        :return:    list of (path, size) of all entries, least recently used first (entries removed meanwhile by other
+                    processes are skipped)
+        """
+        entries = []
+        for f in os.listdir(self.cache_dir):
+            if f.endswith(".p"):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, f))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, os.path.join(self.cache_dir, f), stat.st_size))
+        return [(path, size) for _, path, size in sorted(entries)]
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size in entries)
+        for path, size in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+    def _stats_path(self, pid=None):
+        # one statistics file per process, no lost updates of concurrent processes
+        return os.path.join(self.cache_dir, "stats_{0}.json".format(os.getpid() if pid is None else pid))
+
+    def _stats_files(self):
+        return [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir)
+                if f.startswith("stats") and f.endswith(".json")]
+
+    @staticmethod
+    def _read_stats(path):
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return dict()
+
+    def stats(self):
+        """
+        returns dict {stage: {"hits": int, "misses": int}}, merged from the statistics files of all processes
+        """
+        merged = dict()
+        for path in self._stats_files():
+            for stage, counts in self._read_stats(path).items():
+                merged_counts = merged.setdefault(stage, {"hits": 0, "misses": 0})
+                for kind in merged_counts:
+                    merged_counts[kind] += counts.get(kind, 0)
+        return merged
+
+    def _count(self, stage, kind):
+        self._counts.setdefault(stage, {"hits": 0, "misses": 0})[kind] += 1
+
+    def flush_stats(self):
+        """
+        adds the hits and misses counted since the last flush to the statistics file of this process
+        """
+        if not self.enabled or not self._counts:
+            return
+        stats = self._read_stats(self._stats_path())
+        for stage, counts in self._counts.items():
+            for kind, n in counts.items():
+                stats.setdefault(stage, {"hits": 0, "misses": 0})[kind] += n
+        tmp_path = "{0}.{1}.tmp".format(self._stats_path(), os.getpid())
+        with open(tmp_path, "w") as file:
+            json.dump(stats, file, indent=1)
+        os.replace(tmp_path, self._stats_path())
+        self._counts = dict()
+
+    def clear(self):
+        """
+        deletes all entries and statistics
+        """
+        for path, _ in self._entries():
+            _remove(path)
+        for path in self._stats_files():
+            _remove(path)
+
+
+def _remove(path):
+    """
+    removes a file, which may have been removed by another process already
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def print_stats(cache):
+    """
+    prints hits and misses of every stage and the size of the cache
+    """
+    entries = cache._entries()
+    print("cache directory: {0}, {1} entries, {2:.1f} MB".format(
+        os.path.abspath(cache.cache_dir), len(entries), sum(size for _, size in entries) / 1024 ** 2))
+    print("{0:<24}{1:>8}{2:>8}".format("stage", "hits", "misses"))
+    for stage, counts in sorted(cache.stats().items()):
+        print("{0:<24}{1:>8}{2:>8}".format(stage, counts["hits"], counts["misses"]))
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = ResultCache(sys.argv[2] if len(sys.argv) > 2 else default_cache_dir)
+    if command == "stats":
+        print_stats(cache)
+    elif command == "clear":
+        cache.clear()
+    else:
+        print(__doc__)
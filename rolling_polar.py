@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+time resolved polar: polar points of sliding windows over the whole run instead of the segments of the Excel segment
+definition. Means and standard deviations of all windows are calculated from cumulative sums, so the cost is linear in
+the number of samples for any window length and stride.
+
+The result has the columns of calculate_polar (segment means of the coefficients) plus "<column>_std", "start", "end"
+and "n_samples", so it can be parsed by PolarTool.parseMoProMa_Polar.
+
+Usage:
+from rolling_polar import rolling_polar
+df_rolling = rolling_polar(df_filt, window_s=10., stride_s=1., min_speed=10., max_alpha_std=0.2)
+"""
+import numpy as np
+import pandas as pd
+
+from profiling import profiled
+
+# polar columns of calculate_polar, which are averaged (if present)
+rolling_columns = ['alpha', 'Re', 'cl', 'cd', 'cdp', 'U_CAS', 'U_TAS', 'cm', 'cmr_LE', 'cmr_TE']
+
+# columns with standard deviation
+rolling_std_columns = ['alpha', 'Re', 'cl', 'cd', 'cm']
+
+
+def _window_mean_std(values, i_start, i_end):
+    """
+    mean and standard deviation (ddof=1) of values[i_start:i_end] for all windows from cumulative sums. Non-finite
+    values are ignored, the columns are shifted by their mean for the precision of the sums of squares
+    """
+    valid = np.isfinite(values)
+    shift = np.zeros(values.shape[1])
+    n_valid = valid.sum(axis=0)
+    np.divide(np.where(valid, values, 0.).sum(axis=0), n_valid, out=shift, where=n_valid > 0)
+    shifted = np.where(valid, values - shift, 0.)
+    zeros = np.zeros((1, values.shape[1]))
+    s0 = np.vstack((zeros, np.cumsum(valid, axis=0)))
+    s1 = np.vstack((zeros, np.cumsum(shifted, axis=0)))
+    s2 = np.vstack((zeros, np.cumsum(shifted ** 2, axis=0)))
+    n = s0[i_end] - s0[i_start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (s1[i_end] - s1[i_start]) / n
+        var = (s2[i_end] - s2[i_start] - n * mean ** 2) / (n - 1)
+    return mean + shift, np.sqrt(np.maximum(var, 0.))
+
+
+@profiled()
+def rolling_polar(df, window_s=10., stride_s=1., min_speed=10., max_alpha_std=None, min_fraction=0.9):
+    """
+    polar points of sliding time windows
+    :param df:              pandas DataFrame with time index and unaveraged coefficients (df_filt of calc_time_series)
+    :param window_s:        window length in s
+    :param stride_s:        distance of window starts in s
+    :param min_speed:       samples with lower U_CAS are not used (coefficients of standstill are unbounded and spoil
+                            the cumulative sums); None: all samples
+    :param max_alpha_std:   windows with larger standard deviation of alpha in deg (alpha changes) are dropped;
+                            None: no limit
+    :param min_fraction:    minimum fraction of used samples in a window
+    :return:                pandas DataFrame with one row per window
+    """
+    columns = [col for col in rolling_columns if col in df.columns]
+    index = pd.DatetimeIndex(df.index)
+    t = (index - index[0]).total_seconds().to_numpy()
+
+    values = df[columns].to_numpy(dtype=float)
+    if min_speed is not None:
+        values[df["U_CAS"].to_numpy(dtype=float) <= min_speed] = np.nan
+    t_starts = np.arange(0., max(t[-1] - window_s, 0.) + stride_s / 2, stride_s) if len(t) > 0 else np.empty(0)
+    i_start = np.searchsorted(t, t_starts)
+    i_end = np.searchsorted(t, t_starts + window_s)
+    mean, std = _window_mean_std(values, i_start, i_end)
+
+    # fraction of used samples (all columns are NaN for slow samples)
+    used = np.concatenate(([0], np.cumsum(np.isfinite(values[:, 0])))) if len(columns) > 0 else np.zeros(len(t) + 1)
+    n_samples = used[i_end] - used[i_start]
+    keep = (n_samples >= min_fraction * np.maximum(i_end - i_start, 1)) & (n_samples > 1)
+
+    df_rolling = pd.DataFrame(mean, columns=columns)
+    for col in rolling_std_columns:
+        if col in columns:
+            df_rolling[col + "_std"] = std[:, columns.index(col)]
+    df_rolling["cd_extrapol_flag"] = False
+    df_rolling["start"] = index[0] + pd.to_timedelta(t_starts, unit="s")
+    df_rolling["end"] = df_rolling["start"] + pd.Timedelta(seconds=window_s)
+    df_rolling["n_samples"] = n_samples
+
+    if max_alpha_std is not None and "alpha" in columns:
+        keep &= df_rolling["alpha_std"].to_numpy() <= max_alpha_std
+    return df_rolling.loc[keep].reset_index(drop=True)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+cp(x) and wake figures of all test segments:
+--> segment_statistics: means and standard deviations of all segments, collected in small picklable dicts
+--> render_segment_figures: renders the two-panel figure of every segment with the Agg backend in a process pool
+--> export_cp_files: writes the mean cp distributions as XFOIL cp files (separate step, independent of plotting)
+
+Usage:
+segment_stats = segment_statistics(df_raw, df_segments, df_polar, sens_ident_cols, defective_sensor_list)
+render_segment_figures(segment_stats, airfoil_figure_geometry(df_airfoil, at_airfoil), figdir)
+export_cp_files(segment_stats, df_airfoil, "C:/XFOIL6.99", "mue13-33", "T020")
+"""
+import os
+import numpy as np
+
+from profiling import profiler
+
+
+def _segment_mean_std(values, i_start, i_end):
+    """
+    mean and standard deviation (ddof=1) of values[i_start:i_end] for all segments (two passes over every segment
+    slice), NaN and infinite values are ignored
+    """
+    mean = np.full((len(i_start), values.shape[1]), np.nan)
+    std = np.full((len(i_start), values.shape[1]), np.nan)
+    for k, (start, end) in enumerate(zip(i_start, i_end)):
+        seg = values[start:end]
+        valid = np.isfinite(seg)
+        n = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean[k] = np.where(valid, seg, 0.).sum(axis=0) / n
+            std[k] = np.sqrt((np.where(valid, seg - mean[k], 0.) ** 2).sum(axis=0) / (n - 1))
+    return mean, std
+
+
+def segment_statistics(df, df_segments, df_polar, sens_ident_cols, defective_sensor_list):
+    """
+    statistics of every segment of the polar for cp(x) and wake figures and cp files
+    :param df:                      pandas DataFrame with cp time series (df_raw of calc_time_series)
+    :param df_segments:             segment start and end times
+    :param df_polar:                polar (calculate_polar), segment means of wake rake cp
+    :param sens_ident_cols:         cp columns of airfoil taps in order of df_airfoil
+    :param defective_sensor_list:   indices of defective total pressure probes of wake rake
+    :return:                        list of dicts (one per segment, sorted by alpha)
+    """
+    from Auswertung import _calc_rake_sensor_pos
+
+    z_tot, z_stat = _calc_rake_sensor_pos(defective_sensor_list=defective_sensor_list)
+    cols_tot = [col for col in df.columns if col.startswith("ptot_rake")]
+    cols_tot = [col for i, col in enumerate(cols_tot) if i not in defective_sensor_list]
+    cols_stat = [col for col in df.columns if col.startswith("pstat_rake")]
+    columns = list(sens_ident_cols) + cols_tot + cols_stat
+    n_cp, n_tot = len(sens_ident_cols), len(cols_tot)
+
+    # sample positions of segment boundaries
+    i_segs = df_polar.sort_values(by="alpha").index
+    i_start = df.index.searchsorted(df_segments.loc[i_segs, "start"])
+    i_end = df.index.searchsorted(df_segments.loc[i_segs, "end"])
+    mean, std = _segment_mean_std(df[columns].to_numpy(dtype=float), i_start, i_end)
+
+    segment_stats = []
+    for k, i_seg in enumerate(i_segs):
+        segment_stats.append({
+            "i_seg": i_seg,
+            "alpha": df_polar.loc[i_seg, "alpha"], "Re": df_polar.loc[i_seg, "Re"],
+            "cl": df_polar.loc[i_seg, "cl"], "cd": df_polar.loc[i_seg, "cd"],
+            "cp_mean": mean[k, :n_cp], "cp_std": std[k, :n_cp],
+            "ptot_mean": df_polar.loc[i_seg, cols_tot].to_numpy(dtype=float), "ptot_std": std[k, n_cp:n_cp + n_tot],
+            "pstat_mean": df_polar.loc[i_seg, cols_stat].to_numpy(dtype=float), "pstat_std": std[k, n_cp + n_tot:],
+            "p_ref": df_polar.loc[i_seg, "static_K04_32"],
+            "z_tot": z_tot, "z_stat": z_stat})
+    return segment_stats
+
+
+def airfoil_figure_geometry(df_airfoil, at_airfoil):
+    """
+    geometry needed by the workers of render_segment_figures
+    """
+    return {"coords": np.asarray(at_airfoil.coords), "x": df_airfoil["x"].to_numpy(), "y": df_airfoil["y"].to_numpy()}
+
+
+def render_segment_figure(stats, geometry, figdir):
+    """
+    renders and saves the cp(x) and wake figure of one segment (Agg backend; pyplot and its backend are not used)
+    :return:    path of the figure
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    coords, x, y = geometry["coords"], geometry["x"], geometry["y"]
+
+    # plot cp(x)
+    fig = Figure(figsize=(6, 12))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(2)
+    ax = axes[0]
+    ax_cp = ax.twinx()
+    ax.plot(coords[:, 0], coords[:, 1], "k-")
+    ax.plot(x, y, "k.")
+    ax_cp.plot(x, stats["cp_mean"], "r.-")
+    # Plot the mean cp values with error bars
+    ax_cp.errorbar(x, stats["cp_mean"], yerr=stats["cp_std"], fmt='r.-', ecolor='gray', elinewidth=1, capsize=2)
+    ylim_u, ylim_l = ax_cp.get_ylim()
+    ax_cp.set_ylim([ylim_l, ylim_u])
+    ax.set_xlabel("$x$")
+    ax.set_ylabel("$y$")
+    ax_cp.set_ylabel("$c_p$")
+    fig.suptitle(r"$i_\mathrm{{seg}}={}:~Re={:.2E}~cl={:.2f}~cd={:.4f}~\alpha={:.2f}$".format(
+        stats["i_seg"], stats["Re"], stats["cl"], stats["cd"], stats["alpha"]))
+    ax_cp.grid()
+    ax.axis("equal")
+
+    # plot wake depression(x)
+    ax = axes[1]
+    ax_cp = ax.twiny()
+    # plot airfoil for visualization
+    ax.plot(coords[:, 0] * 100, coords[:, 1] * 100, "k-")
+    # Plot the mean ptot and pstat values with error bars
+    ax_cp.plot(stats["ptot_mean"], stats["z_tot"], "r.-")
+    ax_cp.errorbar(stats["ptot_mean"], stats["z_tot"], xerr=stats["ptot_std"], fmt='r.-', ecolor='gray', elinewidth=1,
+                   capsize=2)
+    ax_cp.plot(stats["pstat_mean"], stats["z_stat"], "b.-")
+    ax_cp.errorbar(stats["pstat_mean"], stats["z_stat"], xerr=stats["pstat_std"], fmt='b.-', ecolor='gray',
+                   elinewidth=1, capsize=2)
+    # Plot reference total pressure sensor for reference
+    ax_cp.plot(stats["p_ref"], stats["z_stat"][0], "g.")
+    ax_cp.plot(stats["p_ref"], stats["z_stat"][-1], "g.")
+    ylim_l, ylim_u = ax_cp.get_ylim()
+    ax_cp.set_ylim([ylim_l, ylim_u])
+    ax.set_xlabel("$x$")
+    ax.set_ylabel("$z$")
+    ax_cp.set_xlabel("$c_p$")
+    ax_cp.grid()
+    ax.axis("equal")
+    fig.tight_layout()
+
+    path = os.path.join(figdir, "cp_alpha{0:.2f}_cl{1:.2f}_iseg{2}.pdf".format(stats["alpha"], stats["cl"],
+                                                                             stats["i_seg"]))
+    fig.savefig(path)
+    return path
+
+
+def render_segment_figures(segment_stats, geometry, figdir, n_workers=None):
+    """
+    renders the figures of all segments
+    :param segment_stats:   list of segment statistics (see segment_statistics)
+    :param geometry:        see airfoil_figure_geometry
+    :param figdir:          directory of figures
+    :param n_workers:       number of processes (None: number of CPUs, 1: in this process)
+    :return:                list of figure paths
+    """
+    if n_workers == 1 or len(segment_stats) < 2:
+        return [render_segment_figure(stats, geometry, figdir) for stats in segment_stats]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    n_workers = min(n_workers or os.cpu_count() or 1, len(segment_stats))
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(render_segment_figure, segment_stats, [geometry] * len(segment_stats),
+                                 [figdir] * len(segment_stats)))
+
+
+def export_cp_files(segment_stats, df_airfoil, out_dir, airfoil_name, run_name, cp_offset=0.15):
+    """
+    writes the mean cp distribution of every segment as XFOIL cp file "<airfoil>_<run>_cl<cl>_alpha<alpha>.cp"
+    :param cp_offset:   added to cp
+    :return:            list of written files
+    """
+    x_vals = df_airfoil["x"].to_numpy()
+    filenames = []
+    with profiler.stage("xfoil_cp_export"):
+        for stats in segment_stats:
+            filename = os.path.join(out_dir, "{0}_{1}_cl{2:.2f}_alpha{3:.2f}.cp".format(
+                airfoil_name, run_name, stats["cl"], stats["alpha"]))
+            np.savetxt(filename, np.vstack((x_vals, stats["cp_mean"] + cp_offset)).T, header="     x          Cp  ",
+                       fmt="%.5f")
+            filenames.append(filename)
+    return filenames
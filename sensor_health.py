@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+health check of the pressure channels (wake rake and static pressure taps) of a synchronized run. All metrics are
+calculated in one vectorized pass over the channel block:
+--> noise level (robust standard deviation of the sample-to-sample differences)
+--> spectral flatness (geometric / arithmetic mean of the power spectral density). Channels carrying only sensor
+    noise are spectrally flat, channels following the flow are not
+--> correlation with the neighbouring probes (rake: adjacent probes, taps: adjacent ports of the same unit)
+--> zero-offset drift: change of the deviation from the group median between first and last part of the run (usually
+    standstill, i.e. zero flow)
+Channels are flagged relative to their group (ptot_rake, pstat_rake, static_K0X, prandtl), mostly by robust z-scores
+(median / MAD). The Prandtl probe channels form a group of their own, as they measure different pressures than the
+airfoil taps of the same unit; groups of less than three channels are not flagged
+"""
+import re
+import numpy as np
+import pandas as pd
+
+_channel_pattern = re.compile(r"^(ptot_rake|pstat_rake|static_K\d\d)_(\d+)$")
+
+
+def _robust_z(values, scale_floor=0.):
+    """
+    robust z-score: deviation from median in multiples of the scaled median absolute deviation. The scale is limited
+    to scale_floor, so that nearly identical channels do not produce arbitrarily large scores
+    """
+    median = np.median(values)
+    mad = max(1.4826 * np.median(np.abs(values - median)), scale_floor, np.finfo(float).tiny)
+    return (values - median) / mad
+
+
+def _spectral_flatness(block, nperseg=256):
+    """
+    spectral flatness of all channels, Welch-averaged power spectral density (one batched FFT over all segments and
+    channels)
+    :param block:       numpy.ndarray of shape (n_samples, n_channels)
+    :param nperseg:     segment length
+    :return:            numpy.ndarray of shape (n_channels,)
+    """
+    nperseg = min(nperseg, block.shape[0])
+    n_seg = block.shape[0] // nperseg
+    segments = block[:n_seg * nperseg].reshape(n_seg, nperseg, block.shape[1])
+    segments = segments - segments.mean(axis=1, keepdims=True)
+    psd = np.mean(np.abs(np.fft.rfft(segments * np.hanning(nperseg)[:, np.newaxis], axis=1)) ** 2, axis=0)[1:]
+    psd = np.maximum(psd, np.finfo(float).tiny)
+    return np.exp(np.mean(np.log(psd), axis=0)) / np.mean(psd, axis=0)
+
+
+def check_sensor_health(df, prandtl_data=None, z_threshold=5.0, dead_noise_ratio=0.1, min_correlation_ratio=0.5,
+                        drift_fraction=0.05, nperseg=256):
+    """
+    calculates health metrics of all pressure channels and flags defective ones
+    :param df:                  pandas DataFrame with synchronized (uncalibrated or calibrated) sensor data
+    :param prandtl_data:        Prandtl probe sensors (see calc_ptot_pstat), grouped as "prandtl"; None: no Prandtl
+                                group
+    :param z_threshold:         robust z-score above which a metric flags a channel
+    :param dead_noise_ratio:    channels with noise below this fraction of the group median noise are flagged dead
+    :param min_correlation_ratio: channels with neighbour correlation below this fraction of the group median are
+                                flagged decorrelated
+    :param drift_fraction:      fraction of the run at start and end used for the drift calculation
+    :param nperseg:             segment length of the spectral estimate
+    :return report:             pandas DataFrame (one row per channel) with metrics and flags
+    :return suggested:          list of zero-based indices of defective ptot_rake probes (defective_sensor_list)
+    """
+    matches = [_channel_pattern.match(col) for col in df.columns]
+    cols = [m.group(0) for m in matches if m is not None]
+    groups = np.array([m.group(1) for m in matches if m is not None])
+    numbers = np.array([int(m.group(2)) for m in matches if m is not None])
+    if prandtl_data is not None:
+        prandtl_cols = [prandtl_data["unit name static"] + "_{0:d}".format(prandtl_data["i_sens_static"]),
+                        prandtl_data["unit name total"] + "_{0:d}".format(prandtl_data["i_sens_total"])]
+        groups[np.isin(cols, prandtl_cols)] = "prandtl"
+
+    block = df[cols].to_numpy(dtype=float)
+    n = block.shape[0]
+
+    # noise level from sample-to-sample differences (insensitive to slow flow changes)
+    diff = np.diff(block, axis=0)
+    noise = 1.4826 * np.median(np.abs(diff - np.median(diff, axis=0)), axis=0) / np.sqrt(2)
+
+    flatness = _spectral_flatness(block, nperseg=nperseg)
+
+    # deviation from the group median at each sample, drift between start and end of the run
+    deviation = np.empty_like(block)
+    for group in np.unique(groups):
+        mask = groups == group
+        deviation[:, mask] = block[:, mask] - np.median(block[:, mask], axis=1, keepdims=True)
+    n_edge = max(int(n * drift_fraction), 1)
+    drift = deviation[-n_edge:].mean(axis=0) - deviation[:n_edge].mean(axis=0)
+
+    # correlation with neighbouring probes of the same group
+    std = block.std(axis=0)
+    standardized = (block - block.mean(axis=0)) / np.where(std > 0., std, 1.)
+    order = np.lexsort((numbers, groups))
+    corr_next = np.full(len(cols), np.nan)
+    same_group = groups[order][1:] == groups[order][:-1]
+    corr_pairs = np.mean(standardized[:, order[1:]] * standardized[:, order[:-1]], axis=0)
+    corr_next[order[:-1][same_group]] = corr_pairs[same_group]
+    corr_prev = np.full(len(cols), np.nan)
+    corr_prev[order[1:][same_group]] = corr_pairs[same_group]
+    corr_neighbours = np.fmax(corr_prev, corr_next)
+
+    report = pd.DataFrame({"group": groups, "number": numbers, "noise": noise, "flatness": flatness,
+                           "corr_neighbours": corr_neighbours, "drift": drift}, index=cols)
+    report["dead"] = False
+    report["noisy"] = False
+    report["decorrelated"] = False
+    report["drifting"] = False
+
+    for group in np.unique(groups):
+        mask = (groups == group)
+        if mask.sum() < 3:
+            continue
+        report.loc[mask, "dead"] = (noise[mask] < dead_noise_ratio * np.median(noise[mask])) | (std[mask] == 0.)
+        report.loc[mask, "noisy"] = _robust_z(flatness[mask], scale_floor=0.02) > z_threshold
+        report.loc[mask, "decorrelated"] = (np.nan_to_num(corr_neighbours[mask]) <
+                                            min_correlation_ratio * np.nanmedian(corr_neighbours[mask]))
+        report.loc[mask, "drifting"] = np.abs(_robust_z(drift[mask], scale_floor=np.median(noise[mask]))) > z_threshold
+
+    report["defective"] = report[["dead", "noisy", "decorrelated", "drifting"]].any(axis=1)
+
+    suggested = sorted((report.loc[(report["group"] == "ptot_rake") & report["defective"], "number"] - 1).tolist())
+
+    return report, suggested
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+spectral analysis of the pressure channels (airfoil taps, wake rake and Prandtl probe) of every test segment, e.g. to
+find vibrations and road induced pressure fluctuations:
+--> welch_spectra: Welch power spectral densities of a block of channels with one batched FFT call (frames x channels
+    x samples) and the coherence of all channels with a reference channel
+--> spectral_table: compact table per segment and channel with RMS, dominant frequencies, coherence with the reference
+    at the dominant frequency and RMS of frequency bands
+
+Usage:
+from spectral_analysis import spectral_table
+df_spectra = spectral_table(df_sync, df_segments, reference="static_K04_31")
+df_spectra.to_csv("spectra.csv")
+"""
+import numpy as np
+import pandas as pd
+
+from calibration import pressure_columns
+from profiling import profiled
+
+# frequency bands in Hz of band RMS (gusts, car body and suspension, vibrations)
+default_bands = ((0.1, 1.), (1., 10.), (10., 50.))
+
+
+def welch_spectra(values, fs, nperseg=256, overlap=0.5, i_reference=None):
+    """
+    Welch power spectral densities (Hann window, mean removed per frame, one-sided) of all channels
+    :param values:      numpy.ndarray (samples, channels), NaN values are replaced by the channel mean
+    :param fs:          sample rate in Hz
+    :param nperseg:     samples per frame (limited to the number of samples)
+    :param overlap:     overlap of frames
+    :param i_reference: position of reference channel for coherence; None: no coherence
+    :return:            tuple (frequencies, PSD (channels, frequencies) in unit**2/Hz, coherence (channels,
+                        frequencies) or None)
+    """
+    values = np.asarray(values, dtype=float)
+    values = np.where(np.isnan(values), np.nanmean(values, axis=0), values)
+    nperseg = min(nperseg, len(values))
+    step = max(int(nperseg * (1 - overlap)), 1)
+
+    # frames x channels x samples, one FFT of the whole block
+    frames = np.lib.stride_tricks.sliding_window_view(values, nperseg, axis=0)[::step]
+    window = np.hanning(nperseg + 1)[:-1] if nperseg > 1 else np.ones(1)
+    X = np.fft.rfft((frames - frames.mean(axis=-1, keepdims=True)) * window, axis=-1)
+
+    scale = 1. / (fs * (window ** 2).sum())
+    psd = (np.abs(X) ** 2).mean(axis=0) * scale
+    # one-sided: double all frequencies except 0 and Nyquist frequency
+    psd[:, 1:(None if nperseg % 2 else -1)] *= 2
+    frequencies = np.fft.rfftfreq(nperseg, 1. / fs)
+
+    coherence = None
+    if i_reference is not None:
+        csd = (X * np.conj(X[:, i_reference:i_reference + 1])).mean(axis=0)
+        auto = (np.abs(X) ** 2).mean(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            coherence = np.abs(csd) ** 2 / (auto * auto[i_reference])
+    return frequencies, psd, coherence
+
+
+def dominant_frequencies(frequencies, psd, n_peaks=3, f_min=0.5):
+    """
+    frequencies of the largest local maxima of the PSDs above f_min
+    :return:    tuple (positions, frequencies) of shape (channels, n_peaks); missing peaks: position -1, frequency NaN
+    """
+    inner = psd[:, 1:-1]
+    is_peak = (inner >= psd[:, :-2]) & (inner > psd[:, 2:]) & (frequencies[None, 1:-1] >= f_min)
+    ranked = np.argsort(np.where(is_peak, -inner, np.inf), axis=1)[:, :n_peaks]
+    found = np.take_along_axis(is_peak, ranked, axis=1)
+    positions = np.where(found, ranked + 1, -1)
+    return positions, np.where(found, frequencies[np.maximum(positions, 0)], np.nan)
+
+
+@profiled()
+def spectral_table(df, df_segments, columns=None, reference=None, nperseg=256, overlap=0.5, bands=default_bands,
+                   n_peaks=3, f_min=0.5):
+    """
+    spectral characteristics of all channels of every segment
+    :param df:          pandas DataFrame with time index of constant sample rate (e.g. synchronized data)
+    :param df_segments: segment start and end times
+    :param columns:     channels; None: pressure channels of df (see calibration.pressure_columns)
+    :param reference:   reference channel for coherence (e.g. static pressure of Prandtl probe); None: no coherence
+    :param nperseg:     samples per Welch frame (frequency resolution sample rate / nperseg)
+    :param overlap:     overlap of Welch frames
+    :param bands:       frequency bands (f_low, f_high) in Hz of band RMS
+    :param n_peaks:     number of dominant frequencies
+    :param f_min:       lowest dominant frequency in Hz
+    :return:            pandas DataFrame with index (i_seg, channel) and columns "rms", "f_peak_<k>", "psd_peak_<k>",
+                        "coherence_peak_1" (if reference given) and "rms_<f_low>-<f_high>Hz"
+    """
+    columns = pressure_columns(df.columns) if columns is None else list(columns)
+    i_reference = columns.index(reference) if reference is not None else None
+    t = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+    fs = 1e9 / np.median(np.diff(t))
+
+    # segment bounds as in calculate_polar (end included)
+    i_start = df.index.searchsorted(df_segments["start"])
+    i_end = df.index.searchsorted(df_segments["end"], side="right")
+    values = df[columns].to_numpy(dtype=float)
+
+    tables = []
+    for i_seg, start, end in zip(df_segments.index, i_start, i_end):
+        if end - start < 3:
+            continue
+        frequencies, psd, coherence = welch_spectra(values[start:end], fs, nperseg, overlap, i_reference)
+        df_f = frequencies[1] - frequencies[0]
+        data = {"rms": np.nanstd(values[start:end], axis=0)}
+
+        positions, f_peaks = dominant_frequencies(frequencies, psd, n_peaks, f_min)
+        psd_peaks = np.where(positions >= 0, np.take_along_axis(psd, np.maximum(positions, 0), axis=1), np.nan)
+        for k in range(positions.shape[1]):
+            data[f"f_peak_{k + 1}"] = f_peaks[:, k]
+            data[f"psd_peak_{k + 1}"] = psd_peaks[:, k]
+        if coherence is not None:
+            data["coherence_peak_1"] = np.where(positions[:, 0] >= 0, coherence[np.arange(len(columns)),
+                                                                                np.maximum(positions[:, 0], 0)], np.nan)
+
+        for f_low, f_high in bands:
+            in_band = (frequencies >= f_low) & (frequencies < f_high)
+            data[f"rms_{f_low:g}-{f_high:g}Hz"] = np.sqrt(psd[:, in_band].sum(axis=1) * df_f)
+
+        tables.append(pd.DataFrame(data, index=pd.MultiIndex.from_product([[i_seg], columns],
+                                                                         names=["i_seg", "channel"])))
+    return pd.concat(tables) if tables else pd.DataFrame()
@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""
+generator of synthetic test runs for benchmarks and accuracy checks. A run consists of the raw data files in the
+formats of example_data/20230926-1713_* (pressure scanners, AOA sensor, GPS, wake rake drive) and a matching airfoil
+geometry (coordinate file, measurement point Excel, tap DataFrame, XFOIL-type .cp file for the wall correction) and a
+segment definition Excel.
+
+Flow model:
+--> car accelerates after a standstill (zero flow calibration "20sec"), holds one segment per angle of attack and stops
+--> tap pressures from the panel method (panel_method.py) of a NACA 4-digit airfoil at the current angle of attack
+--> wake rake total pressures from a Gaussian wake, whose momentum deficit matches a parabolic drag polar
+--> Prandtl probe on static_K04_31 (static) and static_K04_32 (total)
+--> sensor noise, constant sensor offsets and one leaky wake rake probe (index 0)
+
+Usage:
+python synthetic_campaign.py out_dir [--duration 300] [--sample-rate 100] [--alphas 0 2 4 6 8 10] [--seed 0]
+"""
+import os
+import pickle
+import argparse
+import numpy as np
+import pandas as pd
+
+from panel_method import solve_panel_system
+
+# Prandtl probe sensors (same as in __main__ of Auswertung.py)
+prandtl_data = {"unit name static": "static_K04", "i_sens_static": 31,
+                "unit name total": "static_K04", "i_sens_total": 32}
+
+# sensor units of the taps and number of ports usable for taps (static_K04_31/32: Prandtl probe)
+tap_units = [(2, 32), (3, 32), (4, 30)]
+
+# wake rake geometry in mm (see _calc_rake_sensor_pos in Auswertung.py)
+h_stat = 100.0
+h_tot = 93.0
+
+gear_ratio = 60 / (306 * 2)
+R_s = 287.0500676
+
+
+def naca4_coordinates(code="4412", n_side=100):
+    """
+    normalized coordinates of a NACA 4-digit airfoil in XFOIL order (trailing edge - upper side - leading edge - lower
+    side - trailing edge), cosine spacing, closed trailing edge
+    :param code:    4-digit designation, e.g. "4412" or "0012"
+    :param n_side:  number of points per side
+    :return:        numpy.ndarray of shape (2 * n_side - 1, 2)
+    """
+    m = int(code[0]) / 100.
+    p = int(code[1]) / 10.
+    t = int(code[2:]) / 100.
+
+    beta = np.linspace(0., np.pi, n_side)
+    x = 0.5 * (1. - np.cos(beta))
+    yt = 5. * t * (0.2969 * np.sqrt(x) - 0.1260 * x - 0.3516 * x ** 2 + 0.2843 * x ** 3 - 0.1036 * x ** 4)
+
+    if m > 0.:
+        yc = np.where(x < p, m / p ** 2 * (2 * p * x - x ** 2), m / (1 - p) ** 2 * ((1 - 2 * p) + 2 * p * x - x ** 2))
+        dyc = np.where(x < p, 2 * m / p ** 2 * (p - x), 2 * m / (1 - p) ** 2 * (p - x))
+    else:
+        yc = dyc = np.zeros_like(x)
+    theta = np.arctan(dyc)
+
+    upper = np.column_stack((x - yt * np.sin(theta), yc + yt * np.cos(theta)))
+    lower = np.column_stack((x + yt * np.sin(theta), yc - yt * np.cos(theta)))
+    return np.vstack((upper[::-1], lower[1:]))
+
+
+def _rotate(coords, alpha, x_ref=0.25):
+    """
+    rotates airfoil coordinates nose up by alpha (deg) around x_ref
+    """
+    a = np.deg2rad(alpha)
+    x = coords[:, 0] - x_ref
+    z = coords[:, 1]
+    return np.column_stack((x * np.cos(a) + z * np.sin(a) + x_ref, -x * np.sin(a) + z * np.cos(a)))
+
+
+def tap_geometry(coords, chord, n_taps=80):
+    """
+    selects pressure taps at panel mid points and builds the tap DataFrame in the format of build_airfoil_geometry
+    (including virtual trailing edge taps)
+    :param coords:      normalized airfoil coordinates in XFOIL order
+    :param chord:       chord length in m
+    :param n_taps:      number of taps (at most 94)
+    :return:            tuple (tap DataFrame, indices of the tap panels)
+    """
+    n_max = sum(n for _, n in tap_units)
+    if n_taps > n_max:
+        raise ValueError("at most {0} taps can be connected".format(n_max))
+
+    mid = 0.5 * (coords[1:] + coords[:-1])
+    ds = np.hypot(*np.diff(coords, axis=0).T)
+    s_mid = np.cumsum(ds) - 0.5 * ds
+    s_total = ds.sum()
+
+    # taps evenly spaced in arc length, leaving out the panels next to the trailing edge
+    i_panels = np.unique(np.round(np.linspace(2, len(mid) - 3, n_taps)).astype(int))
+
+    units = np.concatenate([np.full(n, k) for k, n in tap_units])[:len(i_panels)]
+    ports = np.concatenate([np.arange(1, n + 1) for _, n in tap_units])[:len(i_panels)]
+
+    # outward normals of XFOIL-ordered contour: tangent rotated by -90 deg
+    tangent = np.diff(coords, axis=0)[i_panels] / ds[i_panels, np.newaxis]
+    normal = np.dot(tangent, np.array([[0, -1], [1, 0]]))
+
+    df = pd.DataFrame({"Messpunkt": np.arange(1, len(i_panels) + 1, dtype=float),
+                       "Name": ["T{0}".format(i) for i in range(1, len(i_panels) + 1)],
+                       "Position [mm]": s_mid[i_panels] * chord * 1000,
+                       "Sensor unit K": units,
+                       "Sensor port": ports,
+                       "Kommentar": np.nan})
+    df_virt_top = pd.DataFrame([[np.nan, "virtual_top", 0, -1, -1, np.nan]], columns=df.columns)
+    df_virt_bot = pd.DataFrame([[np.nan, "virtual_bot", s_total * chord * 1000, -1, -1, np.nan]], columns=df.columns)
+    df = pd.concat([df_virt_top, df, df_virt_bot]).reset_index(drop=True)
+    df = df.astype({"Sensor unit K": "int32", "Sensor port": "int32"})
+
+    df["s"] = df["Position [mm]"] / (chord * 1000)
+    df["x"] = np.concatenate(([coords[0, 0]], mid[i_panels, 0], [coords[-1, 0]]))
+    df["y"] = np.concatenate(([coords[0, 1]], mid[i_panels, 1], [coords[-1, 1]]))
+    df["x_n"] = np.concatenate(([normal[0, 0]], normal[:, 0], [normal[-1, 0]]))
+    df["y_n"] = np.concatenate(([normal[0, 1]], normal[:, 1], [normal[-1, 1]]))
+
+    return df, i_panels
+
+
+def panel_cp(coords, chord, alpha):
+    """
+    pressure coefficients at the panel mid points (XFOIL order) and lift coefficient of the airfoil at alpha
+    :return:    tuple (cp array of length len(coords) - 1, cl)
+    """
+    system = solve_panel_system(_rotate(coords, alpha), chord)
+    cp = 1. - system["V_t"] ** 2
+
+    # lift from pressure integration (freestream along x, outward normals of the clockwise panels)
+    L = np.hypot(system["x2"] - system["x1"], system["z2"] - system["z1"])
+    nz = (system["x2"] - system["x1"]) / L
+    cl = -np.sum(cp * nz * L) / chord
+
+    # panel_method orders panels clockwise, i.e. reversed XFOIL order
+    return cp[::-1], cl
+
+
+def cd_polar(alpha, cd0=0.008, k=0.0001, alpha_cd_min=2.0):
+    """
+    parabolic drag polar used for the wake deficit
+    """
+    return cd0 + k * (np.asarray(alpha) - alpha_cd_min) ** 2
+
+
+def wake_depth(cd, chord, sigma_wake):
+    """
+    depth A of the Gaussian wake D(z) = 1 - A exp(-z^2 / (2 sigma^2)), D = (p_tot - p_stat) / q, whose momentum
+    deficit cd = 2 / c * int(sqrt(D) (1 - sqrt(D)) dz) equals cd
+    :param cd:          numpy.ndarray of drag coefficients
+    :param chord:       chord length in m
+    :param sigma_wake:  wake half width in mm
+    :return:            numpy.ndarray of wake depths
+    """
+    z = np.linspace(-6 * sigma_wake, 6 * sigma_wake, 601)
+    A = np.linspace(0., 0.99, 400)
+    D = 1. - A[:, np.newaxis] * np.exp(-z ** 2 / (2 * sigma_wake ** 2))
+    cd_A = 2. / (chord * 1000) * np.trapezoid(np.sqrt(D) * (1. - np.sqrt(D)), z, axis=1)
+    return np.interp(cd, cd_A, A)
+
+
+def _speed_schedule(t, duration, U, alphas, t_standstill=20., t_ramp=15., t_transition=3.):
+    """
+    car speed and angle of attack over time. Returns speed, alpha and list of (start, end) times of the segments
+    """
+    t_hold = duration - 2 * t_standstill - 2 * t_ramp
+    if t_hold < len(alphas) * (t_transition + 5.):
+        raise ValueError("duration too short for {0} segments".format(len(alphas)))
+    t_seg = t_hold / len(alphas)
+
+    t_drive_start = t_standstill
+    t_hold_start = t_drive_start + t_ramp
+    t_hold_end = t_hold_start + t_hold
+    t_drive_end = t_hold_end + t_ramp
+
+    speed = U * np.clip(np.minimum((t - t_drive_start) / t_ramp, (t_drive_end - t) / t_ramp), 0., 1.)
+    # smooth acceleration
+    speed = U * 0.5 * (1. - np.cos(np.pi * speed / U))
+
+    # alpha: constant within segment, linear transition at start of every segment
+    seg_starts = t_hold_start + t_seg * np.arange(len(alphas))
+    alpha_knots_t = np.concatenate([[s, s + t_transition] for s in seg_starts])
+    alpha_knots = np.column_stack((np.concatenate(([alphas[0]], alphas[:-1])), alphas)).flatten()
+    alpha = np.interp(t, alpha_knots_t, alpha_knots)
+
+    segments = [(s + t_transition + 1., s + t_seg - 1.) for s in seg_starts]
+    return speed, alpha, segments
+
+
+def _nmea_checksum(sentence):
+    checksum = 0
+    for char in sentence:
+        checksum ^= ord(char)
+    return "{0:02X}".format(checksum)
+
+
+def _nmea_coordinate(value, n_deg):
+    degrees = np.floor(np.abs(value))
+    minutes = (np.abs(value) - degrees) * 60.
+    return "{0:0{1}d}{2:08.5f}".format(int(degrees), n_deg, minutes)
+
+
+def write_scanner_file(filename, t_ms, pressures, rng):
+    """
+    writes pressure scanner file: time in ms, one integer pressure in Pa per sensor, temperature column; the first
+    line is skipped by read_DLR_pressure_scanner_file
+    """
+    temperature = 1003.01 + 0.01 * rng.standard_normal(len(t_ms))
+    block = np.column_stack((t_ms, np.round(pressures), temperature))
+    fmt = " ".join(["%d"] * (pressures.shape[1] + 1) + ["%.2f"]) + " "
+    with open(filename, "w") as file:
+        file.write(" ".join(["0"] * (pressures.shape[1] + 1)) + " 0.00 \n")
+        np.savetxt(file, block, fmt=fmt)
+
+
+def write_excel_cells(filename, cells):
+    """
+    writes dict {(row, column): value} (1-based) to the first sheet of an Excel file (requires openpyxl)
+    """
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for (row, col), value in cells.items():
+        sheet.cell(row=row, column=col, value=value)
+    workbook.save(filename)
+
+
+def write_msr_pts_excel(filename, df_airfoil):
+    """
+    writes measurement point Excel in the format of "Messpunkte Demonstrator.xlsx"
+    """
+    taps = df_airfoil.iloc[1:-1]
+    cells = {(1, 1): "Messpunkte Demonstrator:"}
+    for col, name in enumerate(["Messpunkt", "Name", "Position [mm]", "Sensor unit K", "Sensor port", "Kommentar"]):
+        cells[(2, col + 1)] = name
+    cells[(3, 3)] = 0.
+    cells[(3, 6)] = "Endleiste"
+    for row, (_, tap) in enumerate(taps.iterrows()):
+        cells[(4 + row, 1)] = int(tap["Messpunkt"])
+        cells[(4 + row, 2)] = tap["Name"]
+        cells[(4 + row, 3)] = float(tap["Position [mm]"])
+        cells[(4 + row, 4)] = int(tap["Sensor unit K"])
+        cells[(4 + row, 5)] = int(tap["Sensor port"])
+    cells[(4 + len(taps), 3)] = float(df_airfoil["Position [mm]"].iloc[-1])
+    cells[(4 + len(taps), 6)] = "Endleiste"
+    write_excel_cells(filename, cells)
+
+
+def write_seg_def_excel(filename, raw_data_filename, df_segments, calibration_info="20sec"):
+    """
+    writes segment definition Excel (see read_segment_definition in Auswertung.py)
+    """
+    cells = {(1, 1): "start", (1, 5): "end", (1, 10): "raw data file", (1, 11): "calibration",
+             (1, 12): "eta TE flap", (1, 13): "eta LE flap",
+             (2, 10): raw_data_filename, (2, 11): calibration_info, (2, 12): 0., (2, 13): 0.}
+    for col, name in enumerate(["dd", "hh", "mm", "ss"] * 2):
+        cells[(2, col + 1)] = name
+    for row, (start, end) in enumerate(zip(df_segments["start"], df_segments["end"])):
+        for col, t in [(1, start), (5, end)]:
+            cells[(3 + row, col)] = t.strftime("%Y-%m-%d")
+            cells[(3 + row, col + 1)] = t.hour
+            cells[(3 + row, col + 2)] = t.minute
+            cells[(3 + row, col + 3)] = t.second
+    write_excel_cells(filename, cells)
+
+
+def write_cp_file(filename, coords, cp, name):
+    """
+    writes XFOIL-type .cp file (3 header lines, columns x, y, cp)
+    """
+    mid = 0.5 * (coords[1:] + coords[:-1])
+    with open(filename, "w") as file:
+        file.write("# {0}\n# alpha = 0.00000\n#    x          y          Cp\n".format(name))
+        np.savetxt(file, np.column_stack((mid, cp)), fmt="%10.5f")
+
+
+def generate_campaign(out_dir, duration=300., sample_rate=100., alphas=(0., 2., 4., 6., 8., 10.), U=30.,
+                      airfoil="4412", chord=0.5, n_taps=80, noise=1.5, seed=0, filename="20230926-1713",
+                      t0="2023-09-26 15:13:31", pc_clock_offset=1.8, alpha_sens_offset=272.96630859375,
+                      write_excel=True):
+    """
+    generates one synthetic run
+    :param out_dir:             output directory
+    :param duration:            length of the run in s
+    :param sample_rate:         sample rate of the pressure scanners in Hz
+    :param alphas:              angle of attack of the segments in deg
+    :param U:                   car speed during the segments in m/s
+    :param airfoil:             NACA 4-digit designation
+    :param chord:               chord length in m
+    :param n_taps:              number of static pressure taps
+    :param noise:               standard deviation of the pressure sensor noise in Pa
+    :param seed:                seed of the random generator
+    :param filename:            common file name start of the raw data files
+    :param t0:                  UTC time of the first GPS fix
+    :param pc_clock_offset:     offset of the clock of the measurement computer against GPS time in s
+    :param alpha_sens_offset:   AOA sensor offset
+    :param write_excel:         if True, measurement point and segment definition Excel files are written (openpyxl)
+    :return:                    dict with paths, settings for the evaluation, tap DataFrame, segments and the exact
+                                values of every segment
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    alphas = np.asarray(alphas, dtype=float)
+    t0 = pd.Timestamp(t0, tz="UTC")
+
+    # geometry
+    coords = naca4_coordinates(airfoil)
+    df_airfoil, i_panels = tap_geometry(coords, chord, n_taps=n_taps)
+    foil_coord_path = os.path.join(out_dir, "naca{0}.dat".format(airfoil))
+    with open(foil_coord_path, "w") as file:
+        file.write("NACA {0}\n".format(airfoil))
+        np.savetxt(file, coords, fmt="%10.6f")
+    geometry_path = os.path.join(out_dir, "naca{0}_geometry.p".format(airfoil))
+    with open(geometry_path, "wb") as file:
+        pickle.dump(df_airfoil, file)
+
+    # cp file of symmetrical airfoil of same thickness for the wall correction
+    coords_sym = naca4_coordinates("00" + airfoil[2:])
+    cp_sym, _ = panel_cp(coords_sym, chord, 0.)
+    cp_path_wall_correction = os.path.join(out_dir, "naca00{0}.cp".format(airfoil[2:]))
+    write_cp_file(cp_path_wall_correction, coords_sym, cp_sym, "NACA 00" + airfoil[2:])
+
+    # cp of the taps on an alpha grid
+    alpha_grid = np.arange(np.floor(alphas.min()) - 1., np.ceil(alphas.max()) + 1.5, 0.5)
+    cp_grid = np.empty((len(alpha_grid), len(i_panels)))
+    cl_grid = np.empty(len(alpha_grid))
+    for i, alpha in enumerate(alpha_grid):
+        cp, cl_grid[i] = panel_cp(coords, chord, alpha)
+        cp_grid[i] = cp[i_panels]
+
+    # flow state at scanner sample times
+    t = np.arange(0., duration, 1. / sample_rate)
+    speed, alpha, segments = _speed_schedule(t, duration, U, alphas)
+    T_air = 288.15
+    p_amb = 98000. + 20. * np.sin(2 * np.pi * t / duration)
+    rho = p_amb / (R_s * T_air)
+    q = 0.5 * rho * speed ** 2
+
+    i_hi = np.clip(np.searchsorted(alpha_grid, alpha), 1, len(alpha_grid) - 1)
+    w = (alpha - alpha_grid[i_hi - 1]) / (alpha_grid[i_hi] - alpha_grid[i_hi - 1])
+    cp_taps = (1. - w)[:, np.newaxis] * cp_grid[i_hi - 1] + w[:, np.newaxis] * cp_grid[i_hi]
+
+    def sensors(values):
+        # constant offsets and noise of the pressure sensors
+        offsets = rng.normal(0., 30., values.shape[1])
+        return values + offsets + noise * rng.standard_normal(values.shape)
+
+    # static pressure units
+    t_ms = 1738500 + np.round(t * 1000).astype(np.int64)
+    taps = df_airfoil.iloc[1:-1]
+    for unit in [2, 3, 4]:
+        p_unit = np.repeat(p_amb[:, np.newaxis], 32, axis=1)
+        mask = (taps["Sensor unit K"] == unit).to_numpy()
+        ports = taps.loc[mask, "Sensor port"].to_numpy()
+        p_unit[:, ports - 1] += cp_taps[:, mask] * q[:, np.newaxis]
+        if unit == 4:
+            p_unit[:, 30] = p_amb
+            p_unit[:, 31] = p_amb + q
+        write_scanner_file(os.path.join(out_dir, "{0}_static_K0{1}.dat".format(filename, unit)), t_ms,
+                           sensors(p_unit), rng)
+
+    # wake rake: Gaussian wake, centre moves down with increasing alpha
+    sigma_wake = 10.
+    z_tot = np.linspace(-h_tot / 2, h_tot / 2, 32)
+    A = wake_depth(cd_polar(alpha), chord, sigma_wake)
+    mu = -0.5 * alpha
+    D = 1. - A[:, np.newaxis] * np.exp(-(z_tot - mu[:, np.newaxis]) ** 2 / (2 * sigma_wake ** 2))
+    p_tot_rake = p_amb[:, np.newaxis] + q[:, np.newaxis] * D
+    # leaky probe
+    p_tot_rake[:, 0] = p_amb + 0.3 * q
+    write_scanner_file(os.path.join(out_dir, "{0}_ptot_rake.dat".format(filename)), t_ms, sensors(p_tot_rake), rng)
+    p_stat_rake = p_amb[:, np.newaxis] - 0.01 * q[:, np.newaxis] * np.ones(5)
+    write_scanner_file(os.path.join(out_dir, "{0}_pstat_rake.dat".format(filename)), t_ms, sensors(p_stat_rake), rng)
+
+    # AOA sensor, ~31 Hz, time of measurement computer (read_AOA_file aligns the first sample with the first GPS fix)
+    t_aoa = np.arange(0., duration, 0.032)
+    abs_sensor_pos = (np.interp(t_aoa, t, alpha) + 0.02 * rng.standard_normal(len(t_aoa))) / gear_ratio
+    counts = np.round((alpha_sens_offset - abs_sensor_pos) / 360 * 2 ** 14).astype(np.int64)
+    turn = np.floor_divide(counts, 2 ** 14)
+    pos = counts - turn * 2 ** 14
+    t_pc = t0 + pd.to_timedelta(t_aoa + pc_clock_offset, unit="s")
+    with open(os.path.join(out_dir, "{0}_AOA.dat".format(filename)), "w") as file:
+        for ti, p, n in zip(t_pc.strftime("%Y-%m-%d %H:%M:%S.%f"), pos, turn):
+            file.write("{0} {1} {2}\n".format(ti[:-3], p, n))
+
+    # GPS, 1 Hz, straight track with constant heading
+    t_gps = np.arange(0., duration, 1.)
+    speed_gps = np.interp(t_gps, t, speed)
+    dist = np.concatenate(([0.], np.cumsum(0.5 * (speed_gps[1:] + speed_gps[:-1]))))
+    heading = np.deg2rad(60.)
+    lat = 49.918964 + dist * np.cos(heading) / 111320.
+    lon = 10.906231 + dist * np.sin(heading) / (111320. * np.cos(np.deg2rad(49.918964)))
+    with open(os.path.join(out_dir, "{0}_GPS.dat".format(filename)), "w") as file:
+        for ti, la, lo, v in zip(t0 + pd.to_timedelta(t_gps, unit="s"), lat, lon, speed_gps):
+            sentence = "GPRMC,{0},A,{1},N,{2},E,{3:.3f},,{4},,,A".format(
+                ti.strftime("%H%M%S.00"), _nmea_coordinate(la, 2), _nmea_coordinate(lo, 3), v * 3.6 / 1.852,
+                ti.strftime("%d%m%y"))
+            file.write("${0}*{1}\n".format(sentence, _nmea_checksum(sentence)))
+
+    # wake rake drive, local time of measurement computer
+    t_drive = np.arange(2.5, duration, 0.3)
+    t_drive_local = (t0 + pd.to_timedelta(t_drive + pc_clock_offset, unit="s")).tz_convert("Europe/Vienna")
+    with open(os.path.join(out_dir, "{0}_drive.dat".format(filename)), "w") as file:
+        file.write("time pos speed\n")
+        for ti in t_drive_local.strftime("%Y-%m-%d %H:%M:%S.%f"):
+            file.write("{0} 185.04098360655738 0\n".format(ti))
+
+    # segments
+    df_segments = pd.DataFrame({"start": [t0 + pd.Timedelta(seconds=np.ceil(s)) for s, _ in segments],
+                                "end": [t0 + pd.Timedelta(seconds=np.floor(e)) for _, e in segments]})
+    seg_def_path = os.path.join(out_dir, "{0}_segments.xlsx".format(filename))
+    msr_pts_path = os.path.join(out_dir, "naca{0}_Messpunkte.xlsx".format(airfoil))
+    if write_excel:
+        write_seg_def_excel(seg_def_path, filename, df_segments)
+        write_msr_pts_excel(msr_pts_path, df_airfoil)
+
+    rho_seg = np.array([rho[(t >= s) & (t <= e)].mean() for s, e in segments])
+    mu_air = (1.458E-6 * T_air ** (3 / 2)) / (T_air + 110.4)
+    df_truth = pd.DataFrame({"alpha": alphas, "cl": np.interp(alphas, alpha_grid, cl_grid), "cd": cd_polar(alphas),
+                             "U_TAS": U, "Re": U * chord * rho_seg / mu_air})
+
+    return {"data_dir": out_dir,
+            "filename": filename,
+            "foil_coord_path": foil_coord_path,
+            "geometry_path": geometry_path,
+            "file_path_msr_pts": msr_pts_path,
+            "seg_def_path": seg_def_path,
+            "cp_path_wall_correction": cp_path_wall_correction,
+            "df_airfoil": df_airfoil,
+            "df_segments": df_segments,
+            "df_truth": df_truth,
+            "prandtl_data": prandtl_data,
+            "defective_sensor_list": [0],
+            "alpha_sens_offset": alpha_sens_offset,
+            "l_ref": chord,
+            "T_air": T_air,
+            "flap_pivots": np.array([[0.2, 0.0], [0.8, 0.0]]),
+            "sync_drive": True}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="generates a synthetic test run")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--duration", type=float, default=300., help="length of the run in s")
+    parser.add_argument("--sample-rate", type=float, default=100., help="sample rate of the pressure scanners in Hz")
+    parser.add_argument("--alphas", type=float, nargs="+", default=[0., 2., 4., 6., 8., 10.],
+                        help="angles of attack of the segments in deg")
+    parser.add_argument("--airfoil", default="4412", help="NACA 4-digit airfoil")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    args = parser.parse_args()
+
+    campaign = generate_campaign(args.out_dir, duration=args.duration, sample_rate=args.sample_rate,
+                                 alphas=args.alphas, airfoil=args.airfoil, seed=args.seed)
+    print(campaign["df_truth"].to_string())
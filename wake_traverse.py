@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+wake rake traverse: with a recorded drive position ("Rake Position" of read_drive, sync_drive=True) the pressures of
+all rake probes are assigned to their absolute height z = z_probe + direction * (position - reference position) and
+averaged in bins of equal height per segment (one 2-D histogram over segments and bins for all samples and probes).
+Several rake positions of a segment are thereby stitched into one wake profile, which is integrated over the whole
+covered span. Where the traverse covers more than the rake itself and the wake profile is closed at both ends, this
+drag replaces the Gaussian extrapolation of calc_cd.
+
+Usage:
+from wake_traverse import traverse_drag, apply_traverse_drag
+df_traverse = traverse_drag(df_raw, df_segments, l_ref, lambda_wall, sigma_wall, xi_wall, defective_sensor_list)
+df_polar = apply_traverse_drag(df_polar, df_traverse)
+"""
+import numpy as np
+import pandas as pd
+
+from Auswertung import _calc_rake_sensor_pos
+from fast_engines import linear_interpolation_matrix
+from profiling import profiled
+
+
+def bin_traverse(df, df_segments, defective_sensor_list, bin_width=1., reference_position=None, direction=1.,
+                 max_rake_speed=None):
+    """
+    wake profiles of all segments on a common height grid
+    :param df:                      pandas DataFrame with rake pressure coefficients (ptot_rake_*, pstat_rake_*, e.g.
+                                    df_raw of calc_time_series) and "Rake Position" in mm
+    :param df_segments:             segment start and end times
+    :param defective_sensor_list:   indices of defective total pressure probes
+    :param bin_width:               height of bins in mm
+    :param reference_position:      drive position of z = 0 in mm; None: median position of all segments
+    :param direction:               1: z increases with drive position, -1: z decreases
+    :param max_rake_speed:          samples with larger absolute "Rake Speed" are not used; None: all samples
+    :return:                        tuple (z of bin centers (bins), sample counts, mean cp_tot, mean cp_stat), arrays of
+                                    shape (segments, bins); bins without samples are NaN
+    """
+    z_tot, z_stat = _calc_rake_sensor_pos(defective_sensor_list=defective_sensor_list)
+    cp_tot = np.delete(df.filter(regex=r"^ptot_rake_").to_numpy(dtype=float), defective_sensor_list, axis=1)
+    cp_stat = df.filter(regex=r"^pstat_rake_").to_numpy(dtype=float) @ linear_interpolation_matrix(z_stat, z_tot).T
+    position = df["Rake Position"].to_numpy(dtype=float)
+
+    # segment of every sample (end included as in calculate_polar), -1: no segment
+    i_seg = np.full(len(df), -1)
+    i_start = df.index.searchsorted(df_segments["start"])
+    i_end = df.index.searchsorted(df_segments["end"], side="right")
+    for k, (start, end) in enumerate(zip(i_start, i_end)):
+        i_seg[start:end] = k
+    used = (i_seg >= 0) & ~np.isnan(position)
+    if max_rake_speed is not None:
+        used &= np.abs(df["Rake Speed"].to_numpy(dtype=float)) <= max_rake_speed
+    if reference_position is None:
+        reference_position = np.median(position[used]) if used.any() else 0.
+
+    # absolute height of every probe and sample
+    z = z_tot[None, :] + direction * (position[:, None] - reference_position)
+    valid = used[:, None] & np.isfinite(z) & ~np.isnan(cp_tot) & ~np.isnan(cp_stat)
+    z_low = np.floor(z[valid].min() / bin_width) * bin_width if valid.any() else z_tot.min()
+    z_high = z[valid].max() if valid.any() else z_tot.max()
+    n_bins = int((z_high - z_low) // bin_width) + 1
+
+    # 2-D histogram over (segment, bin)
+    n_seg = len(df_segments)
+    flat = (np.broadcast_to(i_seg[:, None], z.shape) * n_bins +
+            ((np.where(valid, z, z_low) - z_low) // bin_width).astype(int))[valid]
+    counts = np.bincount(flat, minlength=n_seg * n_bins).reshape(n_seg, n_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cp_tot_mean = np.bincount(flat, cp_tot[valid], n_seg * n_bins).reshape(n_seg, n_bins) / counts
+        cp_stat_mean = np.bincount(flat, cp_stat[valid], n_seg * n_bins).reshape(n_seg, n_bins) / counts
+    z_centers = z_low + (np.arange(n_bins) + 0.5) * bin_width
+    return z_centers, counts, cp_tot_mean, cp_stat_mean
+
+
+@profiled()
+def traverse_drag(df, df_segments, l_ref, lambda_wall, sigma_wall, xi_wall, defective_sensor_list, min_samples=10,
+                  **binning):
+    """
+    drag coefficient of the stitched wake profile of every segment (Jones, as calc_cd)
+    :param min_samples: bins with fewer samples are not used
+    :param binning:     see bin_traverse
+    :return:            pandas DataFrame (index of df_segments) with "cd_traverse", "z_low", "z_high" (covered heights
+                        in mm), "n_bins" and "d_cd_low", "d_cd_high", "d_cd_max" (local drag of the outermost bins and
+                        maximum local drag in 1/m)
+    """
+    z, counts, cp_tot, cp_stat = bin_traverse(df, df_segments, defective_sensor_list, **binning)
+    d_cd_jones = 2.0 * np.sqrt(np.abs(cp_tot - cp_stat)) * (1.0 - np.sqrt(np.abs(cp_tot)))
+    wall_factor = 1.0 - 2.0 * lambda_wall * (sigma_wall + xi_wall)
+
+    rows = []
+    for k in range(len(df_segments)):
+        mask = counts[k] >= min_samples
+        if mask.sum() < 2:
+            rows.append({"cd_traverse": np.nan, "z_low": np.nan, "z_high": np.nan, "n_bins": int(mask.sum()),
+                         "d_cd_low": np.nan, "d_cd_high": np.nan, "d_cd_max": np.nan})
+            continue
+        d_cd = d_cd_jones[k, mask]
+        cd = np.trapezoid(d_cd, z[mask]) / (l_ref * 1000.0) * wall_factor
+        rows.append({"cd_traverse": cd, "z_low": z[mask][0], "z_high": z[mask][-1], "n_bins": int(mask.sum()),
+                     "d_cd_low": d_cd[0], "d_cd_high": d_cd[-1], "d_cd_max": np.nanmax(d_cd)})
+    return pd.DataFrame(rows, index=df_segments.index)
+
+
+def apply_traverse_drag(df_polar, df_traverse, min_extension=10., max_edge_fraction=0.05):
+    """
+    replaces cd of the polar by the traverse drag, where the traverse covers the rake height plus min_extension and
+    the wake profile is closed at both ends. Otherwise the extrapolated cd of calc_cd is kept
+    :param df_polar:            polar (calculate_polar)
+    :param df_traverse:         result of traverse_drag
+    :param min_extension:       minimum covered height beyond the rake height in mm
+    :param max_edge_fraction:   maximum local drag of the outermost bins relative to the maximum local drag
+    :return:                    polar with "cd_traverse" and "cd_traverse_flag" columns (True where cd was replaced)
+    """
+    z_tot, _ = _calc_rake_sensor_pos()
+    df_polar = df_polar.join(df_traverse[["cd_traverse"]])
+    span = (df_traverse["z_high"] - df_traverse["z_low"]).reindex(df_polar.index)
+    edge_limit = max_edge_fraction * df_traverse["d_cd_max"]
+    closed = ((df_traverse["d_cd_low"] <= edge_limit) & (df_traverse["d_cd_high"] <= edge_limit))
+    closed = closed.reindex(df_polar.index, fill_value=False)
+    mask = (span >= z_tot.max() - z_tot.min() + min_extension) & closed & df_polar["cd_traverse"].notna()
+    df_polar.loc[mask, "cd"] = df_polar.loc[mask, "cd_traverse"]
+    df_polar.loc[mask, "cd_extrapol_flag"] = False
+    df_polar["cd_traverse_flag"] = mask
+    return df_polar
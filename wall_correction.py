@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+wind tunnel wall correction coefficients lambda, sigma and xi, calculated once per cp file, reference length and
+probe position. lambda and xi are both calculated on the symmetrical reference airfoil of the cp file; cp files of
+cambered or flapped contours are rejected. xi is calculated with a panel method at the measured position of the static
+reference pressure probe; without a probe position the former fixed coefficient -0.00335 * l_ref**2 is used.
+
+Usage (comparison of xi with the former fixed coefficient, probe position x z in m relative to the leading edge):
+python wall_correction.py example_data/B200-0_reinitialized.cp -1.0 -0.66 [0.5 0.7]
+"""
+import sys
+import hashlib
+import numpy as np
+from panel_method import solve_panel_system, velocity
+
+# model - wall distances:
+d1 = 0.7
+d2 = 1.582
+
+# maximum camber (half the sum of upper and lower y) of the reference airfoil relative to the chord
+max_camber = 0.01
+
+# memoized coefficients {(sha1 of cp file content, l_ref, probe position): (lambda, sigma, xi)}
+_coefficients = dict()
+
+
+def parse_xfoil_cp(content, skiprows=3):
+    """
+    parses content of an XFOIL .cp file (3 header lines, then fixed-format columns x, y, cp)
+    :param content:     bytes, content of .cp file
+    :param skiprows:    number of header lines
+    :return:            numpy.ndarray of shape (n, 3) with columns x, y, cp
+    """
+    lines = content.split(b"\n", skiprows)
+    data = lines[skiprows] if len(lines) > skiprows else b""
+    return np.array(data.split(), dtype=float).reshape(-1, 3)
+
+
+def read_xfoil_cp(filepath):
+    """
+    reads XFOIL .cp file (e.g. "B200-0_reinitialized.cp")
+    :param filepath:    path of .cp file
+    :return:            numpy.ndarray of shape (n, 3) with columns x, y, cp
+    """
+    with open(filepath, "rb") as file:
+        return parse_xfoil_cp(file.read())
+
+
+def calc_wall_correction_coefficients(filepath, l_ref, probe_position=None):
+    """
+    calculate wall correction coefficients according to
+    Abbott and van Doenhoff 1945: Theory of Wing Sections
+    and
+    Althaus 2003: Tunnel-Wall Corrections at the Laminar Wind Tunnel
+    The coefficients are memoized by content of the cp file, l_ref and probe position, so repeated calls within a
+    batch run only cost reading the file
+    :param filepath:        path of XFOIL .cp file of the symmetrical airfoil (reference geometry of lambda and xi)
+    :param l_ref:           reference length (chord length) in m
+    :param probe_position:  measured position (x, z) of the static reference pressure probe relative to the airfoil
+                            leading edge in m (x downstream, z towards wall d1); None: former fixed xi
+    :return:                wall correction coefficients
+    """
+    with open(filepath, "rb") as file:
+        content = file.read()
+
+    if probe_position is not None:
+        probe_position = tuple(float(value) for value in probe_position)
+    key = (hashlib.sha1(content).hexdigest(), float(l_ref), probe_position)
+    if key not in _coefficients:
+        _coefficients[key] = _calc_coefficients(parse_xfoil_cp(content), l_ref, probe_position, filepath)
+
+    return _coefficients[key]
+
+
+def calc_xi(coords, l_ref, lambda_wall_corr, probe_position):
+    """
+    calculates correction coefficient xi for the model influence on the static reference pressure with a panel method.
+    The tunnel walls at the distances d1 and d2 are modelled by images. The velocity increment at the probe position
+    corresponds to the reference velocity error lambda * xi
+    :param coords:              numpy.ndarray with normalized airfoil coordinates
+    :param l_ref:               reference length (chord length) in m
+    :param lambda_wall_corr:    wall correction coefficient lambda
+    :param probe_position:      position (x, z) of the static reference pressure probe in m
+    :return:                    xi
+    """
+    system = solve_panel_system(coords, l_ref, d1, d2)
+    u_probe, _ = velocity(system, *probe_position)
+    return -(u_probe[0] - 1.0) / lambda_wall_corr
+
+
+def check_symmetrical(xycp, filepath=""):
+    """
+    raises ValueError, if the contour of the cp file is cambered or flapped (lambda and xi are only defined for the
+    symmetrical reference airfoil)
+    """
+    i_le = np.argmin(xycp[:, 0])
+    upper, lower = xycp[:i_le + 1][::-1], xycp[i_le:]
+    x = np.linspace(upper[0, 0], min(upper[-1, 0], lower[-1, 0]), 200)
+    camber = (np.interp(x, upper[:, 0], upper[:, 1]) + np.interp(x, lower[:, 0], lower[:, 1])) / 2
+    if np.abs(camber).max() > max_camber * (xycp[:, 0].max() - xycp[i_le, 0]):
+        raise ValueError("wall correction needs the cp file of the symmetrical reference airfoil, {0} has a camber of "
+                         "{1:.4f}".format(filepath, np.abs(camber).max()))
+
+
+def _calc_coefficients(xycp, l_ref, probe_position=None, filepath=""):
+    """
+    calculates lambda, sigma and xi from x, y, cp array of a symmetrical airfoil
+    """
+    from scipy import integrate
+
+    check_symmetrical(xycp, filepath)
+    coords = np.ascontiguousarray(xycp[:, :2], dtype=np.float64)
+
+    # cut off bottom airfoil side
+    xycp = xycp[:np.argmin(xycp[:, 0]) + 1, :]
+    # and flip it
+    x, y, cp = xycp[::-1, :].T
+
+    # calculate surface contour gradient dy_t/dx as finite difference scheme. first and last value are calculated
+    # with forward and backward difference scheme, respectively and all other values with central difference
+    # scheme
+    dyt_dx = np.gradient(y)/np.gradient(x)
+
+    # calculate v/V_inf
+    v_V_inf = np.sqrt(1 - cp)
+
+    # calculate lambda (warning: Lambda of Althaus is erroneus, first y factor forgotten)
+    lambda_wall_corr = float(integrate.trapezoid(y=16 / np.pi * y * v_V_inf * np.sqrt(1 + dyt_dx ** 2), x=x))
+
+    # calculate sigma
+    sigma_wall_corr = np.pi ** 2 / 48 * l_ref**2 * 1 / 2 * (1 / (2 * d1) + 1 / (2 * d2)) ** 2
+
+    # correction for model influence on static reference pressure
+    if probe_position is None:
+        xi_wall_corr = -0.00335 * l_ref ** 2
+    else:
+        xi_wall_corr = float(calc_xi(coords, l_ref, lambda_wall_corr, probe_position))
+
+    return lambda_wall_corr, sigma_wall_corr, xi_wall_corr
+
+
+def check_xi(filepath, probe_position, l_refs=(0.5, 0.7), rtol=0.15):
+    """
+    comparison of xi of the panel method with the former fixed coefficient -0.00335 * l_ref**2
+    :param filepath:        path of XFOIL .cp file of the symmetrical airfoil
+    :param probe_position:  measured position (x, z) of the static reference pressure probe in m
+    :param l_refs:          reference lengths in m
+    :param rtol:            accepted relative deviation
+    :return:                True, if xi has the sign of the former coefficient and deviates less than rtol for all
+                            l_refs
+    """
+    passed = True
+    for l_ref in l_refs:
+        _, _, xi = calc_wall_correction_coefficients(filepath, l_ref, probe_position)
+        xi_former = -0.00335 * l_ref ** 2
+        ok = abs(xi - xi_former) <= rtol * abs(xi_former)
+        passed &= ok
+        print("l_ref = {0:.3f} m: xi = {1:.6f}, former xi = {2:.6f} {3}".format(l_ref, xi, xi_former,
+                                                                             "ok" if ok else "DEVIATES"))
+    return passed
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        print(__doc__)
+        sys.exit(1)
+    sys.exit(0 if check_xi(sys.argv[1], (float(sys.argv[2]), float(sys.argv[3])),
+                           [float(l) for l in sys.argv[4:]] or (0.5, 0.7)) else 1)
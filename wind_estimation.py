@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+wind estimation from true airspeed, GPS speed and GPS track heading. The probe measures the air velocity along the
+car axis, so with the wind vector W = (W_east, W_north) and the unit vector of the heading h = (sin(psi), cos(psi)):
+
+    U_TAS - U_GPS = -W * h      (head wind positive)
+
+All time windows are solved at once (normal equations from cumulative sums, batched pseudo-inverse). On a straight
+road with back-and-forth passes only the wind along the road is observable; the truncated pseudo-inverse then gives
+the minimum norm solution, i.e. the cross wind is zero and the wind component along the heading is still correct.
+Windows with too few samples, passes in one direction only (mean resultant length of the headings close to 1) or
+large residuals are marked with a bad quality flag.
+
+Usage:
+from wind_estimation import estimate_wind, segment_wind
+df_filt = estimate_wind(df_filt, df_raw["U_TAS"])    # columns wind_east, wind_north, wind_component, ...
+df_polar = df_polar.join(segment_wind(df_filt, df_segments))
+"""
+import numpy as np
+import pandas as pd
+
+wind_columns = ["wind_east", "wind_north", "wind_component", "wind_residual", "wind_quality"]
+
+
+def solve_wind_windows(t, heading, delta_U, valid, window_s=120., hop_s=10.):
+    """
+    least squares wind vector of every time window
+    :param t:           numpy.ndarray of times in s
+    :param heading:     numpy.ndarray of headings in deg
+    :param delta_U:     numpy.ndarray of U_TAS - U_GPS in m/s
+    :param valid:       numpy.ndarray of bool, samples used for the estimation
+    :param window_s:    window length in s
+    :param hop_s:       distance of window starts in s
+    :return:            pandas DataFrame with window center time, W_east, W_north, number of samples, mean resultant
+                        length of the headings (0: balanced directions, 1: one direction) and RMS residual
+    """
+    psi = np.radians(heading)
+    valid = valid & ~np.isnan(psi) & ~np.isnan(delta_U)
+    s = np.where(valid, np.sin(psi), 0.)
+    c = np.where(valid, np.cos(psi), 0.)
+    d = np.where(valid, delta_U, 0.)
+
+    # cumulative sums of all products of the normal equations
+    products = np.column_stack((valid, s, c, s * s, s * c, c * c, s * d, c * d, d * d)).astype(float)
+    sums = np.vstack((np.zeros((1, products.shape[1])), np.cumsum(products, axis=0)))
+
+    t_starts = np.arange(t[0], max(t[-1] - window_s, t[0]) + hop_s / 2, hop_s)
+    i_start = np.searchsorted(t, t_starts)
+    i_end = np.searchsorted(t, t_starts + window_s)
+    n, s_sum, c_sum, ss, sc, cc, sd, cd, dd = (sums[i_end] - sums[i_start]).T
+
+    # rows of the design matrix: (-sin(psi), -cos(psi)); A^T A and A^T b of all windows
+    AtA = np.stack((np.stack((ss, sc), axis=-1), np.stack((sc, cc), axis=-1)), axis=-2)
+    Atb = np.stack((-sd, -cd), axis=-1)
+    # directions, which are not observable in a window, are truncated (minimum norm solution)
+    W = np.einsum("kij,kj->ki", np.linalg.pinv(AtA, rcond=1e-2), Atb)
+
+    # residual sum of squares: b^T b - 2 W^T A^T b + W^T A^T A W
+    rss = dd - 2 * np.einsum("ki,ki->k", W, Atb) + np.einsum("ki,kij,kj->k", W, AtA, W)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resultant = np.hypot(s_sum, c_sum) / n
+        rms = np.sqrt(np.maximum(rss, 0.) / (n - 2))
+
+    return pd.DataFrame({"t_center": t_starts + window_s / 2, "W_east": W[:, 0], "W_north": W[:, 1], "n": n,
+                         "resultant": resultant, "rms": rms})
+
+
+def estimate_wind(df, U_TAS_raw=None, window_s=120., hop_s=10., min_speed=10., min_samples=1000,
+                  max_resultant=0.5, max_rms=1.0):
+    """
+    adds wind columns to a time series:
+    wind_east, wind_north   wind vector (velocity of the air) in m/s
+    wind_component          head wind component along the heading in m/s (estimated U_TAS - U_GPS)
+    wind_residual           measured unfiltered U_TAS - U_GPS minus wind_component (gusts and sensor errors), NaN for
+                            samples not used for the estimation (slow or not on a straight pass)
+    wind_quality            True, if the wind of the window is well determined
+    :param df:              pandas DataFrame with time index and "U_TAS", "U_GPS", "heading" (see gps_track.py)
+                            and optionally "pass_id" columns
+    :param U_TAS_raw:       unfiltered U_TAS with the index of df (e.g. of df_raw of calc_time_series) for
+                            wind_residual, as the low-pass filter of df removes the gusts; None: U_TAS of df
+    :param window_s:        window length in s (should contain passes in both directions)
+    :param hop_s:           distance of window starts in s
+    :param min_speed:       samples with lower GPS speed are not used
+    :param min_samples:     minimum number of samples per window
+    :param max_resultant:   maximum mean resultant length of the headings (passes in both directions needed)
+    :param max_rms:         maximum RMS residual in m/s
+    :return:                pandas DataFrame with wind columns
+    """
+    index = pd.DatetimeIndex(df.index)
+    t = (index - index[0]).total_seconds().to_numpy()
+    heading = df["heading"].to_numpy(dtype=float)
+    delta_U = (df["U_TAS"] - df["U_GPS"]).to_numpy(dtype=float)
+    valid = df["U_GPS"].to_numpy(dtype=float) > min_speed
+    if "pass_id" in df.columns:
+        # straight passes only: heading of curves is not the direction of the car axis
+        valid &= df["pass_id"].to_numpy() >= 0
+
+    df_windows = solve_wind_windows(t, heading, delta_U, valid, window_s, hop_s)
+    good = (df_windows["n"] >= min_samples) & (df_windows["resultant"] <= max_resultant) & \
+        (df_windows["rms"] <= max_rms)
+
+    # wind of the nearest window center
+    t_center = df_windows["t_center"].to_numpy()
+    i_right = np.clip(np.searchsorted(t_center, t), 0, len(t_center) - 1)
+    i_left = np.maximum(i_right - 1, 0)
+    i_window = np.where(np.abs(t - t_center[i_left]) <= np.abs(t_center[i_right] - t), i_left, i_right)
+    W_east = df_windows["W_east"].to_numpy()[i_window]
+    W_north = df_windows["W_north"].to_numpy()[i_window]
+
+    psi = np.radians(heading)
+    df = df.drop(columns=[col for col in wind_columns if col in df.columns])
+    wind_component = -(W_east * np.sin(psi) + W_north * np.cos(psi))
+    if U_TAS_raw is not None:
+        delta_U = np.asarray(U_TAS_raw, dtype=float) - df["U_GPS"].to_numpy(dtype=float)
+    df_wind = pd.DataFrame({"wind_east": W_east, "wind_north": W_north, "wind_component": wind_component,
+                            "wind_residual": np.where(valid, delta_U - wind_component, np.nan),
+                            "wind_quality": good.to_numpy()[i_window]}, index=df.index)
+    return pd.concat([df, df_wind], axis=1)
+
+
+def segment_wind(df, df_segments, max_gust_rms=0.5):
+    """
+    wind of every segment for the polar
+    :param df:              pandas DataFrame with wind columns (estimate_wind)
+    :param df_segments:     segment start and end times
+    :param max_gust_rms:    maximum standard deviation of wind_residual in the segment in m/s (segments without
+                            valid samples are of bad quality)
+    :return:                pandas DataFrame (index of df_segments) with mean wind_component, wind_speed,
+                            wind_direction (deg, direction the wind comes from), gust_rms and wind_quality
+    """
+    i_start = df.index.searchsorted(df_segments["start"])
+    i_end = df.index.searchsorted(df_segments["end"], side="right")
+    rows = []
+    for start, end in zip(i_start, i_end):
+        df_seg = df.iloc[start:end]
+        W_east, W_north = df_seg["wind_east"].mean(), df_seg["wind_north"].mean()
+        gust_rms = df_seg["wind_residual"].std()
+        rows.append({"wind_component": df_seg["wind_component"].mean(), "wind_speed": np.hypot(W_east, W_north),
+                     "wind_direction": np.degrees(np.arctan2(-W_east, -W_north)) % 360., "gust_rms": gust_rms,
+                     "wind_quality": bool(len(df_seg) > 0 and df_seg["wind_quality"].all() and
+                                          gust_rms <= max_gust_rms)})
+    return pd.DataFrame(rows, index=df_segments.index)